@@ -3,15 +3,27 @@ Admin Dashboard Routes - Master Admin Only
 Apple-Grade Backend Administration
 """
 
+import asyncio
+import logging
+import time
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text, func, desc, case, tuple_
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from database_unified import get_db, User, Organization, Deal, AuditLog
+from database_unified import (
+    get_db, get_async_db, async_engine, AsyncSessionLocal, User, Organization, Borrower, Deal, AuditLog
+)
 from auth import get_current_user
+from caching import AsyncCache, TTL_SHORT, TTL_MEDIUM
+from pagination import encode_cursor, decode_cursor, next_page_cursor
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -48,6 +60,14 @@ class DealDetail(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class UserPage(BaseModel):
+    items: List[UserDetail]
+    next_cursor: Optional[str]
+
+class DealPage(BaseModel):
+    items: List[DealDetail]
+    next_cursor: Optional[str]
+
 class SystemHealth(BaseModel):
     database: str
     api_response_time: float
@@ -66,129 +86,232 @@ def verify_admin(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+# ==================== PAGINATION ====================
+
+# List endpoints use keyset pagination on (created_at, id), newest first;
+# cursors come from the shared pagination module.
+
+def _keyset(query, created_at_col, id_col, cursor: Optional[str], limit: int):
+    """Apply keyset filter and ordering, fetching one extra row to detect a next page"""
+    if cursor:
+        query = query.where(tuple_(created_at_col, id_col) < decode_cursor(cursor))
+    return query.order_by(desc(created_at_col), desc(id_col)).limit(limit + 1)
+
+# ==================== CACHE ====================
+
+# Dashboard aggregates change slowly. Entries are fresh for ADMIN_CACHE_TTL;
+# after that, one request recomputes while concurrent requests keep getting
+# the stale value for up to ADMIN_CACHE_STALE_TTL.
+ADMIN_CACHE_TTL = TTL_SHORT
+ADMIN_CACHE_STALE_TTL = TTL_MEDIUM
+
+# Health is polled by monitors, so it is refreshed a little more often
+HEALTH_CACHE_TTL = 30
+
+_admin_cache: Dict[str, Tuple[float, Any]] = {}
+_admin_cache_locks: Dict[str, asyncio.Lock] = {}
+
+async def _get_cached(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: float = ADMIN_CACHE_TTL,
+    force: bool = False
+) -> Any:
+    """
+    Return a cached value for key, refreshing it with compute when expired
+    or when force is set
+    """
+    entry = _admin_cache.get(key)
+    age = time.monotonic() - entry[0] if entry else None
+    if not force and age is not None and age < ttl:
+        return entry[1]
+    
+    lock = _admin_cache_locks.setdefault(key, asyncio.Lock())
+    if not force and lock.locked() and age is not None and age < ADMIN_CACHE_STALE_TTL:
+        # Another request is already refreshing - serve stale
+        return entry[1]
+    
+    async with lock:
+        # The value may have been refreshed while we waited for the lock
+        entry = _admin_cache.get(key)
+        if not force and entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        
+        value = await compute()
+        _admin_cache[key] = (time.monotonic(), value)
+        return value
+
+def invalidate_admin_cache():
+    """Drop cached dashboard aggregates after an admin write"""
+    _admin_cache.clear()
+
 # ==================== ROUTES ====================
 
 @router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(verify_admin)
 ):
     """Get comprehensive admin statistics"""
     try:
-        # Total counts
-        total_users = db.query(func.count(User.id)).scalar()
-        total_orgs = db.query(func.count(Organization.id)).scalar()
-        total_deals = db.query(func.count(Deal.id)).scalar()
-        
-        # Active users today
-        today = datetime.utcnow().date()
-        active_today = db.query(func.count(User.id)).filter(
-            func.date(User.last_login) == today
-        ).scalar()
-        
-        # Deals this month
-        month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0)
-        deals_this_month = db.query(func.count(Deal.id)).filter(
-            Deal.created_at >= month_start
-        ).scalar()
-        
-        # Revenue calculations (assuming loan_amount field)
-        total_loan_amount = db.query(func.sum(Deal.loan_amount)).scalar() or 0
-        avg_deal_size = total_loan_amount / total_deals if total_deals > 0 else 0
-        
-        # Assuming 1% revenue per deal
-        revenue_this_month = (
-            db.query(func.sum(Deal.loan_amount)).filter(
-                Deal.created_at >= month_start
-            ).scalar() or 0
-        ) * 0.01
-        
-        return AdminStats(
-            total_users=total_users,
-            total_organizations=total_orgs,
-            total_deals=total_deals,
-            active_users_today=active_today or 0,
-            deals_this_month=deals_this_month or 0,
-            revenue_this_month=revenue_this_month,
-            avg_deal_size=avg_deal_size,
-            system_health="healthy"
-        )
+        return await _get_cached("stats", lambda: _compute_admin_stats(db))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
-@router.get("/users", response_model=List[UserDetail])
+async def _compute_admin_stats(db: AsyncSession) -> AdminStats:
+    """Aggregate the dashboard statistics from the database"""
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today_start.replace(day=1)
+    
+    # All dashboard numbers in one round-trip: deal aggregates are computed
+    # with conditional aggregates, user/org counts as scalar subqueries
+    total_users_q = select(func.count(User.id)).scalar_subquery()
+    total_orgs_q = select(func.count(Organization.id)).scalar_subquery()
+    # Range predicate rather than date(last_login) so ix_users_last_login applies
+    active_today_q = select(func.count(User.id)).where(
+        User.last_login >= today_start,
+        User.last_login < today_start + timedelta(days=1)
+    ).scalar_subquery()
+    
+    (
+        total_users,
+        total_orgs,
+        active_today,
+        total_deals,
+        deals_this_month,
+        total_loan_amount,
+        loan_amount_this_month,
+    ) = (await db.execute(select(
+        total_users_q,
+        total_orgs_q,
+        active_today_q,
+        func.count(Deal.id),
+        func.count(case((Deal.created_at >= month_start, Deal.id))),
+        func.sum(Deal.loan_amount),
+        func.sum(case((Deal.created_at >= month_start, Deal.loan_amount))),
+    ))).one()
+    
+    total_loan_amount = total_loan_amount or 0
+    avg_deal_size = total_loan_amount / total_deals if total_deals > 0 else 0
+    
+    # Assuming 1% revenue per deal
+    revenue_this_month = (loan_amount_this_month or 0) * 0.01
+    
+    return AdminStats(
+        total_users=total_users,
+        total_organizations=total_orgs,
+        total_deals=total_deals,
+        active_users_today=active_today or 0,
+        deals_this_month=deals_this_month or 0,
+        revenue_this_month=revenue_this_month,
+        avg_deal_size=avg_deal_size,
+        system_health="healthy"
+    )
+
+@router.get("/users", response_model=UserPage)
 async def get_all_users(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, le=1000),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(verify_admin)
 ):
     """Get all users with details"""
     try:
-        query = db.query(User).join(Organization)
+        # Only the listed columns plus deal counts, in a single aggregated statement
+        query = select(
+            User.id,
+            User.email,
+            User.full_name,
+            User.role,
+            User.created_at,
+            User.last_login,
+            Organization.name.label("organization_name"),
+            func.count(Deal.id).label("deal_count")
+        ).outerjoin(Organization, User.organization_id == Organization.id).outerjoin(
+            Deal, Deal.created_by == User.id
+        )
         
         if search:
-            query = query.filter(
+            query = query.where(
                 (User.email.contains(search)) |
                 (User.full_name.contains(search))
             )
         
-        users = query.offset(skip).limit(limit).all()
+        query = _keyset(
+            query.group_by(User.id, Organization.id),
+            User.created_at, User.id, cursor, limit
+        )
+        rows = list((await db.execute(query)).all())
+        next_cursor = next_page_cursor(rows, limit, lambda row: (row.created_at, row.id))
         
         result = []
-        for user in users:
-            deal_count = db.query(func.count(Deal.id)).filter(
-                Deal.created_by_id == user.id
-            ).scalar()
-            
+        for row in rows:
             result.append(UserDetail(
-                id=user.id,
-                email=user.email,
-                full_name=user.full_name,
-                role=user.role,
-                organization_name=user.organization.name if user.organization else "N/A",
-                created_at=user.created_at,
-                last_login=user.last_login,
-                deal_count=deal_count or 0,
-                is_active=getattr(user, 'is_active', True)
+                id=row.id,
+                email=row.email,
+                full_name=row.full_name,
+                role=row.role,
+                organization_name=row.organization_name or "N/A",
+                created_at=row.created_at,
+                last_login=row.last_login,
+                deal_count=row.deal_count or 0,
+                is_active=True  # User model has no is_active column
             ))
         
-        return result
+        return UserPage(items=result, next_cursor=next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get users: {str(e)}")
 
-@router.get("/deals", response_model=List[DealDetail])
+@router.get("/deals", response_model=DealPage)
 async def get_all_deals(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, le=1000),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(verify_admin)
 ):
     """Get all deals with details"""
     try:
-        query = db.query(Deal).join(User, Deal.created_by_id == User.id)
+        # Only the listed columns, with borrower and creator names joined in
+        query = select(
+            Deal.id,
+            Deal.loan_amount,
+            Deal.status,
+            Deal.created_at,
+            Deal.updated_at,
+            Borrower.name.label("borrower_name"),
+            User.full_name.label("created_by")
+        ).join(User, Deal.created_by == User.id).outerjoin(
+            Borrower, Deal.borrower_id == Borrower.id
+        )
         
         if status:
-            query = query.filter(Deal.status == status)
+            query = query.where(Deal.status == status)
         
-        deals = query.order_by(desc(Deal.created_at)).offset(skip).limit(limit).all()
+        query = _keyset(query, Deal.created_at, Deal.id, cursor, limit)
+        rows = list((await db.execute(query)).all())
+        next_cursor = next_page_cursor(rows, limit, lambda row: (row.created_at, row.id))
         
         result = []
-        for deal in deals:
+        for row in rows:
             result.append(DealDetail(
-                id=deal.id,
-                borrower_name=deal.borrower.name if deal.borrower else "N/A",
-                loan_amount=deal.loan_amount or 0,
-                property_address=deal.property_address or "N/A",
-                status=deal.status,
-                created_by=deal.created_by_user.full_name if deal.created_by_user else "N/A",
-                created_at=deal.created_at,
-                updated_at=deal.updated_at
+                id=row.id,
+                borrower_name=row.borrower_name or "N/A",
+                loan_amount=row.loan_amount or 0,
+                property_address="N/A",  # Deal model has no property address column
+                status=row.status,
+                created_by=row.created_by or "N/A",
+                created_at=row.created_at,
+                updated_at=row.updated_at
             ))
         
-        return result
+        return DealPage(items=result, next_cursor=next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get deals: {str(e)}")
 
@@ -208,6 +331,7 @@ async def toggle_user_status(
         if hasattr(user, 'is_active'):
             user.is_active = not user.is_active
             db.commit()
+            invalidate_admin_cache()
             
             return {
                 "success": True,
@@ -241,6 +365,7 @@ async def change_user_role(
         
         user.role = new_role
         db.commit()
+        invalidate_admin_cache()
         
         return {
             "success": True,
@@ -253,69 +378,169 @@ async def change_user_role(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to change role: {str(e)}")
 
+@router.get("/health/live")
+async def get_liveness():
+    """Cheap liveness check for monitors - never touches the database"""
+    return {"status": "ok", "cache": await AsyncCache.ping()}
+
 @router.get("/system-health", response_model=SystemHealth)
 async def get_system_health(
-    db: Session = Depends(get_db),
     admin: User = Depends(verify_admin)
 ):
-    """Get system health metrics"""
+    """Get system health metrics (cached for HEALTH_CACHE_TTL seconds)"""
     try:
-        # Test database connection
-        db.execute("SELECT 1")
-        db_status = "healthy"
-        
-        # Get active connections (simplified)
-        active_connections = 1  # Would need actual connection pool stats
-        
-        # Calculate error rate from audit logs (last hour)
-        hour_ago = datetime.utcnow() - timedelta(hours=1)
-        total_requests = db.query(func.count(AuditLog.id)).filter(
-            AuditLog.timestamp >= hour_ago
-        ).scalar() or 1
-        
-        error_requests = db.query(func.count(AuditLog.id)).filter(
-            AuditLog.timestamp >= hour_ago,
-            AuditLog.action.contains("error")
-        ).scalar() or 0
-        
-        error_rate = (error_requests / total_requests) * 100 if total_requests > 0 else 0
-        
-        return SystemHealth(
-            database=db_status,
-            api_response_time=0.15,  # Would measure actual response times
-            error_rate=error_rate,
-            uptime_percentage=99.95,  # Would track actual uptime
-            active_connections=active_connections
-        )
+        return await _get_cached("system-health", _compute_system_health, ttl=HEALTH_CACHE_TTL)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get health: {str(e)}")
+
+@router.get("/system-health/full", response_model=SystemHealth)
+async def get_system_health_full(
+    admin: User = Depends(verify_admin)
+):
+    """Get system health metrics, always re-querying the database"""
+    try:
+        return await _get_cached("system-health", _compute_system_health, force=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get health: {str(e)}")
 
+async def _probe_database() -> str:
+    """Test database connection"""
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return "healthy"
+
+async def _recent_request_counts(since: datetime) -> Tuple[int, int]:
+    """Count all and error audit log entries since a point in time"""
+    # count(*) over (created_at, action) can be answered by an index-only scan;
+    # error actions are namespaced with an "error" prefix, and a prefix LIKE
+    # can be checked against the index key where a substring match cannot
+    async with async_engine.connect() as conn:
+        total, errors = (await conn.execute(
+            select(
+                func.count(),
+                func.count(case((AuditLog.action.startswith("error"), 1)))
+            ).select_from(AuditLog).where(AuditLog.created_at >= since)
+        )).one()
+    return total, errors
+
+async def _compute_system_health() -> SystemHealth:
+    """Probe the database and derive health metrics from recent audit logs"""
+    # The probe and the error-rate query run concurrently on separate
+    # pooled connections (an AsyncSession cannot run statements in parallel)
+    hour_ago = datetime.utcnow() - timedelta(hours=1)
+    db_status, (total_requests, error_requests) = await asyncio.gather(
+        _probe_database(),
+        _recent_request_counts(hour_ago)
+    )
+    
+    # Get active connections (simplified)
+    active_connections = 1  # Would need actual connection pool stats
+    
+    # Calculate error rate from audit logs (last hour)
+    total_requests = total_requests or 1
+    error_rate = (error_requests / total_requests) * 100 if total_requests > 0 else 0
+    
+    return SystemHealth(
+        database=db_status,
+        api_response_time=0.15,  # Would measure actual response times
+        error_rate=error_rate,
+        uptime_percentage=99.95,  # Would track actual uptime
+        active_connections=active_connections
+    )
+
+# Rows fetched per server-side cursor round-trip when streaming audit logs
+AUDIT_LOG_BATCH_SIZE = 200
+
 @router.get("/audit-logs")
 async def get_audit_logs(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, le=1000),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
     user_id: Optional[str] = None,
-    db: Session = Depends(get_db),
     admin: User = Depends(verify_admin)
 ):
-    """Get audit logs"""
+    """Get audit logs, streamed to the client as rows are fetched"""
+    query = select(
+        AuditLog.id,
+        AuditLog.user_id,
+        AuditLog.action,
+        AuditLog.payload,
+        AuditLog.created_at
+    )
+    
+    if user_id:
+        query = query.where(AuditLog.user_id == user_id)
+    
+    query = _keyset(query, AuditLog.created_at, AuditLog.id, cursor, limit)
+    
+    # Run the query and fetch the first batch before any bytes are sent, so
+    # setup failures are a proper 500 rather than truncated JSON under a 200.
+    # The session is opened here rather than injected because the response
+    # body outlives the request's dependencies.
+    db = AsyncSessionLocal()
     try:
-        query = db.query(AuditLog)
-        
-        if user_id:
-            query = query.filter(AuditLog.user_id == user_id)
-        
-        logs = query.order_by(desc(AuditLog.timestamp)).offset(skip).limit(limit).all()
-        
-        return [{
-            "id": log.id,
-            "user_id": log.user_id,
-            "action": log.action,
-            "details": log.details,
-            "timestamp": log.timestamp
-        } for log in logs]
+        result = await db.stream(
+            query.execution_options(yield_per=AUDIT_LOG_BATCH_SIZE)
+        )
+        batches = result.partitions()
+        first_batch = await anext(batches, [])
+    except Exception as e:
+        await db.close()
+        raise HTTPException(status_code=500, detail=f"Failed to get audit logs: {str(e)}")
+    
+    return StreamingResponse(
+        _stream_audit_logs(db, result, first_batch, batches, limit, cursor),
+        media_type="application/json"
+    )
+
+async def _stream_audit_logs(db, result, first_batch, batches, limit: int,
+                             cursor: Optional[str]) -> AsyncIterator[bytes]:
+    """
+    Serialize an audit log page as {"items": [...], "next_cursor": ...}
+    one batch at a time, closing the session when done.
+    
+    A failure mid-stream still closes the document: next_cursor then points
+    just past the last row sent and an "error" key flags the short page.
+    """
+    yield b'{"items":['
+    count = 0
+    next_cursor = None
+    error = None
+    last_key = None
+    try:
+        batch = first_batch
+        while batch:
+            chunk = []
+            for log in batch:
+                if count == limit:
+                    # Look-ahead row: there is another page
+                    next_cursor = encode_cursor(*last_key)
+                    break
+                chunk.append(orjson.dumps({
+                    "id": log.id,
+                    "user_id": log.user_id,
+                    "action": log.action,
+                    "details": log.payload,
+                    "timestamp": log.created_at
+                }))
+                last_key = (log.created_at, log.id)
+                count += 1
+            if chunk:
+                yield (b"," if count > len(chunk) else b"") + b",".join(chunk)
+            if next_cursor:
+                break
+            batch = await anext(batches, [])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get logs: {str(e)}")
+        logger.error(f"Audit log stream failed after {count} rows: {e}")
+        error = "Audit log stream interrupted"
+        next_cursor = encode_cursor(*last_key) if last_key else cursor
+    finally:
+        await result.close()
+        await db.close()
+    
+    tail = b'],"next_cursor":' + orjson.dumps(next_cursor)
+    if error:
+        tail += b',"error":' + orjson.dumps(error)
+    yield tail + b'}'
 
 @router.delete("/deals/{deal_id}")
 async def delete_deal(
@@ -331,6 +556,7 @@ async def delete_deal(
         
         db.delete(deal)
         db.commit()
+        invalidate_admin_cache()
         
         return {"success": True, "deal_id": deal_id, "message": "Deal deleted"}
     except HTTPException:
@@ -2,57 +2,287 @@
 Enterprise AI Advisor System
 Real LLM Integration for Intelligent Underwriting Assistance
 """
-from typing import Dict, List, Optional
-from openai import OpenAI
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+import asyncio
+import hashlib
+from collections import ChainMap
+import httpx
+import logging
 import os
-import json
+import orjson
+import re
 from datetime import datetime
 
+from caching import AsyncCache, CACHE_AI_COMPLETIONS, TTL_DAY
 
-class AIAdvisorPro:
-    """
-    Production-grade AI advisor using real LLM
-    Provides intelligent underwriting assistance and document analysis
-    """
+logger = logging.getLogger(__name__)
+
+# Completions above this temperature are too varied to be worth caching
+CACHE_MAX_TEMPERATURE = 0.5
+
+# Deals assessed per LLM request in assess_risks_batch
+RISK_BATCH_SIZE = 10
+
+# Tokens of conversation history sent with each advisor question
+HISTORY_TOKEN_BUDGET = 2000
+
+# Tokenizer for history trimming; falls back to a character estimate
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text (approximately, if tiktoken is unavailable)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def trim_history(history: List[Dict], budget: int) -> List[Dict]:
+    """Return the most recent messages whose combined token count fits budget"""
+    window = []
+    used = 0
+    for message in reversed(history):
+        # ~4 tokens of per-message overhead for role and separators
+        used += count_tokens(message.get("content") or "") + 4
+        if used > budget:
+            break
+        window.append(message)
+    window.reverse()
+    return window
+
+
+# System prompts for different AI personas
+SYSTEM_PROMPTS = {
+    "underwriting_advisor": """You are Cassie, an expert commercial loan underwriting advisor with 20+ years of experience. 
+You provide accurate, professional guidance on commercial lending, underwriting standards, risk assessment, and loan structuring.
+You explain complex financial concepts clearly and provide actionable recommendations.
+Always cite industry standards (FDIC, OCC, SBA guidelines) when relevant.""",
     
-    def __init__(self):
-        # Initialize OpenAI client (API key from environment)
-        # Handle proxy environment that might conflict
-        import httpx
-        
+    "document_analyzer": """You are Sage, a document analysis specialist for commercial lending.
+You extract key information from financial documents, identify red flags, and provide insights on data quality and completeness.
+You're detail-oriented and highlight any inconsistencies or concerns.""",
+    
+    "risk_assessor": """You are Titan, a risk assessment expert for commercial loans.
+You evaluate credit risk, market risk, and operational risk. You provide probability of default estimates and risk mitigation strategies.
+You're conservative but fair in your assessments.""",
+    
+    "deal_structurer": """You are Remy, a loan structuring specialist.
+You recommend optimal loan terms, pricing, and structures based on risk profile and market conditions.
+You balance lender protection with borrower needs.""",
+    
+    "summary_writer": "You are an expert at writing concise, professional executive summaries for commercial loan underwriting."
+}
+
+# Prebuilt system messages - shared, so never mutate them
+SYSTEM_MESSAGES = {
+    name: {"role": "system", "content": prompt}
+    for name, prompt in SYSTEM_PROMPTS.items()
+}
+
+# Number formatting for loan context values, keyed by field-name suffix
+_currency = "${:,.2f}".format
+_percent = "{:.2%}".format
+CONTEXT_FORMATTERS = {
+    "_amount": _currency,
+    "_value": _currency,
+    "_rate": _percent,
+    "_ratio": _percent,
+}
+
+
+# Deal summary templates, parsed once. Fields are looked up through
+# ChainMaps over the caller's data and the defaults below.
+RISK_SUMMARY_TEMPLATE = """
+Loan Request:
+- Amount: ${loan[loan_amount]:,.2f}
+- Type: {loan[loan_type]}
+- Purpose: {loan[loan_purpose]}
+- Term: {loan[term_months]} months
+
+Borrower:
+- Name: {borrower[name]}
+- Credit Score: {borrower[credit_score]}
+- Years in Business: {borrower[years_in_business]}
+- Annual Revenue: ${borrower[annual_revenue]:,.2f}
+
+Underwriting Metrics:
+- DSCR: {uw[dscr]:.2f}x
+- DSCR (Stressed): {uw[dscr_stressed]:.2f}x
+- LTV: {uw[ltv]:.1%}
+- Debt Yield: {uw[debt_yield]:.1%}
+- Risk Score: {uw[risk_score]}/100
+
+Financial Metrics:
+- Current Ratio: {fin[current_ratio]}
+- Profit Margin: {fin[profit_margin]}
+- Debt-to-Equity: {fin[debt_to_equity]}
+"""
+
+STRUCTURE_SUMMARY_TEMPLATE = """
+Requested Loan:
+- Amount: ${loan[loan_amount]:,.2f}
+- Type: {loan[loan_type]}
+- Rate: {loan[interest_rate]:.3%}
+- Term: {loan[term_months]} months
+
+Borrower Profile:
+- Credit Score: {borrower[credit_score]}
+- Risk Rating: {uw[risk_rating]}
+
+Underwriting Results:
+- DSCR: {uw[dscr]:.2f}x
+- LTV: {uw[ltv]:.1%}
+- Risk Score: {uw[risk_score]}/100
+- Recommendation: {uw[recommendation]}
+"""
+
+EXECUTIVE_SUMMARY_TEMPLATE = """
+Loan: ${loan[loan_amount]:,.2f} {loan[loan_type]}
+Borrower: {borrower[name]}
+DSCR: {uw[dscr]:.2f}x
+LTV: {uw[ltv]:.1%}
+Risk Rating: {uw[risk_rating]}
+Recommendation: {uw[recommendation]}
+
+Strengths: {strengths}
+Concerns: {concerns}
+"""
+
+LOAN_DEFAULTS = {
+    "loan_amount": 0,
+    "loan_type": "N/A",
+    "loan_purpose": "N/A",
+    "term_months": 0,
+    "interest_rate": 0,
+}
+
+BORROWER_DEFAULTS = {
+    "name": "N/A",
+    "credit_score": "N/A",
+    "years_in_business": "N/A",
+    "annual_revenue": 0,
+}
+
+UNDERWRITING_DEFAULTS = {
+    "dscr": 0,
+    "dscr_stressed": 0,
+    "ltv": 0,
+    "debt_yield": 0,
+    "risk_score": 0,
+    "risk_rating": "N/A",
+    "recommendation": "N/A",
+}
+
+FINANCIAL_DEFAULTS = {
+    "current_ratio": "N/A",
+    "profit_margin": "N/A",
+    "debt_to_equity": "N/A",
+}
+
+# Offline answers used when the LLM is unavailable
+FALLBACK_KNOWLEDGE_BASE = {
+    "documents": "For commercial loans, you typically need: 1) Business tax returns (2-3 years), 2) Personal tax returns of guarantors, 3) Business financial statements (P&L, Balance Sheet), 4) Rent roll (for investment properties), 5) Purchase agreement, 6) Property appraisal, 7) Business plan, 8) Personal financial statement (PFS)",
+    "ltv": "Loan-to-Value (LTV) is calculated as: LTV = (Loan Amount / Appraised Property Value) × 100. For example, a $750,000 loan on a $1,000,000 property = 75% LTV. Most commercial lenders require LTV below 80% for owner-occupied and 75% for investment properties.",
+    "dscr": "Debt Service Coverage Ratio (DSCR) measures cash flow available to cover debt payments. Formula: DSCR = Net Operating Income / Annual Debt Service. A DSCR of 1.25 means the property generates 25% more income than needed for debt payments. Most lenders require minimum 1.20-1.25 DSCR.",
+    "credit": "Credit score requirements vary by loan type. For SBA 7(a) loans, minimum is typically 680. For conventional commercial loans, 680-700+ is preferred. For owner-occupied CRE, 700+ is ideal. Lower scores may require higher down payments or personal guarantees."
+}
+
+# Keyword -> knowledge base topic, matched in one pass by FALLBACK_PATTERN.
+# When several topics match, the earliest in FALLBACK_TOPIC_PRIORITY wins.
+FALLBACK_KEYWORDS = {
+    "document": "documents",
+    "ltv": "ltv",
+    "loan-to-value": "ltv",
+    "dscr": "dscr",
+    "debt service": "dscr",
+    "credit": "credit",
+}
+FALLBACK_TOPIC_PRIORITY = ["documents", "ltv", "dscr", "credit"]
+FALLBACK_PATTERN = re.compile(
+    "|".join(re.escape(keyword) for keyword in FALLBACK_KEYWORDS),
+    re.IGNORECASE
+)
+
+
+# Structured advisor outputs, requested in JSON mode
+JSON_OBJECT = {"type": "json_object"}
+
+
+class DocumentAnalysis(BaseModel):
+    """AI findings for a single document"""
+    key_metrics: List[str] = []
+    red_flags: List[str] = []
+    data_quality: str = ""
+    missing_information: List[str] = []
+    overall_assessment: str = ""
+
+
+class RiskAssessment(BaseModel):
+    """AI risk assessment for a loan"""
+    risk_rating: str = ""
+    justification: str = ""
+    risk_factors: List[str] = []
+    mitigating_factors: List[str] = []
+    mitigation_strategies: List[str] = []
+    probability_of_default: str = ""
+    pricing_premium: str = ""
+
+
+class LoanStructureSuggestion(BaseModel):
+    """AI-suggested loan structure"""
+    recommended_loan_amount: str = ""
+    interest_rate: str = ""
+    term_and_amortization: str = ""
+    down_payment: str = ""
+    covenants: List[str] = []
+    alternative_structures: List[str] = []
+    pricing_rationale: str = ""
+
+
+# Shared OpenAI client - one connection pool for every AIAdvisorPro instance
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Return the process-wide OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
         api_key = os.environ.get("OPENAI_API_KEY")
         base_url = os.environ.get("OPENAI_BASE_URL")
         
-        # Create HTTP client - let OpenAI handle it internally
-        http_client = httpx.Client()
+        # Keep-alive pool sized for concurrent advisor calls
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+        )
         
         # Initialize with explicit parameters
         if base_url:
-            self.client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            _client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
         else:
-            self.client = OpenAI(api_key=api_key, http_client=http_client)
+            _client = AsyncOpenAI(api_key=api_key, http_client=http_client)
+    return _client
+
+
+class AIAdvisorPro:
+    """
+    Production-grade AI advisor using real LLM
+    Provides intelligent underwriting assistance and document analysis
+    """
+    
+    def __init__(self):
+        # Reuse the shared OpenAI client (API key from environment)
+        self.client = get_openai_client()
         
         # System prompts for different AI personas
-        self.system_prompts = {
-            "underwriting_advisor": """You are Cassie, an expert commercial loan underwriting advisor with 20+ years of experience. 
-You provide accurate, professional guidance on commercial lending, underwriting standards, risk assessment, and loan structuring.
-You explain complex financial concepts clearly and provide actionable recommendations.
-Always cite industry standards (FDIC, OCC, SBA guidelines) when relevant.""",
-            
-            "document_analyzer": """You are Sage, a document analysis specialist for commercial lending.
-You extract key information from financial documents, identify red flags, and provide insights on data quality and completeness.
-You're detail-oriented and highlight any inconsistencies or concerns.""",
-            
-            "risk_assessor": """You are Titan, a risk assessment expert for commercial loans.
-You evaluate credit risk, market risk, and operational risk. You provide probability of default estimates and risk mitigation strategies.
-You're conservative but fair in your assessments.""",
-            
-            "deal_structurer": """You are Remy, a loan structuring specialist.
-You recommend optimal loan terms, pricing, and structures based on risk profile and market conditions.
-You balance lender protection with borrower needs."""
-        }
+        self.system_prompts = SYSTEM_PROMPTS
     
-    def ask_underwriting_question(
+    async def ask_underwriting_question(
         self,
         question: str,
         context: Optional[Dict] = None,
@@ -70,49 +300,97 @@ You balance lender protection with borrower needs."""
             Dict with answer, confidence, and sources
         """
         try:
-            # Build messages
-            messages = [
-                {"role": "system", "content": self.system_prompts["underwriting_advisor"]}
-            ]
-            
-            # Add conversation history if available
-            if conversation_history:
-                messages.extend(conversation_history[-5:])  # Last 5 messages for context
-            
-            # Add context if available
-            if context:
-                context_str = self._format_context(context)
-                messages.append({
-                    "role": "system",
-                    "content": f"Current loan context:\n{context_str}"
-                })
-            
-            # Add user question
-            messages.append({"role": "user", "content": question})
+            messages = self._question_messages(question, context, conversation_history)
             
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
+            # Call OpenAI API - standalone questions are shared across users,
+            # so only those are served from the response cache
+            answer, tokens_used, cached = await self._complete(
+                messages,
                 model="gpt-4.1-mini",  # Using available model
-                messages=messages,
                 temperature=0.3,  # Lower temperature for more consistent answers
-                max_tokens=500
+                max_tokens=500,
+                cache=not context and not conversation_history
             )
             
-            answer = response.choices[0].message.content
-            
             return {
                 "answer": answer,
                 "confidence": 0.95,  # High confidence with real LLM
                 "model": "gpt-4.1-mini",
                 "timestamp": datetime.now().isoformat(),
-                "tokens_used": response.usage.total_tokens
+                "tokens_used": tokens_used,
+                "cached": cached
             }
             
-        except Exception as e:
+        except Exception:
             # Fallback to knowledge base if API fails
+            logger.warning("Advisor completion failed, answering from the knowledge base", exc_info=True)
             return self._fallback_answer(question)
     
-    def analyze_document_with_ai(
+    async def ask_underwriting_question_stream(
+        self,
+        question: str,
+        context: Optional[Dict] = None,
+        conversation_history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Answer an underwriting question, yielding text as it is generated
+        
+        Args:
+            question: User's question
+            context: Optional context (loan data, borrower info, etc.)
+            conversation_history: Previous conversation messages
+            
+        Yields:
+            Answer text fragments
+        """
+        messages = self._question_messages(question, context, conversation_history)
+        try:
+            response = await self.client.chat.completions.create(
+                model="gpt-4.1-mini",
+                messages=messages,
+                temperature=0.3,
+                max_tokens=500,
+                stream=True
+            )
+        except Exception:
+            # Fallback to knowledge base if API fails
+            yield self._fallback_answer(question)["answer"]
+            return
+        
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _question_messages(
+        self,
+        question: str,
+        context: Optional[Dict],
+        conversation_history: Optional[List[Dict]]
+    ) -> List[Dict]:
+        """Build the chat messages for an underwriting question"""
+        # Stable system prompt first, then loan context, so consecutive
+        # requests share the longest possible prefix
+        messages = [
+            SYSTEM_MESSAGES["underwriting_advisor"]
+        ]
+        
+        # Add context if available
+        if context:
+            context_str = self._format_context(context)
+            messages.append({
+                "role": "system",
+                "content": f"Current loan context:\n{context_str}"
+            })
+        
+        # Add as much recent conversation history as fits the token budget
+        if conversation_history:
+            messages.extend(trim_history(conversation_history, HISTORY_TOKEN_BUDGET))
+        
+        # Add user question
+        messages.append({"role": "user", "content": question})
+        return messages
+    
+    async def analyze_document_with_ai(
         self,
         document_text: str,
         document_type: str,
@@ -131,36 +409,38 @@ You balance lender protection with borrower needs."""
         """
         try:
             messages = [
-                {"role": "system", "content": self.system_prompts["document_analyzer"]},
-                {"role": "user", "content": f"""Analyze this {document_type} document and provide:
-1. Key financial metrics and their significance
-2. Any red flags or concerns
-3. Data quality assessment
-4. Missing information that should be requested
-5. Overall assessment
+                SYSTEM_MESSAGES["document_analyzer"],
+                {"role": "user", "content": f"""Analyze this {document_type} document.
+
+Respond with a JSON object with these fields:
+- key_metrics: list of key financial metrics and their significance
+- red_flags: list of red flags or concerns
+- data_quality: data quality assessment
+- missing_information: list of information that should be requested
+- overall_assessment: overall assessment
 
 Document text:
 {document_text[:3000]}  # Limit to avoid token limits
 
-{f"Already extracted data: {json.dumps(extracted_data, default=str)}" if extracted_data else ""}
+{f"Already extracted data: {orjson.dumps(extracted_data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()}" if extracted_data else ""}
 """}
             ]
             
-            response = self.client.chat.completions.create(
+            content, tokens_used, _ = await self._complete(
+                messages,
                 model="gpt-4.1-mini",
-                messages=messages,
                 temperature=0.2,
-                max_tokens=800
+                max_tokens=600,
+                response_format=JSON_OBJECT
             )
-            
-            analysis = response.choices[0].message.content
+            analysis = DocumentAnalysis.model_validate(orjson.loads(content))
             
             return {
-                "analysis": analysis,
+                "analysis": analysis.model_dump(),
                 "document_type": document_type,
                 "model": "gpt-4.1-mini",
                 "timestamp": datetime.now().isoformat(),
-                "tokens_used": response.usage.total_tokens
+                "tokens_used": tokens_used
             }
             
         except Exception as e:
@@ -169,7 +449,7 @@ Document text:
                 "error": True
             }
     
-    def assess_risk_with_ai(
+    async def assess_risk_with_ai(
         self,
         loan_data: Dict,
         borrower_data: Dict,
@@ -190,62 +470,41 @@ Document text:
         """
         try:
             # Format data for AI
-            data_summary = f"""
-Loan Request:
-- Amount: ${loan_data.get('loan_amount', 0):,.2f}
-- Type: {loan_data.get('loan_type', 'N/A')}
-- Purpose: {loan_data.get('loan_purpose', 'N/A')}
-- Term: {loan_data.get('term_months', 0)} months
-
-Borrower:
-- Name: {borrower_data.get('name', 'N/A')}
-- Credit Score: {borrower_data.get('credit_score', 'N/A')}
-- Years in Business: {borrower_data.get('years_in_business', 'N/A')}
-- Annual Revenue: ${borrower_data.get('annual_revenue', 0):,.2f}
-
-Underwriting Metrics:
-- DSCR: {underwriting_results.get('dscr', 0):.2f}x
-- DSCR (Stressed): {underwriting_results.get('dscr_stressed', 0):.2f}x
-- LTV: {underwriting_results.get('ltv', 0):.1%}
-- Debt Yield: {underwriting_results.get('debt_yield', 0):.1%}
-- Risk Score: {underwriting_results.get('risk_score', 0)}/100
-
-Financial Metrics:
-- Current Ratio: {financial_data.get('current_ratio', 'N/A')}
-- Profit Margin: {financial_data.get('profit_margin', 'N/A')}
-- Debt-to-Equity: {financial_data.get('debt_to_equity', 'N/A')}
-"""
+            data_summary = self._risk_summary(
+                loan_data, borrower_data, financial_data, underwriting_results
+            )
             
             messages = [
-                {"role": "system", "content": self.system_prompts["risk_assessor"]},
+                SYSTEM_MESSAGES["risk_assessor"],
                 {"role": "user", "content": f"""Provide a comprehensive risk assessment for this commercial loan:
 
 {data_summary}
 
-Please provide:
-1. Overall risk rating (Low/Medium/High) with justification
-2. Key risk factors and their severity
-3. Mitigating factors
-4. Recommended risk mitigation strategies
-5. Probability of default estimate
-6. Recommended pricing premium (if any)
+Respond with a JSON object with these fields:
+- risk_rating: "Low", "Medium" or "High"
+- justification: why that rating
+- risk_factors: list of key risk factors and their severity
+- mitigating_factors: list of mitigating factors
+- mitigation_strategies: list of recommended risk mitigation strategies
+- probability_of_default: probability of default estimate
+- pricing_premium: recommended pricing premium, if any
 """}
             ]
             
-            response = self.client.chat.completions.create(
+            content, tokens_used, _ = await self._complete(
+                messages,
                 model="gpt-4.1-mini",
-                messages=messages,
                 temperature=0.2,
-                max_tokens=800
+                max_tokens=600,
+                response_format=JSON_OBJECT
             )
-            
-            assessment = response.choices[0].message.content
+            assessment = RiskAssessment.model_validate(orjson.loads(content))
             
             return {
-                "assessment": assessment,
+                "assessment": assessment.model_dump(),
                 "model": "gpt-4.1-mini",
                 "timestamp": datetime.now().isoformat(),
-                "tokens_used": response.usage.total_tokens
+                "tokens_used": tokens_used
             }
             
         except Exception as e:
@@ -254,7 +513,105 @@ Please provide:
                 "error": True
             }
     
-    def suggest_loan_structure(
+    def _risk_summary(
+        self,
+        loan_data: Dict,
+        borrower_data: Dict,
+        financial_data: Dict,
+        underwriting_results: Dict
+    ) -> str:
+        """Format the deal data shown to the risk assessor"""
+        return RISK_SUMMARY_TEMPLATE.format(
+            loan=ChainMap(loan_data, LOAN_DEFAULTS),
+            borrower=ChainMap(borrower_data, BORROWER_DEFAULTS),
+            uw=ChainMap(underwriting_results, UNDERWRITING_DEFAULTS),
+            fin=ChainMap(financial_data, FINANCIAL_DEFAULTS)
+        )
+    
+    async def assess_risks_batch(self, deals: List[Dict]) -> List[Dict]:
+        """
+        Assess many deals with one LLM request per batch of RISK_BATCH_SIZE
+        
+        Args:
+            deals: List of dicts with deal_id, loan_data, borrower_data,
+                financial_data and underwriting_results
+            
+        Returns:
+            List of assessments (deal_id, rating, factors, mitigants, summary)
+            in the same order as deals
+        """
+        batches = [
+            deals[i:i + RISK_BATCH_SIZE]
+            for i in range(0, len(deals), RISK_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(*[self._assess_risk_batch(batch) for batch in batches])
+        return [assessment for batch in results for assessment in batch]
+    
+    async def _assess_risk_batch(self, deals: List[Dict]) -> List[Dict]:
+        """Assess a single batch of deals in one JSON-mode completion"""
+        summaries = "\n".join(
+            f"=== Deal {deal['deal_id']} ==="
+            + self._risk_summary(
+                deal.get('loan_data', {}),
+                deal.get('borrower_data', {}),
+                deal.get('financial_data', {}),
+                deal.get('underwriting_results', {})
+            )
+            for deal in deals
+        )
+        messages = [
+            SYSTEM_MESSAGES["risk_assessor"],
+            {"role": "user", "content": f"""Provide a risk assessment for each of these commercial loans:
+
+{summaries}
+
+Respond with a JSON object of the form:
+{{"assessments": [{{"deal_id": "...", "rating": "Low|Medium|High", "factors": ["..."], "mitigants": ["..."], "summary": "..."}}]}}
+Include exactly one assessment per deal, using the deal ids given above.
+"""}
+        ]
+        
+        timestamp = datetime.now().isoformat()
+        try:
+            content, _, _ = await self._complete(
+                messages,
+                model="gpt-4.1-mini",
+                temperature=0.2,
+                max_tokens=min(400 * len(deals), 4000),
+                response_format=JSON_OBJECT
+            )
+            by_id = {
+                str(item.get("deal_id")): item
+                for item in orjson.loads(content).get("assessments", [])
+            }
+        except Exception as e:
+            return [
+                {"deal_id": deal["deal_id"], "assessment": f"AI risk assessment unavailable: {str(e)}", "error": True}
+                for deal in deals
+            ]
+        
+        results = []
+        for deal in deals:
+            item = by_id.get(str(deal["deal_id"]))
+            if item is None:
+                results.append({
+                    "deal_id": deal["deal_id"],
+                    "assessment": "AI risk assessment missing from batch response",
+                    "error": True
+                })
+                continue
+            results.append({
+                "deal_id": deal["deal_id"],
+                "rating": item.get("rating"),
+                "factors": item.get("factors", []),
+                "mitigants": item.get("mitigants", []),
+                "summary": item.get("summary"),
+                "model": "gpt-4.1-mini",
+                "timestamp": timestamp
+            })
+        return results
+    
+    async def suggest_loan_structure(
         self,
         loan_data: Dict,
         borrower_data: Dict,
@@ -274,55 +631,43 @@ Please provide:
             Dict with suggested loan structure and terms
         """
         try:
-            data_summary = f"""
-Requested Loan:
-- Amount: ${loan_data.get('loan_amount', 0):,.2f}
-- Type: {loan_data.get('loan_type', 'N/A')}
-- Rate: {loan_data.get('interest_rate', 0):.3%}
-- Term: {loan_data.get('term_months', 0)} months
-
-Borrower Profile:
-- Credit Score: {borrower_data.get('credit_score', 'N/A')}
-- Risk Rating: {underwriting_results.get('risk_rating', 'N/A')}
-
-Underwriting Results:
-- DSCR: {underwriting_results.get('dscr', 0):.2f}x
-- LTV: {underwriting_results.get('ltv', 0):.1%}
-- Risk Score: {underwriting_results.get('risk_score', 0)}/100
-- Recommendation: {underwriting_results.get('recommendation', 'N/A')}
-"""
+            data_summary = STRUCTURE_SUMMARY_TEMPLATE.format(
+                loan=ChainMap(loan_data, LOAN_DEFAULTS),
+                borrower=ChainMap(borrower_data, BORROWER_DEFAULTS),
+                uw=ChainMap(underwriting_results, UNDERWRITING_DEFAULTS)
+            )
             
             messages = [
-                {"role": "system", "content": self.system_prompts["deal_structurer"]},
+                SYSTEM_MESSAGES["deal_structurer"],
                 {"role": "user", "content": f"""Based on this loan request and underwriting results, suggest an optimal loan structure:
 
 {data_summary}
 
-Please provide:
-1. Recommended loan amount (if different from requested)
-2. Suggested interest rate with justification
-3. Optimal term and amortization
-4. Required down payment
-5. Recommended covenants or conditions
-6. Alternative structures to consider
-7. Pricing rationale
+Respond with a JSON object with these fields:
+- recommended_loan_amount: recommended loan amount (if different from requested)
+- interest_rate: suggested interest rate with justification
+- term_and_amortization: optimal term and amortization
+- down_payment: required down payment
+- covenants: list of recommended covenants or conditions
+- alternative_structures: list of alternative structures to consider
+- pricing_rationale: pricing rationale
 """}
             ]
             
-            response = self.client.chat.completions.create(
+            content, tokens_used, _ = await self._complete(
+                messages,
                 model="gpt-4.1-mini",
-                messages=messages,
                 temperature=0.3,
-                max_tokens=800
+                max_tokens=600,
+                response_format=JSON_OBJECT
             )
-            
-            suggestions = response.choices[0].message.content
+            suggestions = LoanStructureSuggestion.model_validate(orjson.loads(content))
             
             return {
-                "suggestions": suggestions,
+                "suggestions": suggestions.model_dump(),
                 "model": "gpt-4.1-mini",
                 "timestamp": datetime.now().isoformat(),
-                "tokens_used": response.usage.total_tokens
+                "tokens_used": tokens_used
             }
             
         except Exception as e:
@@ -331,7 +676,7 @@ Please provide:
                 "error": True
             }
     
-    def generate_underwriting_summary(
+    async def generate_underwriting_summary(
         self,
         loan_data: Dict,
         borrower_data: Dict,
@@ -351,20 +696,16 @@ Please provide:
             Executive summary text
         """
         try:
-            data_summary = f"""
-Loan: ${loan_data.get('loan_amount', 0):,.2f} {loan_data.get('loan_type', 'N/A')}
-Borrower: {borrower_data.get('name', 'N/A')}
-DSCR: {underwriting_results.get('dscr', 0):.2f}x
-LTV: {underwriting_results.get('ltv', 0):.1%}
-Risk Rating: {underwriting_results.get('risk_rating', 'N/A')}
-Recommendation: {underwriting_results.get('recommendation', 'N/A')}
-
-Strengths: {', '.join(underwriting_results.get('strengths', [])[:3])}
-Concerns: {', '.join(underwriting_results.get('yellow_flags', [])[:3])}
-"""
+            data_summary = EXECUTIVE_SUMMARY_TEMPLATE.format(
+                loan=ChainMap(loan_data, LOAN_DEFAULTS),
+                borrower=ChainMap(borrower_data, BORROWER_DEFAULTS),
+                uw=ChainMap(underwriting_results, UNDERWRITING_DEFAULTS),
+                strengths=', '.join(underwriting_results.get('strengths', [])[:3]),
+                concerns=', '.join(underwriting_results.get('yellow_flags', [])[:3])
+            )
             
             messages = [
-                {"role": "system", "content": "You are an expert at writing concise, professional executive summaries for commercial loan underwriting."},
+                SYSTEM_MESSAGES["summary_writer"],
                 {"role": "user", "content": f"""Write a 3-4 sentence executive summary for this loan underwriting:
 
 {data_summary}
@@ -372,52 +713,123 @@ Concerns: {', '.join(underwriting_results.get('yellow_flags', [])[:3])}
 The summary should be suitable for senior management review and clearly state the recommendation with key supporting points."""}
             ]
             
-            response = self.client.chat.completions.create(
+            summary, _, _ = await self._complete(
+                messages,
                 model="gpt-4.1-mini",
-                messages=messages,
                 temperature=0.3,
                 max_tokens=200
             )
             
-            return response.choices[0].message.content
+            return summary
             
         except Exception as e:
             return f"Executive summary generation failed: {str(e)}"
     
+    async def full_review(
+        self,
+        loan_data: Dict,
+        borrower_data: Dict,
+        financial_data: Dict,
+        underwriting_results: Dict,
+        document_text: Optional[str] = None,
+        document_type: Optional[str] = None,
+        market_conditions: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Run the independent AI reviews for a deal concurrently
+        
+        Args:
+            loan_data: Loan request details
+            borrower_data: Borrower information
+            financial_data: Financial analysis
+            underwriting_results: Underwriting calculations
+            document_text: Optional raw document text to analyze
+            document_type: Type of document (required with document_text)
+            market_conditions: Current market data
+            
+        Returns:
+            Dict with risk assessment, structure, document analysis and summary
+        """
+        calls = [
+            self.assess_risk_with_ai(loan_data, borrower_data, financial_data, underwriting_results),
+            self.suggest_loan_structure(loan_data, borrower_data, underwriting_results, market_conditions),
+            self.generate_underwriting_summary(loan_data, borrower_data, underwriting_results)
+        ]
+        if document_text:
+            calls.append(self.analyze_document_with_ai(document_text, document_type or "document"))
+        
+        results = await asyncio.gather(*calls)
+        
+        return {
+            "risk_assessment": results[0],
+            "loan_structure": results[1],
+            "executive_summary": results[2],
+            "document_analysis": results[3] if document_text else None
+        }
+    
+    async def _complete(
+        self,
+        messages: List[Dict],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        cache: bool = False,
+        response_format: Optional[Dict] = None
+    ) -> Tuple[str, int, bool]:
+        """
+        Run a chat completion, optionally through the response cache
+        
+        Only enable cache for prompts free of borrower data and timestamps:
+        the key is a hash of the full request, and the answer is shared by
+        every caller who sends the same prompt.
+        
+        Returns:
+            Tuple of (content, tokens_used, cached)
+        """
+        key = None
+        if cache and temperature <= CACHE_MAX_TEMPERATURE:
+            key = hashlib.sha256(orjson.dumps({
+                "m": model,
+                "t": temperature,
+                "mt": max_tokens,
+                "rf": response_format,
+                "msgs": messages
+            }, option=orjson.OPT_SORT_KEYS)).hexdigest()
+            cached = await AsyncCache.get(CACHE_AI_COMPLETIONS, key)
+            if cached is not None:
+                return cached["content"], 0, True
+        
+        extra = {"response_format": response_format} if response_format else {}
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **extra
+        )
+        content = response.choices[0].message.content
+        tokens_used = response.usage.total_tokens
+        
+        if key:
+            await AsyncCache.set(CACHE_AI_COMPLETIONS, key, {"content": content}, TTL_DAY)
+        
+        return content, tokens_used, False
+    
     def _format_context(self, context: Dict) -> str:
         """Format context dictionary into readable string"""
-        formatted = []
-        for key, value in context.items():
-            if isinstance(value, (int, float)):
-                if key.endswith('_amount') or key.endswith('_value'):
-                    formatted.append(f"{key}: ${value:,.2f}")
-                elif key.endswith('_rate') or key.endswith('_ratio'):
-                    formatted.append(f"{key}: {value:.2%}")
-                else:
-                    formatted.append(f"{key}: {value}")
-            else:
-                formatted.append(f"{key}: {value}")
-        return "\n".join(formatted)
+        return "\n".join(
+            f"{key}: {CONTEXT_FORMATTERS.get(key[key.rfind('_'):], str)(value)}"
+            if isinstance(value, (int, float))
+            else f"{key}: {value}"
+            for key, value in context.items()
+        )
     
     def _fallback_answer(self, question: str) -> Dict:
         """Fallback knowledge base when API is unavailable"""
-        question_lower = question.lower()
-        
-        knowledge_base = {
-            "documents": "For commercial loans, you typically need: 1) Business tax returns (2-3 years), 2) Personal tax returns of guarantors, 3) Business financial statements (P&L, Balance Sheet), 4) Rent roll (for investment properties), 5) Purchase agreement, 6) Property appraisal, 7) Business plan, 8) Personal financial statement (PFS)",
-            "ltv": "Loan-to-Value (LTV) is calculated as: LTV = (Loan Amount / Appraised Property Value) × 100. For example, a $750,000 loan on a $1,000,000 property = 75% LTV. Most commercial lenders require LTV below 80% for owner-occupied and 75% for investment properties.",
-            "dscr": "Debt Service Coverage Ratio (DSCR) measures cash flow available to cover debt payments. Formula: DSCR = Net Operating Income / Annual Debt Service. A DSCR of 1.25 means the property generates 25% more income than needed for debt payments. Most lenders require minimum 1.20-1.25 DSCR.",
-            "credit": "Credit score requirements vary by loan type. For SBA 7(a) loans, minimum is typically 680. For conventional commercial loans, 680-700+ is preferred. For owner-occupied CRE, 700+ is ideal. Lower scores may require higher down payments or personal guarantees."
-        }
-        
-        if "document" in question_lower:
-            answer = knowledge_base["documents"]
-        elif "ltv" in question_lower or "loan-to-value" in question_lower:
-            answer = knowledge_base["ltv"]
-        elif "dscr" in question_lower or "debt service" in question_lower:
-            answer = knowledge_base["dscr"]
-        elif "credit" in question_lower:
-            answer = knowledge_base["credit"]
+        # Highest-priority topic mentioned anywhere in the question
+        topics = [FALLBACK_KEYWORDS[match.lower()] for match in FALLBACK_PATTERN.findall(question)]
+        if topics:
+            answer = FALLBACK_KNOWLEDGE_BASE[min(topics, key=FALLBACK_TOPIC_PRIORITY.index)]
         else:
             answer = "I'm an AI advisor specialized in commercial loan underwriting. I can help with questions about documents, financial ratios, credit requirements, and underwriting standards. Please ask a specific question."
         
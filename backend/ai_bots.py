@@ -11,35 +11,107 @@ Implements priority bots:
 6. Titan - Offer Generator Bot
 """
 
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+import asyncio
+import functools
+from datetime import datetime, timedelta, timezone
+from enum import IntEnum
+from io import StringIO
+from string import Template
+from typing import TYPE_CHECKING, Annotated, AsyncIterator, List, Optional, Dict, Any, Union
+from pydantic import BaseModel, ConfigDict, Field
+import hashlib
+import logging
 import os
-import json
+import re
+import orjson
 
+from caching import MemoryCache, SemanticCache, TTL_DAY
+from database_unified import pg_pool
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TEMPERATURE = 0.7
+
+# Providers reached through an OpenAI-compatible gateway that honour
+# Anthropic-style cache_control blocks on the system prompt
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'openai').lower()
+CACHE_CONTROL_PROVIDERS = frozenset({'anthropic', 'bedrock'})
+SYSTEM_PROMPT_CACHE_TTL = os.getenv('AI_SYSTEM_PROMPT_CACHE_TTL', '1h')
+
+# Semantic response cache settings
+EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('AI_SEMANTIC_CACHE_THRESHOLD', '0.95'))
+SEMANTIC_CACHE_MAX_ENTRIES = 256  # Per (bot, system prompt, context) scope
+UNCACHED_BOTS = frozenset({'aurora_negotiation'})  # Freshness-sensitive
+
+# Local OpenAI-compatible server (e.g. vLLM, llama.cpp) used when no OpenAI key is set
+LOCAL_LLM_URL = os.getenv('LOCAL_LLM_URL')
+LOCAL_LLM_MODEL = os.getenv('LOCAL_LLM_MODEL', 'qwen2.5-3b-instruct')
+
+# Token budget: history is trimmed so prompt + completion fit the context window
+MAX_COMPLETION_TOKENS = 1000
+MAX_INPUT_TOKENS = int(os.getenv('AI_MAX_INPUT_TOKENS', '8192'))
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators per message
+
+# Tokenizer for the configured model; falls back to a character estimate
 try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+    import tiktoken
+    try:
+        _ENCODING = tiktoken.encoding_for_model(os.getenv('OPENAI_MODEL', 'gpt-4'))
+    except KeyError:
+        _ENCODING = tiktoken.get_encoding('o200k_base')
+except Exception:
+    _ENCODING = None
+
+
+# Token counts keyed by a digest of the text, so memoizing long history
+# turns doesn't keep the strings themselves alive
+_token_counts = MemoryCache(max_entries=4096)
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text, memoized so unchanged history is only encoded once"""
+    if _ENCODING is None:
+        return len(text) // 4 + 1
+    
+    key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    count = _token_counts.get(key)
+    if count is None:
+        count = len(_ENCODING.encode(text))
+        _token_counts.set(key, count, TTL_DAY)
+    return count
 
 
 # Pydantic Models
 
+# Bounds enforced by the core validator rather than in Python
+MessageText = Annotated[str, Field(max_length=100_000)]
+
+
 class ChatMessage(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     role: str  # 'user', 'assistant', 'system'
-    content: str
+    content: MessageText
 
 
 class AIBotRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     bot_type: str
-    user_message: str
+    user_message: MessageText
     context_entity_type: Optional[str] = None
     context_entity_id: Optional[str] = None
     conversation_history: Optional[List[ChatMessage]] = None
 
 
 class AIRecommendation(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     bot_type: str
     entity_type: str
     entity_id: str
@@ -48,24 +120,302 @@ class AIRecommendation(BaseModel):
     confidence_score: float
 
 
+# Structured financial statement extraction (Sage)
+
+STRUCTURED_DOCUMENT_TYPES = frozenset({
+    'p&l', 'profit and loss', 'income statement',
+    'balance sheet',
+    'cash flow', 'cash flow statement',
+})
+
+# Label, optional filler, optional "(" for negatives, then the amount
+_AMOUNT = r"[^\d\n(]*?(\()?\$?\s*(-?[\d,]+(?:\.\d+)?)"
+
+FINANCIAL_METRIC_PATTERNS = {
+    'revenue': re.compile(r"(?im)^\s*(?:total\s+)?(?:net\s+)?(?:revenues?|sales)\b" + _AMOUNT),
+    'net_income': re.compile(r"(?im)^\s*net\s+(?:income|profit|earnings)\b" + _AMOUNT),
+    'ebitda': re.compile(r"(?im)^\s*ebitda\b" + _AMOUNT),
+    'total_debt': re.compile(r"(?im)^\s*total\s+(?:debt|liabilities)\b" + _AMOUNT),
+    'total_assets': re.compile(r"(?im)^\s*total\s+assets\b" + _AMOUNT),
+}
+
+FINANCIAL_METRIC_LABELS = {
+    'revenue': 'Revenue',
+    'net_income': 'Net Income',
+    'ebitda': 'EBITDA',
+    'total_debt': 'Total Debt',
+    'total_assets': 'Total Assets',
+}
+
+# Metrics that must be found before the LLM is spared the metrics section
+CORE_FINANCIAL_METRICS = ('revenue', 'net_income', 'total_debt', 'total_assets')
+MIN_CORE_METRICS = 3
+
+
+# Entity context queries, one constant string per entity type so asyncpg's
+# per-connection statement cache reuses the server-side prepared statement
+
+DEAL_CONTEXT_SQL = """
+    SELECT d.*, b.name as borrower_name, b.entity_type
+    FROM deals d
+    LEFT JOIN borrowers b ON d.borrower_id = b.id
+    WHERE d.id = $1
+"""
+
+BORROWER_CONTEXT_SQL = "SELECT * FROM borrowers WHERE id = $1"
+
+ENTITY_CONTEXT_SQL = {
+    'deal': DEAL_CONTEXT_SQL,
+    'borrower': BORROWER_CONTEXT_SQL,
+}
+
+
+# Bot prompts: static prompts are constants, parameterized ones are compiled
+# Templates whose rendered text is memoized for repeated deal shapes
+
+RELATIONSHIP_ANALYSIS_PROMPT = """Analyze this borrower relationship and provide:
+1. Relationship Health Score (0-100)
+2. Engagement Level (Low/Medium/High)
+3. Churn Risk (Low/Medium/High)
+4. Recommended Next Actions
+5. Cross-sell Opportunities
+
+Explain your reasoning for each assessment."""
+
+DEAL_RISK_PROMPT = """Perform a comprehensive risk analysis on this commercial loan:
+
+Provide:
+1. Overall Risk Rating (Low/Medium/High/Very High)
+2. Key Risk Factors (list top 5)
+3. Hidden Risks (non-obvious concerns)
+4. Risk Mitigation Recommendations
+5. Scenario Analysis:
+   - Best case
+   - Base case
+   - Stress case (recession)
+6. Approval Recommendation (Approve/Approve with Conditions/Decline)
+
+Be specific and cite numbers in your analysis."""
+
+CHECKLIST_TEMPLATE = Template("""Generate a comprehensive document checklist for a commercial loan application with these details:
+- Entity Type: $entity_type
+- Deal Type: $deal_type
+- Loan Size: $loan_size
+
+Provide a categorized checklist with:
+1. Personal documents
+2. Business documents
+3. Property documents
+4. Financial documents
+
+For each document, briefly explain why it's needed.""")
+
+TERM_SHEET_TEMPLATE = Template("""Create a professional commercial loan term sheet for:
+
+Deal Details:
+- Loan Amount: $$$loan_amount
+- Property Value: $$$appraised_value
+- Interest Rate: $interest_rate%
+- Amortization: $amortization_months months
+- Deal Type: $deal_type
+- Borrower: $borrower_name
+
+Generate a complete term sheet including:
+1. Loan Summary
+2. Key Terms (rate, amount, term, amortization)
+3. Fees and Costs
+4. Conditions Precedent
+5. Covenants
+6. Competitive Advantages (why this is a great deal)
+7. Next Steps
+
+Make it professional, clear, and compelling.""")
+
+NEGOTIATION_TEMPLATE = Template("""The borrower has requested: "$borrower_request"
+
+Deal context:
+- Loan Amount: $$$loan_amount
+- Current Rate: $interest_rate%
+- LTV: $ltv%
+- Deal Type: $deal_type
+
+Provide:
+1. Assessment of the request (reasonable/aggressive/unreasonable)
+2. Recommended response strategy
+3. Possible concessions (if any)
+4. Trade-offs to propose
+5. Talking points and scripts
+6. Walk-away threshold
+
+Be specific and provide exact wording for the loan officer to use.""")
+
+
+# Upper bound (exclusive) and label for each loan size tier, smallest first
+LOAN_SIZE_TIERS = (
+    (500_000, 'small balance (under $500,000)'),
+    (5_000_000, 'middle market ($500,000 to $5,000,000)'),
+    (float('inf'), 'large ($5,000,000 and over)'),
+)
+
+
+def loan_size_tier(loan_amount: float) -> str:
+    """Size tier a loan amount falls in"""
+    return next(label for bound, label in LOAN_SIZE_TIERS if loan_amount < bound)
+
+
+@functools.lru_cache(maxsize=1024)
+def render_checklist_prompt(entity_type: str, deal_type: str, loan_size: str) -> str:
+    """Render the document checklist prompt"""
+    return CHECKLIST_TEMPLATE.substitute(
+        entity_type=entity_type,
+        deal_type=deal_type,
+        loan_size=loan_size
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def render_term_sheet_prompt(loan_amount, appraised_value, interest_rate, amortization_months, deal_type, borrower_name) -> str:
+    """Render the term sheet prompt"""
+    return TERM_SHEET_TEMPLATE.substitute(
+        loan_amount=f"{loan_amount:,.2f}",
+        appraised_value=f"{appraised_value:,.2f}",
+        interest_rate=interest_rate,
+        amortization_months=amortization_months,
+        deal_type=deal_type,
+        borrower_name=borrower_name
+    )
+
+
+# Score line in Axel's relationship analysis, e.g. "1. Relationship Health Score: 82/100"
+RELATIONSHIP_SCORE_PATTERN = re.compile(
+    r"Relationship Health Score(?:\s*\(0\s*-\s*100\))?\D{0,40}?(\d{1,3})", re.IGNORECASE
+)
+
+
+# Fixed-shape bot contexts, rendered with a single % substitution
+
+DEAL_RISK_CONTEXT_TEMPLATE = (
+    "deal_type: %(deal_type)s\n"
+    "loan_amount: %(loan_amount)s\n"
+    "appraised_value: %(appraised_value)s\n"
+    "ltv: %(ltv)s\n"
+    "interest_rate: %(interest_rate)s\n"
+    "dscr: %(dscr)s\n"
+    "borrower_entity: %(borrower_entity)s\n"
+    "years_in_business: %(years_in_business)s\n"
+    "revenue: %(revenue)s\n"
+    "net_income: %(net_income)s\n"
+    "total_debt: %(total_debt)s"
+)
+
+RELATIONSHIP_CONTEXT_TEMPLATE = (
+    "borrower_name: %(borrower_name)s\n"
+    "total_deals: %(total_deals)s\n"
+    "total_volume: %(total_volume)s\n"
+    "last_deal_date: %(last_deal_date)s\n"
+    "touchpoint_count: %(touchpoint_count)s\n"
+    "last_contact: %(last_contact)s"
+)
+
+
+# Semantic response cache, shared across AIBotService instances (built per request)
+response_cache = SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES)
+
+
+# Background persistence: tasks are referenced here until done so they aren't
+# garbage collected
+_background_tasks: set = set()
+
+
+def _log_exc(future: asyncio.Future) -> None:
+    """Log failures from background work, which no caller awaits"""
+    _background_tasks.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"AI bot background task failed: {future.exception()}")
+
+
+def _spawn(coro) -> asyncio.Task:
+    """Run a pool write in the background without holding up the response"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_log_exc)
+    return task
+
+
+# Shared OpenAI Client
+
+
+def use_local_llm() -> bool:
+    """True when bots should talk to the local model server instead of OpenAI"""
+    return not os.getenv('OPENAI_API_KEY') and bool(LOCAL_LLM_URL)
+
+
+def get_bot_model() -> str:
+    """Model name for the configured backend"""
+    return LOCAL_LLM_MODEL if use_local_llm() else os.getenv('OPENAI_MODEL', 'gpt-4')
+
+
+@functools.cache
+def get_shared_client() -> Optional["AsyncOpenAI"]:
+    """Return the process-wide bot client, or None when no LLM backend is configured.
+    
+    openai (and httpx behind it) is imported on first use, so processes that
+    import this module without chatting never pay for it.
+    """
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not (api_key or LOCAL_LLM_URL):
+        return None
+    try:
+        import httpx
+        from openai import AsyncOpenAI
+    except ImportError:
+        return None
+    
+    # One keep-alive pool shared by all six bots; httpx ignores the client's
+    # limits when a transport is given, so the pool is sized on the transport
+    http_client = httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(
+            retries=2,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+        ),
+        timeout=60
+    )
+    if use_local_llm():
+        # OpenAI-compatible servers ignore the key but the SDK requires one
+        return AsyncOpenAI(base_url=LOCAL_LLM_URL, api_key='sk-local', http_client=http_client)
+    return AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+
 # AI Bot Base Class
 
 class AIBot:
     """Base class for all AI bots"""
     
-    def __init__(self, db, bot_type: str, system_prompt: str):
+    __slots__ = ('db', 'bot_type', 'system_prompt', 'prompt_version', 'system_tokens', 'cache', 'pool', 'model', '_client')
+    
+    def __init__(self, db, bot_type: str, system_prompt: str, cache: Optional[SemanticCache] = None, client=None):
         self.db = db
         self.bot_type = bot_type
         self.system_prompt = system_prompt
-        self.openai_key = os.getenv('OPENAI_API_KEY')
-        self.model = os.getenv('OPENAI_MODEL', 'gpt-4')
-        
-        if OPENAI_AVAILABLE and self.openai_key:
-            self.client = OpenAI(api_key=self.openai_key)
-        else:
-            self.client = None
+        # Content-derived version: changes whenever the prompt text does, which
+        # also retires stale semantic cache entries for the old prompt
+        self.prompt_version = hashlib.sha256(system_prompt.encode()).hexdigest()[:12]
+        self.system_tokens = count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self.cache = cache if cache is not None else response_cache
+        self.pool = pg_pool
+        self.model = get_bot_model()
+        self._client = client
+    
+    @property
+    def client(self) -> Optional["AsyncOpenAI"]:
+        """LLM client, resolved on first use"""
+        if self._client is None:
+            self._client = get_shared_client()
+        return self._client
     
-    def chat(self, user_message: str, conversation_history: List[Dict[str, str]] = None, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def chat(self, user_message: str, conversation_history: List[Dict[str, str]] = None, context: Union[Dict[str, Any], str] = None,
+             temperature: float = DEFAULT_TEMPERATURE, max_tokens: int = MAX_COMPLETION_TOKENS,
+             response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Chat with the bot"""
         if not self.client:
             return {
@@ -75,39 +425,57 @@ class AIBot:
             }
         
         try:
-            # Build messages
-            messages = [{'role': 'system', 'content': self.system_prompt}]
+            context_str = self._context_str(context)
             
-            # Add context if provided
-            if context:
-                context_str = self._format_context(context)
-                messages.append({'role': 'system', 'content': f"Context:\n{context_str}"})
-            
-            # Add conversation history
-            if conversation_history:
-                messages.extend(conversation_history)
+            # Single-turn prompts at default temperature are served from the semantic cache
+            cacheable = (
+                not conversation_history
+                and temperature <= DEFAULT_TEMPERATURE
+                and self.bot_type not in UNCACHED_BOTS
+            )
+            scope = embedding = None
+            if cacheable:
+                scope = self._cache_scope(context_str, max_tokens, response_format)
+                embedding = await self._embed(user_message)
+                cached_response = self.cache.lookup(scope, embedding) if embedding else None
+                if cached_response is not None:
+                    return {
+                        'success': True,
+                        'response': cached_response,
+                        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'cached_tokens': 0},
+                        'cached': True
+                    }
             
-            # Add current user message
-            messages.append({'role': 'user', 'content': user_message})
+            messages = self._build_messages(user_message, conversation_history, context_str)
             
             # Call OpenAI
-            response = self.client.chat.completions.create(
+            extra = {'response_format': response_format} if response_format else {}
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                temperature=0.7,
-                max_tokens=1000
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **extra
             )
             
             assistant_message = response.choices[0].message.content
             
+            if embedding and assistant_message:
+                self.cache.store(scope, embedding, assistant_message)
+            
+            usage = response.usage
+            cached_tokens = self._log_usage(usage)
+            
             return {
                 'success': True,
                 'response': assistant_message,
                 'usage': {
-                    'prompt_tokens': response.usage.prompt_tokens,
-                    'completion_tokens': response.usage.completion_tokens,
-                    'total_tokens': response.usage.total_tokens
-                }
+                    'prompt_tokens': usage.prompt_tokens,
+                    'completion_tokens': usage.completion_tokens,
+                    'total_tokens': usage.total_tokens,
+                    'cached_tokens': cached_tokens
+                },
+                'cached': False
             }
         except Exception as e:
             return {
@@ -115,45 +483,175 @@ class AIBot:
                 'error': str(e)
             }
     
-    def _format_context(self, context: Dict[str, Any]) -> str:
+    async def chat_stream(self, user_message: str, conversation_history: List[Dict[str, str]] = None, context: Union[Dict[str, Any], str] = None,
+                          temperature: float = DEFAULT_TEMPERATURE) -> AsyncIterator[str]:
+        """Chat with the bot, yielding response text as it is generated"""
+        if not self.client:
+            yield f"[Simulated {self.bot_type} response to: {user_message}]"
+            return
+        
+        context_str = self._context_str(context)
+        messages = self._build_messages(user_message, conversation_history, context_str)
+        
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=MAX_COMPLETION_TOKENS,
+            stream=True,
+            stream_options={'include_usage': True}
+        )
+        
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage:
+                # Only the final chunk carries usage
+                self._log_usage(chunk.usage)
+    
+    def _build_messages(self, user_message: str, conversation_history: Optional[List[Dict[str, str]]], context_str: str) -> List[Dict[str, Any]]:
+        """Build chat messages"""
+        # The static system prompt and history form a stable prefix for
+        # provider-side prompt caching, so per-call context rides along with
+        # the final user turn instead of splitting that prefix
+        messages = [{'role': 'system', 'content': self._system_content()}]
+        
+        # Current user message, with context if provided
+        if context_str:
+            user_turn = {'role': 'user', 'content': f"Context:\n{context_str}\n\n{user_message}"}
+        else:
+            user_turn = {'role': 'user', 'content': user_message}
+        
+        # Add as much recent conversation history as the token budget allows
+        if conversation_history:
+            budget = (
+                MAX_INPUT_TOKENS - MAX_COMPLETION_TOKENS - self.system_tokens
+                - count_tokens(user_turn['content']) - MESSAGE_OVERHEAD_TOKENS
+            )
+            messages.extend(self._trim_history(conversation_history, budget))
+        
+        messages.append(user_turn)
+        return messages
+    
+    @staticmethod
+    def _trim_history(history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+        """Return the most recent messages that fit within budget tokens"""
+        used = 0
+        start = len(history)
+        while start > 0:
+            used += count_tokens(history[start - 1].get('content') or '') + MESSAGE_OVERHEAD_TOKENS
+            if used > budget:
+                break
+            start -= 1
+        
+        # Don't open the window on an orphaned assistant reply
+        if start < len(history) and history[start].get('role') == 'assistant':
+            start += 1
+        return history[start:]
+    
+    def _log_usage(self, usage) -> int:
+        """Log the prompt cache hit ratio and return the cached token count"""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+        if usage.prompt_tokens:
+            logger.debug(
+                f"{self.bot_type} prompt cache hit ratio: "
+                f"{cached_tokens / usage.prompt_tokens:.0%} ({cached_tokens}/{usage.prompt_tokens})"
+            )
+        return cached_tokens
+    
+    def _cache_scope(self, context_str: str, max_tokens: int = MAX_COMPLETION_TOKENS,
+                     response_format: Optional[Dict[str, Any]] = None) -> str:
+        """Semantic cache scope: bot type + system prompt version + context hash
+        + output shape, so a JSON-mode answer is never served to a plain-text
+        call (or the reverse) for the same context
+        """
+        context_hash = hashlib.sha256(context_str.encode()).hexdigest()[:16]
+        output_format = orjson.dumps(response_format, option=orjson.OPT_SORT_KEYS).decode() if response_format else 'text'
+        return f"{self.bot_type}:{self.prompt_version}:{context_hash}:{max_tokens}:{output_format}"
+    
+    def _system_blocks(self) -> List[Dict[str, Any]]:
+        """System prompt as a cacheable content block"""
+        return [{
+            'type': 'text',
+            'text': self.system_prompt,
+            'cache_control': {'type': 'ephemeral', 'ttl': SYSTEM_PROMPT_CACHE_TTL}
+        }]
+    
+    def _system_content(self):
+        """System message content for the configured provider.
+        
+        OpenAI caches identical prefixes automatically, so the plain string is
+        sent unchanged every turn; Anthropic/Bedrock need explicit cache_control.
+        """
+        if AI_PROVIDER in CACHE_CONTROL_PROVIDERS:
+            return self._system_blocks()
+        return self.system_prompt
+    
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed text for cache lookup; a failure just means a cache miss"""
+        try:
+            result = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+            return result.data[0].embedding
+        except Exception:
+            return None
+    
+    def _context_str(self, context) -> str:
+        """Accept either a context dict or an already rendered context string"""
+        if not context:
+            return ''
+        if isinstance(context, str):
+            return context
+        return self._format_context(context)
+    
+    @staticmethod
+    def _format_context(context: Dict[str, Any]) -> str:
         """Format context dictionary into readable string"""
-        lines = []
+        buf = StringIO()
+        write = buf.write
         for key, value in context.items():
             if isinstance(value, dict):
-                lines.append(f"{key}:")
+                write(str(key))
+                write(":\n")
                 for k, v in value.items():
-                    lines.append(f"  {k}: {v}")
+                    write("  ")
+                    write(str(k))
+                    write(": ")
+                    write(str(v))
+                    write("\n")
             else:
-                lines.append(f"{key}: {value}")
-        return "\n".join(lines)
+                write(str(key))
+                write(": ")
+                write(str(value))
+                write("\n")
+        # Match the previous join-based output, which had no trailing newline
+        return buf.getvalue()[:-1]
     
-    def save_conversation(self, user_id: str, conversation_history: List[Dict[str, str]], context_entity_type: str = None, context_entity_id: str = None) -> str:
+    async def save_conversation(self, user_id: str, conversation_history: List[Dict[str, str]], context_entity_type: str = None, context_entity_id: str = None) -> str:
         """Save conversation to database"""
         query = """
             INSERT INTO ai_conversations (user_id, bot_type, context_entity_type, context_entity_id, conversation_history)
-            VALUES (%s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5)
             RETURNING id
         """
-        result = self.db.execute_query(
+        return await self.pool.fetchval(
             query,
-            (user_id, self.bot_type, context_entity_type, context_entity_id, json.dumps(conversation_history))
+            user_id, self.bot_type, context_entity_type, context_entity_id, orjson.dumps(conversation_history).decode()
         )
-        return result[0]['id'] if result else None
     
-    def save_recommendation(self, user_id: str, recommendation: AIRecommendation) -> str:
+    async def save_recommendation(self, user_id: str, recommendation: AIRecommendation) -> str:
         """Save recommendation to database"""
         query = """
             INSERT INTO ai_recommendations (user_id, bot_type, entity_type, entity_id, 
                                           recommendation_type, recommendation_data, confidence_score)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
             RETURNING id
         """
-        result = self.db.execute_query(
+        return await self.pool.fetchval(
             query,
-            (user_id, recommendation.bot_type, recommendation.entity_type, recommendation.entity_id,
-             recommendation.recommendation_type, json.dumps(recommendation.recommendation_data), recommendation.confidence_score)
+            user_id, recommendation.bot_type, recommendation.entity_type, recommendation.entity_id,
+            recommendation.recommendation_type, orjson.dumps(recommendation.recommendation_data, default=str).decode(), recommendation.confidence_score
         )
-        return result[0]['id'] if result else None
 
 
 # Specialized Bots
@@ -162,8 +660,9 @@ class CassieOnboardingBot(AIBot):
     """Cassie - Client Onboarding Bot
     Guides borrowers through the application process"""
     
-    def __init__(self, db):
-        system_prompt = """You are Cassie, an expert commercial loan onboarding specialist. Your role is to guide borrowers through the loan application process with patience and clarity.
+    __slots__ = ()
+    
+    SYSTEM_PROMPT = """You are Cassie, an expert commercial loan onboarding specialist. Your role is to guide borrowers through the loan application process with patience and clarity.
 
 Your responsibilities:
 - Explain document requirements based on entity type (LLC, Corporation, Partnership, Sole Proprietor)
@@ -173,45 +672,46 @@ Your responsibilities:
 - Create customized checklists based on loan type
 
 Be friendly, professional, and encouraging. Break down complex requirements into simple steps. Always confirm understanding before moving forward."""
-        super().__init__(db, 'cassie_onboarding', system_prompt)
     
-    def generate_document_checklist(self, deal_data: Dict[str, Any]) -> Dict[str, Any]:
+    def __init__(self, db, client=None):
+        super().__init__(db, 'cassie_onboarding', self.SYSTEM_PROMPT, client=client)
+    
+    async def generate_document_checklist(self, deal_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate customized document checklist"""
-        entity_type = deal_data.get('entity_type', 'LLC')
-        deal_type = deal_data.get('deal_type', 'purchase')
-        loan_amount = deal_data.get('loan_amount', 0)
-        
-        prompt = f"""Generate a comprehensive document checklist for a commercial loan application with these details:
-- Entity Type: {entity_type}
-- Deal Type: {deal_type}
-- Loan Amount: ${loan_amount:,.2f}
-
-Provide a categorized checklist with:
-1. Personal documents
-2. Business documents
-3. Property documents
-4. Financial documents
-
-For each document, briefly explain why it's needed."""
-        
-        response = self.chat(prompt, context=deal_data)
+        response = await self.chat(self.checklist_prompt(deal_data), context=deal_data)
         
         if response['success']:
-            return {
-                'success': True,
-                'checklist': response['response'],
-                'deal_type': deal_type,
-                'entity_type': entity_type
-            }
+            return self.checklist_result(deal_data, response['response'])
         return response
+    
+    @staticmethod
+    def checklist_prompt(deal_data: Dict[str, Any]) -> str:
+        """Prompt for a document checklist"""
+        return render_checklist_prompt(
+            deal_data.get('entity_type', 'LLC'),
+            deal_data.get('deal_type', 'purchase'),
+            # The checklist only depends on the size tier; the exact amount
+            # reaches the model through the deal context
+            loan_size_tier(float(deal_data.get('loan_amount') or 0))
+        )
+    
+    @staticmethod
+    def checklist_result(deal_data: Dict[str, Any], checklist: str) -> Dict[str, Any]:
+        return {
+            'success': True,
+            'checklist': checklist,
+            'deal_type': deal_data.get('deal_type', 'purchase'),
+            'entity_type': deal_data.get('entity_type', 'LLC')
+        }
 
 
 class SageDocumentSummarizer(AIBot):
     """Sage - Document Summarizer Bot
     Summarizes financial documents and extracts key information"""
     
-    def __init__(self, db):
-        system_prompt = """You are Sage, an expert financial document analyst specializing in commercial lending. Your role is to quickly summarize complex financial documents and extract key information.
+    __slots__ = ()
+    
+    SYSTEM_PROMPT = """You are Sage, an expert financial document analyst specializing in commercial lending. Your role is to quickly summarize complex financial documents and extract key information.
 
 Your responsibilities:
 - Summarize financial statements (P&L, Balance Sheet, Cash Flow)
@@ -221,10 +721,16 @@ Your responsibilities:
 - Provide executive summaries for loan committees
 
 Be concise, accurate, and focus on information relevant to loan underwriting. Always cite specific numbers and dates."""
-        super().__init__(db, 'sage_summarizer', system_prompt)
     
-    def summarize_financial_statement(self, document_text: str, document_type: str) -> Dict[str, Any]:
+    def __init__(self, db, client=None):
+        super().__init__(db, 'sage_summarizer', self.SYSTEM_PROMPT, client=client)
+    
+    async def summarize_financial_statement(self, document_text: str, document_type: str) -> Dict[str, Any]:
         """Summarize a financial statement"""
+        metrics = self._try_structured_extract(document_text, document_type)
+        if metrics:
+            return await self._summarize_with_metrics(document_text, document_type, metrics)
+        
         prompt = f"""Analyze this {document_type} and provide:
 1. Executive Summary (2-3 sentences)
 2. Key Financial Metrics
@@ -236,7 +742,7 @@ Document:
 {document_text[:4000]}  # Limit to avoid token limits
 """
         
-        response = self.chat(prompt)
+        response = await self.chat(prompt)
         
         if response['success']:
             return {
@@ -246,11 +752,61 @@ Document:
             }
         return response
     
-    def extract_key_metrics(self, financial_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _summarize_with_metrics(self, document_text: str, document_type: str, metrics: Dict[str, float]) -> Dict[str, Any]:
+        """Summarize with locally extracted metrics, asking the LLM for narrative only"""
+        metrics_section = "Key Financial Metrics\n" + "\n".join(
+            f"- {FINANCIAL_METRIC_LABELS[name]}: ${value:,.2f}" for name, value in metrics.items()
+        )
+        
+        prompt = f"""Analyze this {document_type}. The key metrics have already been extracted:
+{metrics_section}
+
+Provide only:
+1. Executive Summary (2-3 sentences)
+2. Strengths
+3. Concerns/Red Flags
+4. Underwriting Recommendation
+
+Document:
+{document_text[:2400]}
+"""
+        
+        response = await self.chat(prompt)
+        
+        if response['success']:
+            return {
+                'success': True,
+                'summary': f"{metrics_section}\n\n{response['response']}",
+                'document_type': document_type,
+                'metrics': metrics
+            }
+        return response
+    
+    @staticmethod
+    def _try_structured_extract(document_text: str, document_type: str) -> Optional[Dict[str, float]]:
+        """Extract labelled metrics from a standard statement, or None if too few are found"""
+        if document_type.strip().lower() not in STRUCTURED_DOCUMENT_TYPES:
+            return None
+        
+        metrics = {}
+        for name, pattern in FINANCIAL_METRIC_PATTERNS.items():
+            match = pattern.search(document_text)
+            if not match:
+                continue
+            try:
+                value = float(match.group(2).replace(',', ''))
+            except ValueError:
+                continue
+            metrics[name] = -abs(value) if match.group(1) else value
+        
+        found = sum(1 for name in CORE_FINANCIAL_METRICS if name in metrics)
+        return metrics if found >= MIN_CORE_METRICS else None
+    
+    async def extract_key_metrics(self, financial_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract and analyze key financial metrics"""
         prompt = f"""Analyze these financial metrics and provide insights:
 
-{json.dumps(financial_data, indent=2)}
+{orjson.dumps(financial_data, default=str, option=orjson.OPT_INDENT_2).decode()}
 
 Calculate and explain:
 1. Debt Service Coverage Ratio (DSCR)
@@ -261,7 +817,7 @@ Calculate and explain:
 
 Provide specific recommendations for underwriting."""
         
-        response = self.chat(prompt, context=financial_data)
+        response = await self.chat(prompt, context=financial_data)
         
         if response['success']:
             return {
@@ -276,8 +832,9 @@ class AxelRelationshipManager(AIBot):
     """Axel - Relationship Manager Bot
     Tracks and optimizes borrower relationships"""
     
-    def __init__(self, db):
-        system_prompt = """You are Axel, an expert relationship manager for commercial lending. Your role is to maintain and strengthen borrower relationships to maximize lifetime value.
+    __slots__ = ()
+    
+    SYSTEM_PROMPT = """You are Axel, an expert relationship manager for commercial lending. Your role is to maintain and strengthen borrower relationships to maximize lifetime value.
 
 Your responsibilities:
 - Analyze relationship health based on interaction patterns
@@ -287,88 +844,98 @@ Your responsibilities:
 - Predict churn risk
 
 Be proactive, data-driven, and focused on long-term relationship building."""
-        super().__init__(db, 'axel_relationship', system_prompt)
     
-    def calculate_relationship_score(self, borrower_id: str) -> Dict[str, Any]:
+    def __init__(self, db, client=None):
+        super().__init__(db, 'axel_relationship', self.SYSTEM_PROMPT, client=client)
+    
+    async def calculate_relationship_score(self, borrower_id: str) -> Dict[str, Any]:
         """Calculate comprehensive relationship score"""
-        # Get borrower data
-        borrower_query = """
-            SELECT b.*, 
-                   COUNT(DISTINCT d.id) as total_deals,
-                   SUM(d.loan_amount) as total_loan_volume,
-                   MAX(d.created_at) as last_deal_date
-            FROM borrowers b
-            LEFT JOIN deals d ON b.id = d.borrower_id
-            WHERE b.id = %s
-            GROUP BY b.id
+        # Get borrower data and touchpoints in a single round-trip
+        relationship_query = """
+            WITH b AS (
+                SELECT b.*, 
+                       COUNT(DISTINCT d.id) as total_deals,
+                       SUM(d.loan_amount) as total_loan_volume,
+                       MAX(d.created_at) as last_deal_date
+                FROM borrowers b
+                LEFT JOIN deals d ON b.id = d.borrower_id
+                WHERE b.id = $1
+                GROUP BY b.id
+            ), t AS (
+                SELECT COUNT(*) as touchpoint_count,
+                       MAX(occurred_at) as last_contact,
+                       MIN(occurred_at) as first_contact
+                FROM contact_touchpoints
+                WHERE borrower_id = $1
+            )
+            SELECT b.*, t.touchpoint_count, t.last_contact, t.first_contact
+            FROM b CROSS JOIN t
         """
-        borrower_data = self.db.execute_query(borrower_query, (borrower_id,))
+        borrower = await self.pool.fetchrow(relationship_query, borrower_id)
         
-        if not borrower_data:
+        if not borrower:
             return {'success': False, 'error': 'Borrower not found'}
         
-        borrower = borrower_data[0]
-        
-        # Get touchpoints
-        touchpoints_query = """
-            SELECT COUNT(*) as touchpoint_count,
-                   MAX(occurred_at) as last_contact,
-                   MIN(occurred_at) as first_contact
-            FROM contact_touchpoints
-            WHERE borrower_id = %s
-        """
-        touchpoints = self.db.execute_query(touchpoints_query, (borrower_id,))
-        
         context = {
             'borrower_name': borrower.get('name'),
             'total_deals': borrower.get('total_deals', 0),
             'total_volume': borrower.get('total_loan_volume', 0),
             'last_deal_date': str(borrower.get('last_deal_date', '')),
-            'touchpoint_count': touchpoints[0].get('touchpoint_count', 0) if touchpoints else 0,
-            'last_contact': str(touchpoints[0].get('last_contact', '')) if touchpoints else 'Never'
+            'touchpoint_count': borrower.get('touchpoint_count') or 0,
+            'last_contact': str(borrower.get('last_contact')) if borrower.get('last_contact') else 'Never'
         }
         
-        prompt = f"""Analyze this borrower relationship and provide:
-1. Relationship Health Score (0-100)
-2. Engagement Level (Low/Medium/High)
-3. Churn Risk (Low/Medium/High)
-4. Recommended Next Actions
-5. Cross-sell Opportunities
-
-Explain your reasoning for each assessment."""
+        prompt = RELATIONSHIP_ANALYSIS_PROMPT
         
-        response = self.chat(prompt, context=context)
+        response = await self.chat(prompt, context=RELATIONSHIP_CONTEXT_TEMPLATE % context)
         
         if response['success']:
-            # Save relationship score
-            score_query = """
-                INSERT INTO relationship_scores (borrower_id, engagement_score, last_contact_date, score_factors, updated_at)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (borrower_id) DO UPDATE
-                SET engagement_score = EXCLUDED.engagement_score,
-                    last_contact_date = EXCLUDED.last_contact_date,
-                    score_factors = EXCLUDED.score_factors,
-                    updated_at = EXCLUDED.updated_at
-            """
-            self.db.execute_query(
-                score_query,
-                (borrower_id, 75, datetime.now(), json.dumps(context), datetime.now())  # Default score, will be updated
-            )
+            score = self._parse_score(response['response'])
+            
+            # Save relationship score; an unparseable analysis leaves the stored score alone
+            if score is not None:
+                score_query = """
+                    INSERT INTO relationship_scores (borrower_id, engagement_score, last_contact_date, score_factors, updated_at)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (borrower_id) DO UPDATE
+                    SET engagement_score = EXCLUDED.engagement_score,
+                        last_contact_date = EXCLUDED.last_contact_date,
+                        score_factors = EXCLUDED.score_factors,
+                        updated_at = EXCLUDED.updated_at
+                    WHERE relationship_scores.engagement_score IS DISTINCT FROM EXCLUDED.engagement_score
+                """
+                # The columns are TIMESTAMP without zone and hold UTC
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                await self.pool.execute(
+                    score_query,
+                    borrower_id, score, now, orjson.dumps(context, default=str).decode(), now
+                )
             
             return {
                 'success': True,
                 'analysis': response['response'],
+                'score': score,
                 'context': context
             }
         return response
+    
+    @staticmethod
+    def _parse_score(analysis: str) -> Optional[int]:
+        """Pull the 0-100 health score out of the analysis text"""
+        match = RELATIONSHIP_SCORE_PATTERN.search(analysis or '')
+        if not match:
+            return None
+        score = int(match.group(1))
+        return score if 0 <= score <= 100 else None
 
 
 class RemyRiskAnalyzer(AIBot):
     """Remy - Risk Analysis Bot
     Enhanced risk assessment beyond standard underwriting"""
     
-    def __init__(self, db):
-        system_prompt = """You are Remy, an expert risk analyst specializing in commercial real estate lending. Your role is to identify and assess risks that standard underwriting might miss.
+    __slots__ = ()
+    
+    SYSTEM_PROMPT = """You are Remy, an expert risk analyst specializing in commercial real estate lending. Your role is to identify and assess risks that standard underwriting might miss.
 
 Your responsibilities:
 - Analyze deal structure and identify hidden risks
@@ -378,9 +945,11 @@ Your responsibilities:
 - Provide scenario analysis for different economic conditions
 
 Be thorough, conservative, and always explain your risk assessments with specific reasoning."""
-        super().__init__(db, 'remy_risk', system_prompt)
     
-    def analyze_deal_risk(self, deal_id: str) -> Dict[str, Any]:
+    def __init__(self, db, client=None):
+        super().__init__(db, 'remy_risk', self.SYSTEM_PROMPT, client=client)
+    
+    async def analyze_deal_risk(self, deal_id: str) -> Dict[str, Any]:
         """Comprehensive risk analysis of a deal"""
         # Get deal data
         deal_query = """
@@ -389,15 +958,13 @@ Be thorough, conservative, and always explain your risk assessments with specifi
             FROM deals d
             LEFT JOIN borrowers b ON d.borrower_id = b.id
             LEFT JOIN financial_data f ON d.id = f.deal_id
-            WHERE d.id = %s
+            WHERE d.id = $1
         """
-        deal_data = self.db.execute_query(deal_query, (deal_id,))
+        deal = await self.pool.fetchrow(deal_query, deal_id)
         
-        if not deal_data:
+        if not deal:
             return {'success': False, 'error': 'Deal not found'}
         
-        deal = deal_data[0]
-        
         # Calculate key ratios
         ltv = (deal.get('loan_amount', 0) / deal.get('appraised_value', 1)) * 100 if deal.get('appraised_value') else 0
         dscr = (deal.get('net_income', 0) * 12) / (deal.get('loan_amount', 0) * (deal.get('interest_rate', 0) / 100) / 12) if deal.get('loan_amount') else 0
@@ -416,22 +983,9 @@ Be thorough, conservative, and always explain your risk assessments with specifi
             'total_debt': deal.get('total_debt')
         }
         
-        prompt = f"""Perform a comprehensive risk analysis on this commercial loan:
-
-Provide:
-1. Overall Risk Rating (Low/Medium/High/Very High)
-2. Key Risk Factors (list top 5)
-3. Hidden Risks (non-obvious concerns)
-4. Risk Mitigation Recommendations
-5. Scenario Analysis:
-   - Best case
-   - Base case
-   - Stress case (recession)
-6. Approval Recommendation (Approve/Approve with Conditions/Decline)
-
-Be specific and cite numbers in your analysis."""
+        prompt = DEAL_RISK_PROMPT
         
-        response = self.chat(prompt, context=context)
+        response = await self.chat(prompt, context=DEAL_RISK_CONTEXT_TEMPLATE % context)
         
         if response['success']:
             # Save recommendation
@@ -443,7 +997,7 @@ Be specific and cite numbers in your analysis."""
                 recommendation_data=context,
                 confidence_score=0.85
             )
-            self.save_recommendation(deal.get('created_by'), recommendation)
+            _spawn(self.save_recommendation(deal.get('created_by'), recommendation))
             
             return {
                 'success': True,
@@ -457,8 +1011,9 @@ class AuroraNegotiationCoach(AIBot):
     """Aurora - Negotiation Coach Bot
     Real-time negotiation guidance"""
     
-    def __init__(self, db):
-        system_prompt = """You are Aurora, an expert negotiation coach for commercial lending. Your role is to help loan officers navigate negotiations and close deals profitably.
+    __slots__ = ()
+    
+    SYSTEM_PROMPT = """You are Aurora, an expert negotiation coach for commercial lending. Your role is to help loan officers navigate negotiations and close deals profitably.
 
 Your responsibilities:
 - Suggest optimal pricing and terms
@@ -468,29 +1023,21 @@ Your responsibilities:
 - Coach on negotiation tactics
 
 Be strategic, empathetic to both parties, and focused on profitable deal closure."""
-        super().__init__(db, 'aurora_negotiation', system_prompt)
     
-    def suggest_negotiation_strategy(self, deal_data: Dict[str, Any], borrower_request: str) -> Dict[str, Any]:
+    def __init__(self, db, client=None):
+        super().__init__(db, 'aurora_negotiation', self.SYSTEM_PROMPT, client=client)
+    
+    async def suggest_negotiation_strategy(self, deal_data: Dict[str, Any], borrower_request: str) -> Dict[str, Any]:
         """Suggest negotiation strategy for borrower request"""
-        prompt = f"""The borrower has requested: "{borrower_request}"
-
-Deal context:
-- Loan Amount: ${deal_data.get('loan_amount', 0):,.2f}
-- Current Rate: {deal_data.get('interest_rate', 0)}%
-- LTV: {deal_data.get('ltv', 0)}%
-- Deal Type: {deal_data.get('deal_type')}
-
-Provide:
-1. Assessment of the request (reasonable/aggressive/unreasonable)
-2. Recommended response strategy
-3. Possible concessions (if any)
-4. Trade-offs to propose
-5. Talking points and scripts
-6. Walk-away threshold
-
-Be specific and provide exact wording for the loan officer to use."""
+        prompt = NEGOTIATION_TEMPLATE.substitute(
+            borrower_request=borrower_request,
+            loan_amount=f"{deal_data.get('loan_amount') or 0:,.2f}",
+            interest_rate=deal_data.get('interest_rate', 0),
+            ltv=deal_data.get('ltv', 0),
+            deal_type=deal_data.get('deal_type')
+        )
         
-        response = self.chat(prompt, context=deal_data)
+        response = await self.chat(prompt, context=deal_data)
         
         if response['success']:
             return {
@@ -505,8 +1052,9 @@ class TitanOfferGenerator(AIBot):
     """Titan - Offer Generator Bot
     Creates compelling loan proposals"""
     
-    def __init__(self, db):
-        system_prompt = """You are Titan, an expert at crafting compelling commercial loan proposals. Your role is to create professional, persuasive offers that win deals.
+    __slots__ = ()
+    
+    SYSTEM_PROMPT = """You are Titan, an expert at crafting compelling commercial loan proposals. Your role is to create professional, persuasive offers that win deals.
 
 Your responsibilities:
 - Generate complete term sheets
@@ -516,63 +1064,93 @@ Your responsibilities:
 - Create compelling value propositions
 
 Be professional, clear, and persuasive. Focus on benefits, not just features."""
-        super().__init__(db, 'titan_offer', system_prompt)
     
-    def generate_term_sheet(self, deal_data: Dict[str, Any]) -> Dict[str, Any]:
+    def __init__(self, db, client=None):
+        super().__init__(db, 'titan_offer', self.SYSTEM_PROMPT, client=client)
+    
+    async def generate_term_sheet(self, deal_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate professional term sheet"""
-        prompt = f"""Create a professional commercial loan term sheet for:
-
-Deal Details:
-- Loan Amount: ${deal_data.get('loan_amount', 0):,.2f}
-- Property Value: ${deal_data.get('appraised_value', 0):,.2f}
-- Interest Rate: {deal_data.get('interest_rate', 0)}%
-- Amortization: {deal_data.get('amortization_months', 0)} months
-- Deal Type: {deal_data.get('deal_type')}
-- Borrower: {deal_data.get('borrower_name')}
-
-Generate a complete term sheet including:
-1. Loan Summary
-2. Key Terms (rate, amount, term, amortization)
-3. Fees and Costs
-4. Conditions Precedent
-5. Covenants
-6. Competitive Advantages (why this is a great deal)
-7. Next Steps
-
-Make it professional, clear, and compelling."""
-        
-        response = self.chat(prompt, context=deal_data)
+        response = await self.chat(self.term_sheet_prompt(deal_data), context=deal_data)
         
         if response['success']:
-            return {
-                'success': True,
-                'term_sheet': response['response'],
-                'deal_data': deal_data
-            }
+            return self.term_sheet_result(deal_data, response['response'])
         return response
+    
+    @staticmethod
+    def term_sheet_prompt(deal_data: Dict[str, Any]) -> str:
+        """Prompt for a term sheet"""
+        return render_term_sheet_prompt(
+            deal_data.get('loan_amount') or 0,
+            deal_data.get('appraised_value') or 0,
+            deal_data.get('interest_rate', 0),
+            deal_data.get('amortization_months', 0),
+            deal_data.get('deal_type'),
+            deal_data.get('borrower_name')
+        )
+    
+    @staticmethod
+    def term_sheet_result(deal_data: Dict[str, Any], term_sheet: str) -> Dict[str, Any]:
+        return {
+            'success': True,
+            'term_sheet': term_sheet,
+            'deal_data': deal_data
+        }
+
+
+# Fused checklist + term sheet request (one round-trip, one shared deal-context prefix)
+
+ONBOARDING_PACKAGE_FORMAT = {'type': 'json_object'}
+
+ONBOARDING_PACKAGE_INSTRUCTIONS = """Complete both tasks below for the same deal.
+
+Respond with a JSON object with exactly two string fields:
+- "checklist": the full text of the document checklist (Task 1)
+- "term_sheet": the full text of the term sheet (Task 2)"""
 
 
 # AI Bot Service
 
+class BotType(IntEnum):
+    """Index of each bot in AIBotService.bots"""
+    CASSIE = 0
+    SAGE = 1
+    AXEL = 2
+    REMY = 3
+    AURORA = 4
+    TITAN = 5
+
+
+_BOT_INDEX = {
+    'cassie_onboarding': BotType.CASSIE,
+    'sage_summarizer': BotType.SAGE,
+    'axel_relationship': BotType.AXEL,
+    'remy_risk': BotType.REMY,
+    'aurora_negotiation': BotType.AURORA,
+    'titan_offer': BotType.TITAN,
+}
+
+
 class AIBotService:
     """Service to manage all AI bots"""
     
     def __init__(self, db):
         self.db = db
-        self.bots = {
-            'cassie_onboarding': CassieOnboardingBot(db),
-            'sage_summarizer': SageDocumentSummarizer(db),
-            'axel_relationship': AxelRelationshipManager(db),
-            'remy_risk': RemyRiskAnalyzer(db),
-            'aurora_negotiation': AuroraNegotiationCoach(db),
-            'titan_offer': TitanOfferGenerator(db)
-        }
+        # Ordered by BotType
+        self.bots = (
+            CassieOnboardingBot(db),
+            SageDocumentSummarizer(db),
+            AxelRelationshipManager(db),
+            RemyRiskAnalyzer(db),
+            AuroraNegotiationCoach(db),
+            TitanOfferGenerator(db)
+        )
     
     def get_bot(self, bot_type: str) -> Optional[AIBot]:
         """Get bot by type"""
-        return self.bots.get(bot_type)
+        index = _BOT_INDEX.get(bot_type)
+        return self.bots[index] if index is not None else None
     
-    def chat_with_bot(self, request: AIBotRequest, user_id: str) -> Dict[str, Any]:
+    async def chat_with_bot(self, request: AIBotRequest, user_id: str) -> Dict[str, Any]:
         """Chat with specified bot"""
         bot = self.get_bot(request.bot_type)
         if not bot:
@@ -581,38 +1159,86 @@ class AIBotService:
         # Get context if entity provided
         context = None
         if request.context_entity_type and request.context_entity_id:
-            context = self._get_entity_context(request.context_entity_type, request.context_entity_id)
+            context = await self._get_entity_context(request.context_entity_type, request.context_entity_id)
         
         # Convert conversation history
-        history = [{'role': msg.role, 'content': msg.content} for msg in request.conversation_history] if request.conversation_history else []
+        history = request.model_dump(include={'conversation_history'})['conversation_history'] or []
         
         # Chat
-        response = bot.chat(request.user_message, history, context)
+        response = await bot.chat(request.user_message, history, context)
         
-        # Save conversation
+        # Save conversation in the background so the response isn't held up
         if response.get('success'):
             history.append({'role': 'user', 'content': request.user_message})
             history.append({'role': 'assistant', 'content': response['response']})
-            bot.save_conversation(user_id, history, request.context_entity_type, request.context_entity_id)
+            _spawn(bot.save_conversation(user_id, history, request.context_entity_type, request.context_entity_id))
         
         return response
     
-    def _get_entity_context(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
+    async def chat_with_bot_stream(self, request: AIBotRequest, user_id: str) -> AsyncIterator[str]:
+        """Chat with specified bot, yielding response text as it is generated"""
+        bot = self.get_bot(request.bot_type)
+        if not bot:
+            raise ValueError(f'Bot type {request.bot_type} not found')
+        
+        # Get context if entity provided
+        context = None
+        if request.context_entity_type and request.context_entity_id:
+            context = await self._get_entity_context(request.context_entity_type, request.context_entity_id)
+        
+        # Convert conversation history
+        history = request.model_dump(include={'conversation_history'})['conversation_history'] or []
+        
+        # Stream to the caller while keeping a copy for persistence
+        buffer = StringIO()
+        async for text in bot.chat_stream(request.user_message, history, context):
+            buffer.write(text)
+            yield text
+        
+        # Save conversation without holding up the end of the stream
+        history.append({'role': 'user', 'content': request.user_message})
+        history.append({'role': 'assistant', 'content': buffer.getvalue()})
+        _spawn(bot.save_conversation(user_id, history, request.context_entity_type, request.context_entity_id))
+    
+    async def generate_onboarding_package(self, deal_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate the document checklist and term sheet for a deal in a single LLM call"""
+        cassie = self.get_bot('cassie_onboarding')
+        titan = self.get_bot('titan_offer')
+        
+        prompt = (
+            f"{ONBOARDING_PACKAGE_INSTRUCTIONS}\n\n"
+            f"Task 1:\n{cassie.checklist_prompt(deal_data)}\n\n"
+            f"Task 2:\n{titan.term_sheet_prompt(deal_data)}"
+        )
+        response = await titan.chat(
+            prompt,
+            context=deal_data,
+            max_tokens=2 * MAX_COMPLETION_TOKENS,
+            response_format=ONBOARDING_PACKAGE_FORMAT
+        )
+        if not response['success']:
+            return response
+        
+        try:
+            package = orjson.loads(response['response'])
+            checklist, term_sheet = package['checklist'], package['term_sheet']
+        except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+            return {'success': False, 'error': f'Malformed onboarding package: {e}'}
+        
+        return {
+            'success': True,
+            'checklist': cassie.checklist_result(deal_data, checklist),
+            'term_sheet': titan.term_sheet_result(deal_data, term_sheet),
+            'usage': response.get('usage')
+        }
+    
+    async def _get_entity_context(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
         """Get context data for entity"""
-        if entity_type == 'deal':
-            query = """
-                SELECT d.*, b.name as borrower_name, b.entity_type
-                FROM deals d
-                LEFT JOIN borrowers b ON d.borrower_id = b.id
-                WHERE d.id = %s
-            """
-            result = self.db.execute_query(query, (entity_id,))
-            return result[0] if result else {}
-        elif entity_type == 'borrower':
-            query = "SELECT * FROM borrowers WHERE id = %s"
-            result = self.db.execute_query(query, (entity_id,))
-            return result[0] if result else {}
-        return {}
+        query = ENTITY_CONTEXT_SQL.get(entity_type)
+        if query is None:
+            return {}
+        row = await pg_pool.fetchrow(query, entity_id)
+        return dict(row) if row else {}
     
     def get_recommendations(self, user_id: str, entity_type: str = None, entity_id: str = None, status: str = 'pending') -> List[Dict[str, Any]]:
         """Get AI recommendations for user"""
@@ -3,324 +3,536 @@ Extended AI Bots - 10 Additional Specialized Bots
 High-priority bots for commercial lending automation
 """
 
-from typing import Dict, List, Optional
-import openai
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+from functools import partial, wraps
+import asyncio
+import hashlib
+import httpx
+import json
 import os
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from caching import AsyncCache, SemanticCache, CACHE_AI_COMPLETIONS, TTL_DAY
+
+# Near-duplicate prompts at or above this cosine similarity reuse a response
+SEMANTIC_CACHE_THRESHOLD = 0.92
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Embedding lookups arriving within this window share one API call
+EMBED_BATCH_WINDOW_SECONDS = 0.02
+
+_semantic_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD)
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_client() -> AsyncOpenAI:
+    """Return the module-wide OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        # One keep-alive pool reused by every extended bot
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+    return _client
+
+
+class EmbeddingBatcher:
+    """
+    Buffers embedding requests for a short window and sends them as one call
+    
+    The embeddings endpoint accepts a list of inputs, so a burst of cache
+    lookups costs a single round trip. Identical texts within a window share
+    one input slot.
+    """
+    
+    def __init__(self, window: float = EMBED_BATCH_WINDOW_SECONDS):
+        self.window = window
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    async def embed(self, text: str) -> List[float]:
+        """Queue text for the next batch and wait for its embedding"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(text, []).append(future)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+    
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+        
+        texts = list(batch)
+        try:
+            result = await get_client().embeddings.create(model=EMBEDDING_MODEL, input=texts)
+        except Exception as exc:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            return
+        
+        for item in result.data:
+            for future in batch[texts[item.index]]:
+                if not future.done():
+                    future.set_result(item.embedding)
+
+
+_embedding_batcher = EmbeddingBatcher()
+
+
+async def _embed(text: str) -> Optional[List[float]]:
+    """Embed text for cache lookup; a failure just means a cache miss"""
+    try:
+        return await _embedding_batcher.embed(text)
+    except Exception:
+        return None
+
+
+def _cache_scope(bot_id: str, model: str, context: Dict, org_id: Optional[str] = None) -> str:
+    """
+    Responses are only shared between calls to the same bot, prompt and model,
+    for the same organization and the same context
+    
+    The context carries borrower and deal data, so two callers whose messages
+    match must never be served each other's answers unless that data matches too.
+    """
+    context_hash = hashlib.sha256(
+        json.dumps(context, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return f"bot:{PROMPT_CACHE_KEYS[bot_id]}:{model}:{org_id or '-'}:{context_hash}"
+
+
+async def _cache_lookup(scope: str, user_content: str, message: str) -> Tuple[Optional[str], str, Optional[List[float]]]:
+    """Return (cached response, exact key, embedding) for a bot prompt"""
+    exact_key = hashlib.sha256(f"{scope}:{user_content}".encode()).hexdigest()
+    
+    cached = await AsyncCache.get(CACHE_AI_COMPLETIONS, exact_key)
+    if cached is not None:
+        return cached, exact_key, None
+    
+    # Only the message is embedded; the context is already pinned by the scope
+    embedding = await _embed(message)
+    if embedding:
+        cached = _semantic_cache.lookup(scope, embedding)
+    return cached, exact_key, embedding
+
+
+async def _cache_store(scope: str, exact_key: str, embedding: Optional[List[float]], result: str):
+    """Store a completed response in both cache tiers"""
+    await AsyncCache.set(CACHE_AI_COMPLETIONS, exact_key, result, TTL_DAY)
+    if embedding:
+        _semantic_cache.store(scope, embedding, result)
+
+
+def semantic_cache(func):
+    """
+    Two-tier response cache for bot completions
+    
+    Exact repeats are served from the shared AsyncCache (Redis when enabled);
+    near-duplicate messages within the same scope (bot, system prompt, model,
+    organization and context) are matched by embedding similarity. Only
+    successful completions are stored, since failures raise before reaching
+    the cache.
+    """
+    @wraps(func)
+    async def wrapper(bot_id: str, system_prompt: str, user_content: str, *, scope: str, message: str, **params):
+        cached, exact_key, embedding = await _cache_lookup(scope, user_content, message)
+        if cached is not None:
+            return cached
+        
+        result = await func(bot_id, system_prompt, user_content, **params)
+        await _cache_store(scope, exact_key, embedding, result)
+        return result
+    return wrapper
+
+
+async def _stream_completion(bot_id: str, system_prompt: str, user_content: str, model: str, temperature: float, max_tokens: int) -> AsyncIterator[str]:
+    """Run a bot chat completion, yielding response text as it is generated"""
+    # The system prompt is always the first message and identical across
+    # calls, so the provider can reuse its cached prefix; everything variable
+    # starts at the user message
+    response = await get_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+        extra_body={"prompt_cache_key": PROMPT_CACHE_KEYS[bot_id]}
+    )
+    async for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+@semantic_cache
+async def _complete(bot_id: str, system_prompt: str, user_content: str, model: str, temperature: float, max_tokens: int) -> str:
+    """Run a bot chat completion and return the full response text"""
+    return "".join([
+        text async for text in _stream_completion(bot_id, system_prompt, user_content, model, temperature, max_tokens)
+    ])
+
+
+class BotSpec(NamedTuple):
+    """Per-bot completion settings"""
+    model: str
+    system_prompt: str
+    temperature: float
+    max_tokens: int
+    context_label: str
+    fallback_text: str
+    premium_model: Optional[str] = None  # Opt-in for high-stakes calls
+
+
+BOT_SPECS: Dict[str, BotSpec] = {
+    "finley": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Finley, an expert financial forecasting bot for commercial lending.
+
+Your capabilities:
+- Create detailed financial projections (3-5 years)
+- Analyze cash flow trends and seasonality
+- Forecast revenue growth and profitability
+- Model different scenarios (best case, base case, worst case)
+- Calculate key financial ratios and metrics
+- Identify potential financial risks
+- Recommend optimal loan structures based on projections
+
+Provide data-driven, actionable financial forecasts that help lenders make informed decisions.""",
+        temperature=0.7,
+        max_tokens=800,
+        context_label="Deal Context",
+        fallback_text="I'm Finley, your financial forecasting specialist. In production, I would provide detailed financial projections, cash flow analysis, and scenario modeling to help you assess the borrower's future financial performance."
+    ),
+    "chatty": BotSpec(
+        model="gpt-3.5-turbo",
+        system_prompt="""You are Chatty, a friendly 24/7 customer support bot for UnderwritePro.
+
+Your capabilities:
+- Answer questions about the platform and features
+- Guide users through workflows and processes
+- Troubleshoot common issues
+- Provide documentation and help resources
+- Escalate complex issues to human support
+- Collect feedback and feature requests
+- Maintain a helpful, professional tone
+
+Be patient, clear, and always aim to resolve user issues quickly.""",
+        temperature=0.8,
+        max_tokens=500,
+        context_label="User Context",
+        fallback_text="Hi! I'm Chatty, your 24/7 support assistant. I'm here to help you with any questions about UnderwritePro. How can I assist you today?"
+    ),
+    "pipeline": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Pipeline, an expert deal flow optimization bot.
+
+Your capabilities:
+- Analyze pipeline health and bottlenecks
+- Identify deals at risk of stalling
+- Recommend actions to move deals forward
+- Optimize resource allocation across deals
+- Predict deal closure probability
+- Suggest pipeline improvements
+- Track key pipeline metrics (velocity, conversion rates)
+
+Help lenders maximize their pipeline efficiency and close more deals faster.""",
+        temperature=0.7,
+        max_tokens=700,
+        context_label="Pipeline Data",
+        fallback_text="I'm Pipeline, your deal flow optimization specialist. I analyze your pipeline to identify bottlenecks, predict outcomes, and recommend actions to accelerate deal closures."
+    ),
+    "pricer": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Pricer, an expert loan pricing and rate optimization bot.
+
+Your capabilities:
+- Calculate optimal interest rates based on risk
+- Analyze market rates and competitive positioning
+- Recommend fee structures
+- Model different pricing scenarios
+- Calculate yield and return metrics
+- Assess pricing impact on deal profitability
+- Provide rate justifications for borrowers
+
+Help lenders price loans competitively while maximizing profitability.""",
+        temperature=0.6,
+        max_tokens=700,
+        context_label="Deal Context",
+        fallback_text="I'm Pricer, your loan pricing specialist. I help you determine optimal interest rates, fee structures, and pricing strategies that balance competitiveness with profitability."
+    ),
+    "leadgen": BotSpec(
+        model="gpt-3.5-turbo",
+        system_prompt="""You are Leadgen, an expert lead qualification bot.
+
+Your capabilities:
+- Score and qualify incoming leads
+- Ask qualifying questions
+- Assess borrower readiness
+- Identify high-potential opportunities
+- Recommend next steps for each lead
+- Prioritize leads for follow-up
+- Detect red flags early
+
+Help lenders focus on the most promising opportunities.""",
+        temperature=0.7,
+        max_tokens=600,
+        context_label="Lead Data",
+        fallback_text="I'm Leadgen, your lead qualification specialist. I help you quickly assess and prioritize incoming leads so you can focus on the opportunities most likely to close."
+    ),
+    "closer": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Closer, an expert deal closing assistant.
+
+Your capabilities:
+- Create closing checklists
+- Track closing conditions
+- Identify potential closing delays
+- Coordinate with stakeholders
+- Prepare closing documents
+- Manage last-minute issues
+- Ensure smooth closings
+
+Help lenders navigate the final mile and close deals successfully.""",
+        temperature=0.7,
+        max_tokens=700,
+        context_label="Deal Context",
+        fallback_text="I'm Closer, your deal closing specialist. I help you manage the final stages of the deal, coordinate closing conditions, and ensure smooth, successful closings."
+    ),
+    "compliance": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Compliance, an expert regulatory compliance bot for commercial lending.
+
+Your capabilities:
+- Check deals for regulatory compliance
+- Identify required disclosures and documentation
+- Flag potential compliance issues
+- Provide guidance on lending regulations
+- Track compliance requirements by loan type
+- Generate compliance checklists
+- Stay updated on regulatory changes
+
+Help lenders maintain full regulatory compliance and avoid violations.""",
+        temperature=0.5,
+        max_tokens=800,
+        context_label="Deal Context",
+        fallback_text="I'm Compliance, your regulatory compliance specialist. I help ensure your deals meet all regulatory requirements and identify potential compliance issues before they become problems.",
+        premium_model="gpt-4o"
+    ),
+    "collateral": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Collateral, an expert collateral valuation bot.
+
+Your capabilities:
+- Analyze collateral types and values
+- Assess collateral quality and marketability
+- Calculate loan-to-value (LTV) ratios
+- Identify collateral risks
+- Recommend collateral requirements
+- Track collateral documentation
+- Monitor collateral value changes
+
+Help lenders properly assess and secure collateral for loans.""",
+        temperature=0.6,
+        max_tokens=700,
+        context_label="Collateral Data",
+        fallback_text="I'm Collateral, your collateral valuation specialist. I help you assess collateral value, calculate LTV ratios, and ensure proper collateral coverage for your loans."
+    ),
+    "credit": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Credit, an expert credit analysis bot.
+
+Your capabilities:
+- Analyze borrower credit profiles
+- Calculate credit scores and ratings
+- Assess creditworthiness
+- Identify credit risks and red flags
+- Compare credit across borrowers
+- Recommend credit enhancements
+- Track credit trends over time
+
+Help lenders make informed credit decisions based on comprehensive analysis.""",
+        temperature=0.6,
+        max_tokens=700,
+        context_label="Borrower Data",
+        fallback_text="I'm Credit, your credit analysis specialist. I provide comprehensive credit assessments, identify risks, and help you make sound credit decisions.",
+        premium_model="gpt-4o"
+    ),
+    "market": BotSpec(
+        model="gpt-4o-mini",
+        system_prompt="""You are Market, an expert market intelligence bot.
+
+Your capabilities:
+- Analyze market trends and conditions
+- Provide competitive intelligence
+- Track industry-specific insights
+- Identify market opportunities
+- Assess economic indicators
+- Forecast market changes
+- Recommend market positioning strategies
+
+Help lenders stay ahead of market trends and make strategic decisions.""",
+        temperature=0.7,
+        max_tokens=700,
+        context_label="Market Data",
+        fallback_text="I'm Market, your market intelligence specialist. I provide insights on market trends, competitive dynamics, and opportunities to help you make strategic lending decisions."
+    )
+}
+
+# Hashed once at import: routes each bot's calls to the same provider prefix
+# cache and scopes our own response cache to the exact prompt text
+PROMPT_CACHE_KEYS: Dict[str, str] = {
+    bot_id: f"{bot_id}-{hashlib.sha256(spec.system_prompt.encode()).hexdigest()[:16]}"
+    for bot_id, spec in BOT_SPECS.items()
+}
+
+
+# Completions currently running, keyed by bot and prompt, so identical
+# concurrent requests wait on one call instead of issuing their own
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def _release(key: str, task: asyncio.Task) -> None:
+    """Drop a finished completion, retrieving any error no caller stayed to await"""
+    _inflight.pop(key, None)
+    if not task.cancelled():
+        task.exception()
+
+
+def _select_model(spec: BotSpec, premium: bool) -> str:
+    """Use the bot's premium model when requested and available"""
+    return spec.premium_model if premium and spec.premium_model else spec.model
+
+
+async def _invoke(bot_id: str, context: Dict, message: str, premium: bool = False, org_id: Optional[str] = None) -> str:
+    """Run an extended bot, falling back to its canned reply if the completion fails"""
+    spec = BOT_SPECS[bot_id]
+    model = _select_model(spec, premium)
+    user_content = f"{spec.context_label}: {context}\n\nUser: {message}"
+    scope = _cache_scope(bot_id, model, context, org_id)
+    key = hashlib.sha256(f"{scope}:{user_content}".encode()).hexdigest()
+    
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_complete(
+            bot_id, spec.system_prompt, user_content,
+            scope=scope, message=message,
+            model=model, temperature=spec.temperature, max_tokens=spec.max_tokens
+        ))
+        _inflight[key] = task
+        task.add_done_callback(partial(_release, key))
+    
+    try:
+        # Shielded so one caller disconnecting doesn't cancel the others
+        return await asyncio.shield(task)
+    except Exception:
+        return spec.fallback_text
+
+
+async def _invoke_stream(bot_id: str, context: Dict, message: str, premium: bool = False, org_id: Optional[str] = None) -> AsyncIterator[str]:
+    """Run an extended bot, yielding its response as it is generated"""
+    spec = BOT_SPECS[bot_id]
+    model = _select_model(spec, premium)
+    user_content = f"{spec.context_label}: {context}\n\nUser: {message}"
+    scope = _cache_scope(bot_id, model, context, org_id)
+    
+    chunks: List[str] = []
+    try:
+        cached, exact_key, embedding = await _cache_lookup(scope, user_content, message)
+        if cached is not None:
+            yield cached
+            return
+        
+        async for text in _stream_completion(
+            bot_id, spec.system_prompt, user_content,
+            model=model, temperature=spec.temperature, max_tokens=spec.max_tokens
+        ):
+            chunks.append(text)
+            yield text
+    except Exception:
+        # Mid-stream failures end the response; nothing partial is cached
+        if not chunks:
+            yield spec.fallback_text
+        return
+    
+    await _cache_store(scope, exact_key, embedding, "".join(chunks))
+
+
+class ExtendedBotRequest(BaseModel):
+    """Request model for extended bot interaction"""
+    message: str
+    context: Dict = {}
+    premium: bool = False  # Use the premium model where the bot offers one
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 class ExtendedAIBots:
     """Additional specialized AI bots for lending operations"""
     
     # Bot 7: Finley - Financial Forecasting Bot
     @staticmethod
-    def finley_forecast(deal_context: Dict, message: str) -> str:
+    async def finley_forecast(deal_context: Dict, message: str) -> str:
         """Financial forecasting and projection analysis"""
-        system_prompt = """You are Finley, an expert financial forecasting bot for commercial lending.
-        
-        Your capabilities:
-        - Create detailed financial projections (3-5 years)
-        - Analyze cash flow trends and seasonality
-        - Forecast revenue growth and profitability
-        - Model different scenarios (best case, base case, worst case)
-        - Calculate key financial ratios and metrics
-        - Identify potential financial risks
-        - Recommend optimal loan structures based on projections
-        
-        Provide data-driven, actionable financial forecasts that help lenders make informed decisions."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Deal Context: {deal_context}\n\nUser: {message}"}
-                ],
-                temperature=0.7,
-                max_tokens=800
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Finley, your financial forecasting specialist. In production, I would provide detailed financial projections, cash flow analysis, and scenario modeling to help you assess the borrower's future financial performance."
+        return await _invoke("finley", deal_context, message)
     
     # Bot 8: Chatty - 24/7 Customer Support Bot
     @staticmethod
-    def chatty_support(user_context: Dict, message: str) -> str:
+    async def chatty_support(user_context: Dict, message: str) -> str:
         """24/7 customer support and general inquiries"""
-        system_prompt = """You are Chatty, a friendly 24/7 customer support bot for UnderwritePro.
-        
-        Your capabilities:
-        - Answer questions about the platform and features
-        - Guide users through workflows and processes
-        - Troubleshoot common issues
-        - Provide documentation and help resources
-        - Escalate complex issues to human support
-        - Collect feedback and feature requests
-        - Maintain a helpful, professional tone
-        
-        Be patient, clear, and always aim to resolve user issues quickly."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User Context: {user_context}\n\nUser: {message}"}
-                ],
-                temperature=0.8,
-                max_tokens=500
-            )
-            return response.choices[0].message.content
-        except:
-            return "Hi! I'm Chatty, your 24/7 support assistant. I'm here to help you with any questions about UnderwritePro. How can I assist you today?"
+        return await _invoke("chatty", user_context, message)
     
     # Bot 9: Pipeline - Deal Flow Optimizer
     @staticmethod
-    def pipeline_optimize(pipeline_data: Dict, message: str) -> str:
+    async def pipeline_optimize(pipeline_data: Dict, message: str) -> str:
         """Pipeline optimization and deal flow management"""
-        system_prompt = """You are Pipeline, an expert deal flow optimization bot.
-        
-        Your capabilities:
-        - Analyze pipeline health and bottlenecks
-        - Identify deals at risk of stalling
-        - Recommend actions to move deals forward
-        - Optimize resource allocation across deals
-        - Predict deal closure probability
-        - Suggest pipeline improvements
-        - Track key pipeline metrics (velocity, conversion rates)
-        
-        Help lenders maximize their pipeline efficiency and close more deals faster."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Pipeline Data: {pipeline_data}\n\nUser: {message}"}
-                ],
-                temperature=0.7,
-                max_tokens=700
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Pipeline, your deal flow optimization specialist. I analyze your pipeline to identify bottlenecks, predict outcomes, and recommend actions to accelerate deal closures."
+        return await _invoke("pipeline", pipeline_data, message)
     
     # Bot 10: Pricer - Rate & Pricing Bot
     @staticmethod
-    def pricer_analyze(deal_context: Dict, message: str) -> str:
+    async def pricer_analyze(deal_context: Dict, message: str) -> str:
         """Loan pricing and rate optimization"""
-        system_prompt = """You are Pricer, an expert loan pricing and rate optimization bot.
-        
-        Your capabilities:
-        - Calculate optimal interest rates based on risk
-        - Analyze market rates and competitive positioning
-        - Recommend fee structures
-        - Model different pricing scenarios
-        - Calculate yield and return metrics
-        - Assess pricing impact on deal profitability
-        - Provide rate justifications for borrowers
-        
-        Help lenders price loans competitively while maximizing profitability."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Deal Context: {deal_context}\n\nUser: {message}"}
-                ],
-                temperature=0.6,
-                max_tokens=700
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Pricer, your loan pricing specialist. I help you determine optimal interest rates, fee structures, and pricing strategies that balance competitiveness with profitability."
+        return await _invoke("pricer", deal_context, message)
     
     # Bot 11: Leadgen - Lead Qualification Bot
     @staticmethod
-    def leadgen_qualify(lead_data: Dict, message: str) -> str:
+    async def leadgen_qualify(lead_data: Dict, message: str) -> str:
         """Lead qualification and scoring"""
-        system_prompt = """You are Leadgen, an expert lead qualification bot.
-        
-        Your capabilities:
-        - Score and qualify incoming leads
-        - Ask qualifying questions
-        - Assess borrower readiness
-        - Identify high-potential opportunities
-        - Recommend next steps for each lead
-        - Prioritize leads for follow-up
-        - Detect red flags early
-        
-        Help lenders focus on the most promising opportunities."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Lead Data: {lead_data}\n\nUser: {message}"}
-                ],
-                temperature=0.7,
-                max_tokens=600
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Leadgen, your lead qualification specialist. I help you quickly assess and prioritize incoming leads so you can focus on the opportunities most likely to close."
+        return await _invoke("leadgen", lead_data, message)
     
     # Bot 12: Closer - Deal Closing Assistant
     @staticmethod
-    def closer_assist(deal_context: Dict, message: str) -> str:
+    async def closer_assist(deal_context: Dict, message: str) -> str:
         """Deal closing assistance and final mile support"""
-        system_prompt = """You are Closer, an expert deal closing assistant.
-        
-        Your capabilities:
-        - Create closing checklists
-        - Track closing conditions
-        - Identify potential closing delays
-        - Coordinate with stakeholders
-        - Prepare closing documents
-        - Manage last-minute issues
-        - Ensure smooth closings
-        
-        Help lenders navigate the final mile and close deals successfully."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Deal Context: {deal_context}\n\nUser: {message}"}
-                ],
-                temperature=0.7,
-                max_tokens=700
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Closer, your deal closing specialist. I help you manage the final stages of the deal, coordinate closing conditions, and ensure smooth, successful closings."
+        return await _invoke("closer", deal_context, message)
     
     # Bot 13: Compliance - Regulatory Compliance Bot
     @staticmethod
-    def compliance_check(deal_context: Dict, message: str) -> str:
+    async def compliance_check(deal_context: Dict, message: str, premium: bool = False) -> str:
         """Regulatory compliance checking and guidance"""
-        system_prompt = """You are Compliance, an expert regulatory compliance bot for commercial lending.
-        
-        Your capabilities:
-        - Check deals for regulatory compliance
-        - Identify required disclosures and documentation
-        - Flag potential compliance issues
-        - Provide guidance on lending regulations
-        - Track compliance requirements by loan type
-        - Generate compliance checklists
-        - Stay updated on regulatory changes
-        
-        Help lenders maintain full regulatory compliance and avoid violations."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Deal Context: {deal_context}\n\nUser: {message}"}
-                ],
-                temperature=0.5,
-                max_tokens=800
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Compliance, your regulatory compliance specialist. I help ensure your deals meet all regulatory requirements and identify potential compliance issues before they become problems."
+        return await _invoke("compliance", deal_context, message, premium)
     
     # Bot 14: Collateral - Collateral Valuation Bot
     @staticmethod
-    def collateral_value(collateral_data: Dict, message: str) -> str:
+    async def collateral_value(collateral_data: Dict, message: str) -> str:
         """Collateral analysis and valuation"""
-        system_prompt = """You are Collateral, an expert collateral valuation bot.
-        
-        Your capabilities:
-        - Analyze collateral types and values
-        - Assess collateral quality and marketability
-        - Calculate loan-to-value (LTV) ratios
-        - Identify collateral risks
-        - Recommend collateral requirements
-        - Track collateral documentation
-        - Monitor collateral value changes
-        
-        Help lenders properly assess and secure collateral for loans."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Collateral Data: {collateral_data}\n\nUser: {message}"}
-                ],
-                temperature=0.6,
-                max_tokens=700
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Collateral, your collateral valuation specialist. I help you assess collateral value, calculate LTV ratios, and ensure proper collateral coverage for your loans."
+        return await _invoke("collateral", collateral_data, message)
     
     # Bot 15: Credit - Credit Analysis Bot
     @staticmethod
-    def credit_analyze(borrower_data: Dict, message: str) -> str:
+    async def credit_analyze(borrower_data: Dict, message: str, premium: bool = False) -> str:
         """Credit analysis and scoring"""
-        system_prompt = """You are Credit, an expert credit analysis bot.
-        
-        Your capabilities:
-        - Analyze borrower credit profiles
-        - Calculate credit scores and ratings
-        - Assess creditworthiness
-        - Identify credit risks and red flags
-        - Compare credit across borrowers
-        - Recommend credit enhancements
-        - Track credit trends over time
-        
-        Help lenders make informed credit decisions based on comprehensive analysis."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Borrower Data: {borrower_data}\n\nUser: {message}"}
-                ],
-                temperature=0.6,
-                max_tokens=700
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Credit, your credit analysis specialist. I provide comprehensive credit assessments, identify risks, and help you make sound credit decisions."
+        return await _invoke("credit", borrower_data, message, premium)
     
     # Bot 16: Market - Market Intelligence Bot
     @staticmethod
-    def market_insights(market_data: Dict, message: str) -> str:
+    async def market_insights(market_data: Dict, message: str) -> str:
         """Market intelligence and competitive analysis"""
-        system_prompt = """You are Market, an expert market intelligence bot.
-        
-        Your capabilities:
-        - Analyze market trends and conditions
-        - Provide competitive intelligence
-        - Track industry-specific insights
-        - Identify market opportunities
-        - Assess economic indicators
-        - Forecast market changes
-        - Recommend market positioning strategies
-        
-        Help lenders stay ahead of market trends and make strategic decisions."""
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Market Data: {market_data}\n\nUser: {message}"}
-                ],
-                temperature=0.7,
-                max_tokens=700
-            )
-            return response.choices[0].message.content
-        except:
-            return "I'm Market, your market intelligence specialist. I provide insights on market trends, competitive dynamics, and opportunities to help you make strategic lending decisions."
+        return await _invoke("market", market_data, message)
 
 # Bot Registry
 EXTENDED_BOTS = {
@@ -328,60 +540,70 @@ EXTENDED_BOTS = {
         "name": "Finley",
         "role": "Financial Forecasting",
         "description": "Creates financial projections and scenario analysis",
-        "function": ExtendedAIBots.finley_forecast
+        "function": partial(_invoke, "finley"),
+        "stream": partial(_invoke_stream, "finley")
     },
     "chatty": {
         "name": "Chatty",
         "role": "24/7 Support",
         "description": "Provides customer support and platform guidance",
-        "function": ExtendedAIBots.chatty_support
+        "function": partial(_invoke, "chatty"),
+        "stream": partial(_invoke_stream, "chatty")
     },
     "pipeline": {
         "name": "Pipeline",
         "role": "Deal Flow Optimizer",
         "description": "Optimizes pipeline and accelerates deal closures",
-        "function": ExtendedAIBots.pipeline_optimize
+        "function": partial(_invoke, "pipeline"),
+        "stream": partial(_invoke_stream, "pipeline")
     },
     "pricer": {
         "name": "Pricer",
         "role": "Rate & Pricing",
         "description": "Optimizes loan pricing and rate structures",
-        "function": ExtendedAIBots.pricer_analyze
+        "function": partial(_invoke, "pricer"),
+        "stream": partial(_invoke_stream, "pricer")
     },
     "leadgen": {
         "name": "Leadgen",
         "role": "Lead Qualification",
         "description": "Qualifies and scores incoming leads",
-        "function": ExtendedAIBots.leadgen_qualify
+        "function": partial(_invoke, "leadgen"),
+        "stream": partial(_invoke_stream, "leadgen")
     },
     "closer": {
         "name": "Closer",
         "role": "Deal Closing",
         "description": "Manages final mile and closing process",
-        "function": ExtendedAIBots.closer_assist
+        "function": partial(_invoke, "closer"),
+        "stream": partial(_invoke_stream, "closer")
     },
     "compliance": {
         "name": "Compliance",
         "role": "Regulatory Compliance",
         "description": "Ensures regulatory compliance and identifies issues",
-        "function": ExtendedAIBots.compliance_check
+        "function": partial(_invoke, "compliance"),
+        "stream": partial(_invoke_stream, "compliance")
     },
     "collateral": {
         "name": "Collateral",
         "role": "Collateral Valuation",
         "description": "Analyzes and values loan collateral",
-        "function": ExtendedAIBots.collateral_value
+        "function": partial(_invoke, "collateral"),
+        "stream": partial(_invoke_stream, "collateral")
     },
     "credit": {
         "name": "Credit",
         "role": "Credit Analysis",
         "description": "Performs comprehensive credit assessments",
-        "function": ExtendedAIBots.credit_analyze
+        "function": partial(_invoke, "credit"),
+        "stream": partial(_invoke_stream, "credit")
     },
     "market": {
         "name": "Market",
         "role": "Market Intelligence",
         "description": "Provides market insights and competitive analysis",
-        "function": ExtendedAIBots.market_insights
+        "function": partial(_invoke, "market"),
+        "stream": partial(_invoke_stream, "market")
     }
 }
@@ -3,11 +3,17 @@ Caching module for UnderwritePro SaaS
 Provides Redis-based caching with fallback to in-memory cache
 """
 import os
-import json
+import fnmatch
+import inspect
 import logging
-from typing import Optional, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
 from functools import wraps
 import hashlib
+import numpy as np
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -15,19 +21,144 @@ logger = logging.getLogger(__name__)
 REDIS_ENABLED = os.getenv("REDIS_ENABLED", "false").lower() == "true"
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-# Try to import Redis
+# Pooled connections: keepalive plus periodic health checks so connections
+# dropped by load balancers are replaced before a request trips over them,
+# and short timeouts so a dead Redis can't stall startup or requests
+REDIS_POOL_OPTIONS = {
+    "socket_keepalive": True,
+    "health_check_interval": 30,
+    "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "64")),
+    "retry_on_timeout": True,
+    "socket_connect_timeout": 2,
+    "socket_timeout": 2,
+}
+
+# Seconds to wait before probing Redis again after a failed connection
+REDIS_REPROBE_SECONDS = 5
+
 try:
     import redis
-    redis_client = redis.from_url(REDIS_URL, decode_responses=True) if REDIS_ENABLED else None
-    if redis_client:
-        redis_client.ping()
+    import redis.asyncio as aioredis
+except ImportError as e:
+    if REDIS_ENABLED:
+        logger.warning(f"Redis not available, using in-memory cache: {e}")
+    redis = aioredis = None
+
+# Clients are created and probed on first use rather than at import, so
+# importing this module costs no round trip, and a Redis that was down is
+# picked up again once it answers a later probe
+_redis = None
+_redis_healthy = False
+_redis_next_probe = 0.0
+_async_redis = None
+_async_redis_healthy = False
+_async_redis_next_probe = 0.0
+
+def get_redis():
+    """Return the Redis client if it is reachable, otherwise None (memory fallback)"""
+    global _redis, _redis_healthy, _redis_next_probe
+    if not REDIS_ENABLED or redis is None:
+        return None
+    if _redis_healthy:
+        return _redis
+    if time.monotonic() < _redis_next_probe:
+        return None
+    
+    try:
+        if _redis is None:
+            # Values are stored as raw orjson bytes, so responses are left undecoded
+            _redis = redis.from_url(REDIS_URL, **REDIS_POOL_OPTIONS)
+        _redis.ping()
+        _redis_healthy = True
         logger.info("Redis cache enabled")
-except Exception as e:
-    logger.warning(f"Redis not available, using in-memory cache: {e}")
-    redis_client = None
+        return _redis
+    except redis.RedisError as e:
+        _redis_next_probe = time.monotonic() + REDIS_REPROBE_SECONDS
+        logger.warning(f"Redis not available, using in-memory cache: {e}")
+        return None
+
+async def get_async_redis():
+    """Non-blocking counterpart of get_redis for coroutines"""
+    global _async_redis, _async_redis_healthy, _async_redis_next_probe
+    if not REDIS_ENABLED or aioredis is None:
+        return None
+    if _async_redis_healthy:
+        return _async_redis
+    if time.monotonic() < _async_redis_next_probe:
+        return None
+    
+    try:
+        if _async_redis is None:
+            _async_redis = aioredis.from_url(REDIS_URL, **REDIS_POOL_OPTIONS)
+        await _async_redis.ping()
+        _async_redis_healthy = True
+        return _async_redis
+    except redis.RedisError as e:
+        _async_redis_next_probe = time.monotonic() + REDIS_REPROBE_SECONDS
+        logger.warning(f"Async Redis not available, using in-memory cache: {e}")
+        return None
+
+# Upper bound on in-memory fallback entries before least recently used eviction
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "10000"))
+
+class MemoryCache:
+    """
+    Bounded in-memory LRU cache with per-entry TTL
+    
+    Entries are (expire_ts, value) on the time.monotonic() clock, kept in
+    recency order so eviction of the least recently used key is O(1).
+    """
+    
+    def __init__(self, max_entries: int = MEMORY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return a live value, evicting it if expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expire_ts, value = entry
+            if expire_ts < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def keys(self) -> List[str]:
+        """Snapshot of current keys, safe to iterate while deleting"""
+        with self._lock:
+            return list(self._entries)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
 # In-memory cache fallback
-memory_cache = {}
+memory_cache = MemoryCache()
+
+# Both backends hold orjson bytes, so a cached value comes back as a fresh
+# copy with the same types whether or not Redis is up
+def _dumps(value: Any) -> bytes:
+    """Encode a cache value for storage"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+def _loads(value: Optional[bytes]) -> Optional[Any]:
+    """Decode a stored cache value, passing misses through as None"""
+    return orjson.loads(value) if value is not None else None
 
 class Cache:
     """Cache manager with Redis and in-memory fallback"""
@@ -43,12 +174,13 @@ class Cache:
         cache_key = Cache._get_key(prefix, key)
         
         try:
+            redis_client = get_redis()
             if redis_client:
                 value = redis_client.get(cache_key)
-                if value:
-                    return json.loads(value)
+                if value is not None:
+                    return orjson.loads(value)
             else:
-                return memory_cache.get(cache_key)
+                return _loads(memory_cache.get(cache_key))
         except Exception as e:
             logger.error(f"Cache get error: {e}")
         
@@ -60,24 +192,57 @@ class Cache:
         cache_key = Cache._get_key(prefix, key)
         
         try:
+            redis_client = get_redis()
             if redis_client:
-                redis_client.setex(cache_key, ttl, json.dumps(value))
+                redis_client.setex(cache_key, ttl, _dumps(value))
             else:
-                memory_cache[cache_key] = value
-                # Note: In-memory cache doesn't support TTL
+                memory_cache.set(cache_key, _dumps(value), ttl)
         except Exception as e:
             logger.error(f"Cache set error: {e}")
     
+    @staticmethod
+    def mget(prefix: str, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one round trip; misses come back as None"""
+        cache_keys = [Cache._get_key(prefix, key) for key in keys]
+        
+        try:
+            redis_client = get_redis()
+            if redis_client:
+                values = redis_client.mget(cache_keys) if cache_keys else []
+                return [_loads(value) for value in values]
+            return [_loads(memory_cache.get(cache_key)) for cache_key in cache_keys]
+        except Exception as e:
+            logger.error(f"Cache mget error: {e}")
+        
+        return [None] * len(keys)
+    
+    @staticmethod
+    def mset(prefix: str, items: Dict[str, Any], ttl: int = 300):
+        """Set several values with the same TTL in one round trip"""
+        try:
+            redis_client = get_redis()
+            if redis_client:
+                pipe = redis_client.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipe.setex(Cache._get_key(prefix, key), ttl, _dumps(value))
+                pipe.execute()
+            else:
+                for key, value in items.items():
+                    memory_cache.set(Cache._get_key(prefix, key), _dumps(value), ttl)
+        except Exception as e:
+            logger.error(f"Cache mset error: {e}")
+    
     @staticmethod
     def delete(prefix: str, key: str):
         """Delete value from cache"""
         cache_key = Cache._get_key(prefix, key)
         
         try:
+            redis_client = get_redis()
             if redis_client:
                 redis_client.delete(cache_key)
             else:
-                memory_cache.pop(cache_key, None)
+                memory_cache.pop(cache_key)
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
     
@@ -85,25 +250,45 @@ class Cache:
     def delete_pattern(prefix: str, pattern: str):
         """Delete all keys matching pattern"""
         try:
+            redis_client = get_redis()
             if redis_client:
-                keys = redis_client.keys(f"{prefix}:{pattern}")
-                if keys:
-                    redis_client.delete(*keys)
+                # SCAN walks the keyspace incrementally and UNLINK frees memory
+                # in the background, so neither blocks the server like KEYS/DEL
+                pipe = redis_client.pipeline(transaction=False)
+                for key in redis_client.scan_iter(match=f"{prefix}:{pattern}", count=500):
+                    pipe.unlink(key)
+                pipe.execute()
             else:
-                # In-memory cache pattern deletion
+                # In-memory cache pattern deletion over a snapshot of the keys
                 keys_to_delete = [
                     k for k in memory_cache.keys()
-                    if k.startswith(f"{prefix}:")
+                    if fnmatch.fnmatchcase(k, f"{prefix}:{pattern}")
                 ]
                 for key in keys_to_delete:
-                    memory_cache.pop(key, None)
+                    memory_cache.pop(key)
         except Exception as e:
             logger.error(f"Cache delete pattern error: {e}")
     
+    @staticmethod
+    def ping() -> str:
+        """Report cache backend health: healthy, unavailable or memory"""
+        if not REDIS_ENABLED or redis is None:
+            return "memory"
+        redis_client = get_redis()
+        if not redis_client:
+            return "unavailable"
+        try:
+            redis_client.ping()
+            return "healthy"
+        except Exception as e:
+            logger.error(f"Cache ping error: {e}")
+            return "unavailable"
+    
     @staticmethod
     def clear():
         """Clear all cache"""
         try:
+            redis_client = get_redis()
             if redis_client:
                 redis_client.flushdb()
             else:
@@ -111,21 +296,248 @@ class Cache:
         except Exception as e:
             logger.error(f"Cache clear error: {e}")
 
+class AsyncCache:
+    """
+    Coroutine counterpart of Cache for async code paths
+    
+    Uses redis.asyncio so lookups don't block the event loop; shares key
+    format, encoding and the in-memory fallback with Cache.
+    """
+    
+    @staticmethod
+    async def get(prefix: str, key: str) -> Optional[Any]:
+        """Get value from cache"""
+        cache_key = Cache._get_key(prefix, key)
+        
+        try:
+            async_redis_client = await get_async_redis()
+            if async_redis_client:
+                value = await async_redis_client.get(cache_key)
+                if value is not None:
+                    return orjson.loads(value)
+            else:
+                return _loads(memory_cache.get(cache_key))
+        except Exception as e:
+            logger.error(f"Cache get error: {e}")
+        
+        return None
+    
+    @staticmethod
+    async def set(prefix: str, key: str, value: Any, ttl: int = 300):
+        """Set value in cache with TTL in seconds"""
+        cache_key = Cache._get_key(prefix, key)
+        
+        try:
+            async_redis_client = await get_async_redis()
+            if async_redis_client:
+                await async_redis_client.setex(cache_key, ttl, _dumps(value))
+            else:
+                memory_cache.set(cache_key, _dumps(value), ttl)
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+    
+    @staticmethod
+    async def mget(prefix: str, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one round trip; misses come back as None"""
+        cache_keys = [Cache._get_key(prefix, key) for key in keys]
+        
+        try:
+            async_redis_client = await get_async_redis()
+            if async_redis_client:
+                values = await async_redis_client.mget(cache_keys) if cache_keys else []
+                return [_loads(value) for value in values]
+            return [_loads(memory_cache.get(cache_key)) for cache_key in cache_keys]
+        except Exception as e:
+            logger.error(f"Cache mget error: {e}")
+        
+        return [None] * len(keys)
+    
+    @staticmethod
+    async def delete(prefix: str, key: str):
+        """Delete value from cache"""
+        cache_key = Cache._get_key(prefix, key)
+        
+        try:
+            async_redis_client = await get_async_redis()
+            if async_redis_client:
+                await async_redis_client.unlink(cache_key)
+            else:
+                memory_cache.pop(cache_key)
+        except Exception as e:
+            logger.error(f"Cache delete error: {e}")
+    
+    @staticmethod
+    async def incr(prefix: str, key: str, ttl: int = 86400) -> Optional[int]:
+        """Atomically bump a counter and refresh its TTL; returns the new value"""
+        cache_key = Cache._get_key(prefix, key)
+        
+        try:
+            async_redis_client = await get_async_redis()
+            if async_redis_client:
+                pipe = async_redis_client.pipeline(transaction=True)
+                pipe.incr(cache_key)
+                pipe.expire(cache_key, ttl)
+                value, _ = await pipe.execute()
+                return value
+            value = (_loads(memory_cache.get(cache_key)) or 0) + 1
+            memory_cache.set(cache_key, _dumps(value), ttl)
+            return value
+        except Exception as e:
+            logger.error(f"Cache incr error: {e}")
+        
+        return None
+    
+    @staticmethod
+    async def delete_pattern(prefix: str, pattern: str):
+        """Delete all keys matching pattern"""
+        try:
+            async_redis_client = await get_async_redis()
+            if async_redis_client:
+                pipe = async_redis_client.pipeline(transaction=False)
+                async for key in async_redis_client.scan_iter(match=f"{prefix}:{pattern}", count=500):
+                    pipe.unlink(key)
+                await pipe.execute()
+            else:
+                for key in memory_cache.keys():
+                    if fnmatch.fnmatchcase(key, f"{prefix}:{pattern}"):
+                        memory_cache.pop(key)
+        except Exception as e:
+            logger.error(f"Cache delete pattern error: {e}")
+    
+    @staticmethod
+    async def ping() -> str:
+        """Report cache backend health without blocking: healthy, unavailable or memory"""
+        if not REDIS_ENABLED or aioredis is None:
+            return "memory"
+        async_redis_client = await get_async_redis()
+        if not async_redis_client:
+            return "unavailable"
+        try:
+            await async_redis_client.ping()
+            return "healthy"
+        except Exception as e:
+            logger.error(f"Cache ping error: {e}")
+            return "unavailable"
+
+class SemanticCache:
+    """
+    In-process semantic cache of LLM responses
+    
+    Entries are grouped by an exact-match scope (e.g. bot + system prompt +
+    context hash) so only the message embeddings need comparing. Each scope
+    keeps its L2-normalized vectors as rows of one float32 matrix, so a
+    lookup is a single matrix-vector product done in native code rather
+    than a Python loop.
+    
+    Entries live only in this process: scopes are keyed by prompt version
+    and context, so they go stale on every prompt change and are cheap to
+    rebuild, and a miss costs one completion.
+    """
+    
+    def __init__(self, threshold: float = 0.95, max_entries: int = 256):
+        self.threshold = threshold
+        self.max_entries = max_entries  # Per scope
+        self._scopes: Dict[str, "_VectorScope"] = {}
+    
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array)) or 1.0
+        return array / norm
+    
+    def lookup(self, scope: str, vector: List[float]) -> Optional[str]:
+        """Return the most similar cached response above the threshold"""
+        entries = self._scopes.get(scope)
+        if entries is None:
+            return None
+        
+        score, response = entries.best_match(self._normalize(vector))
+        return response if score >= self.threshold else None
+    
+    def store(self, scope: str, vector: List[float], response: str) -> None:
+        """Insert a response, evicting the oldest entry in the scope when full"""
+        query = self._normalize(vector)
+        entries = self._scopes.get(scope)
+        if entries is None or entries.dimensions != query.shape[0]:
+            entries = self._scopes[scope] = _VectorScope(self.max_entries, query.shape[0])
+        entries.append(query, response)
+    
+    def clear(self) -> None:
+        self._scopes.clear()
+
+class _VectorScope:
+    """Fixed-size ring of normalized vectors and their responses"""
+    
+    __slots__ = ("vectors", "responses", "count", "next_row")
+    
+    def __init__(self, max_entries: int, dimensions: int):
+        self.vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self.responses: List[Optional[str]] = [None] * max_entries
+        self.count = 0
+        self.next_row = 0
+    
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+    
+    def append(self, vector: np.ndarray, response: str) -> None:
+        # Overwrites the oldest row once the ring is full
+        self.vectors[self.next_row] = vector
+        self.responses[self.next_row] = response
+        self.next_row = (self.next_row + 1) % len(self.responses)
+        self.count = min(self.count + 1, len(self.responses))
+    
+    def best_match(self, query: np.ndarray) -> Tuple[float, Optional[str]]:
+        if self.count == 0 or query.shape[0] != self.dimensions:
+            return 0.0, None
+        scores = self.vectors[:self.count] @ query
+        best = int(scores.argmax())
+        return float(scores[best]), self.responses[best]
+
+def _make_key(args: tuple, kwargs: dict) -> str:
+    """Hash call arguments into a cache key, independent of dict key order"""
+    # Canonical orjson bytes; objects orjson can't encode fall back to str()
+    key_bytes = orjson.dumps(
+        (args, sorted(kwargs.items())),
+        default=str,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    )
+    return hashlib.blake2b(key_bytes, digest_size=16).hexdigest()
+
 def cache_response(prefix: str, ttl: int = 300):
     """
     Decorator to cache function responses
     
+    Works on both plain and async functions; coroutines use AsyncCache.
+    
     Usage:
         @cache_response("deals", ttl=600)
         def get_deal(deal_id: str):
             ...
     """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                
+                cached = await AsyncCache.get(prefix, key)
+                if cached is not None:
+                    logger.debug(f"Cache hit: {prefix}:{key}")
+                    return cached
+                
+                result = await func(*args, **kwargs)
+                
+                await AsyncCache.set(prefix, key, result, ttl)
+                logger.debug(f"Cache miss: {prefix}:{key}")
+                
+                return result
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key from function arguments
-            key_parts = [str(arg) for arg in args] + [f"{k}={v}" for k, v in sorted(kwargs.items())]
-            key = hashlib.md5(":".join(key_parts).encode()).hexdigest()
+            key = _make_key(args, kwargs)
             
             # Try to get from cache
             cached = Cache.get(prefix, key)
@@ -160,9 +572,13 @@ CACHE_USERS = "users"
 CACHE_ORGANIZATIONS = "orgs"
 CACHE_UNDERWRITING = "underwriting"
 CACHE_DOCUMENTS = "documents"
+CACHE_AI_COMPLETIONS = "ai_completions"
+CACHE_CALENDAR_SLOTS = "calendar_slots"
+CACHE_CALENDAR_SLOTS_GEN = "calendar_slots_gen"
 
 # Default TTLs (in seconds)
 TTL_SHORT = 60          # 1 minute
 TTL_MEDIUM = 300        # 5 minutes
 TTL_LONG = 1800         # 30 minutes
 TTL_VERY_LONG = 3600    # 1 hour
+TTL_DAY = 86400         # 24 hours
@@ -3,22 +3,50 @@ Calendar API Routes
 RESTful endpoints for calendar and scheduling management
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, model_validator
 from typing import List, Optional
 from datetime import datetime
+from functools import lru_cache
 from auth import get_current_user
-from calendar_service import CalendarService
+from calendar_service import (
+    CalendarService, ConcurrentModificationError, InvalidTimeRangeError, SlotUnavailableError
+)
 
-router = APIRouter(prefix="/api/calendar", tags=["Calendar"])
+# orjson encodes the datetimes the service returns natively, in C
+router = APIRouter(prefix="/api/calendar", tags=["Calendar"], default_response_class=ORJSONResponse)
+
+@lru_cache(maxsize=1)
+def get_calendar_service() -> CalendarService:
+    """Shared CalendarService, created on first use instead of per request"""
+    return CalendarService()
 
 # Request Models
+class TimeRangeModel(BaseModel):
+    """Rejects ranges that end before they start with a 422, not a database error"""
+    
+    @model_validator(mode='after')
+    def check_time_range(self):
+        start_time, end_time = self.start_time, self.end_time
+        if start_time is None or end_time is None:
+            return self
+        if (start_time.tzinfo is None) != (end_time.tzinfo is None):
+            raise ValueError("start_time and end_time must both include a timezone or both omit it")
+        if end_time <= start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
+
 class CreateCalendarRequest(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra='ignore')
+    
     name: str
     timezone: str = "UTC"
     settings: Optional[dict] = None
 
-class CreateAppointmentRequest(BaseModel):
+class CreateAppointmentRequest(TimeRangeModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra='ignore')
+    
     calendar_id: str
     title: str
     start_time: datetime
@@ -29,7 +57,9 @@ class CreateAppointmentRequest(BaseModel):
     deal_id: Optional[str] = None
     borrower_id: Optional[str] = None
 
-class UpdateAppointmentRequest(BaseModel):
+class UpdateAppointmentRequest(TimeRangeModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra='ignore')
+    
     title: Optional[str] = None
     description: Optional[str] = None
     start_time: Optional[datetime] = None
@@ -37,21 +67,29 @@ class UpdateAppointmentRequest(BaseModel):
     location: Optional[str] = None
     status: Optional[str] = None
     attendees: Optional[List[str]] = None
+    version: Optional[int] = None  # Version last read; rejects the update if it changed since
 
-class CheckAvailabilityRequest(BaseModel):
+class CheckAvailabilityRequest(TimeRangeModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra='ignore')
+    
     calendar_id: str
     start_time: datetime
     end_time: datetime
 
+class MarkRemindersSentRequest(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra='ignore')
+    
+    reminder_ids: List[str]
+
 # Calendar Endpoints
 @router.post("/calendars")
 async def create_calendar(
     request: CreateCalendarRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Create a new calendar"""
-    service = CalendarService()
-    calendar = service.create_calendar(
+    calendar = await service.create_calendar(
         user_id=current_user["id"],
         name=request.name,
         timezone=request.timezone,
@@ -60,52 +98,47 @@ async def create_calendar(
     return calendar
 
 @router.get("/calendars")
-async def get_calendars(current_user: dict = Depends(get_current_user)):
+async def get_calendars(
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
+):
     """Get all calendars for the current user"""
-    service = CalendarService()
-    calendars = service.get_user_calendars(current_user["id"])
+    calendars = await service.get_user_calendars(current_user["id"])
     return {"calendars": calendars}
 
 @router.get("/calendars/{calendar_id}/stats")
 async def get_calendar_stats(
     calendar_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Get statistics for a calendar"""
-    service = CalendarService()
-    stats = service.get_calendar_stats(calendar_id)
+    stats = await service.get_calendar_stats(calendar_id)
     return stats
 
 # Appointment Endpoints
 @router.post("/appointments")
 async def create_appointment(
     request: CreateAppointmentRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Create a new appointment"""
-    service = CalendarService()
-    
-    # Check availability
-    is_available = service.check_availability(
-        request.calendar_id,
-        request.start_time,
-        request.end_time
-    )
-    
-    if not is_available:
+    try:
+        appointment = await service.create_appointment_if_available(
+            calendar_id=request.calendar_id,
+            title=request.title,
+            start_time=request.start_time,
+            end_time=request.end_time,
+            attendees=request.attendees,
+            location=request.location,
+            description=request.description,
+            deal_id=request.deal_id,
+            borrower_id=request.borrower_id
+        )
+    except SlotUnavailableError:
         raise HTTPException(status_code=409, detail="Time slot not available")
     
-    appointment = service.create_appointment(
-        calendar_id=request.calendar_id,
-        title=request.title,
-        start_time=request.start_time,
-        end_time=request.end_time,
-        attendees=request.attendees,
-        location=request.location,
-        description=request.description,
-        deal_id=request.deal_id,
-        borrower_id=request.borrower_id
-    )
     return appointment
 
 @router.get("/appointments")
@@ -113,21 +146,21 @@ async def get_appointments(
     calendar_id: str,
     start_date: datetime,
     end_date: datetime,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Get appointments for a calendar within a date range"""
-    service = CalendarService()
-    appointments = service.get_appointments(calendar_id, start_date, end_date)
+    appointments = await service.get_appointments(calendar_id, start_date, end_date)
     return {"appointments": appointments}
 
 @router.get("/appointments/{appointment_id}")
 async def get_appointment(
     appointment_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Get a specific appointment"""
-    service = CalendarService()
-    appointment = service.get_appointment(appointment_id)
+    appointment = await service.get_appointment(appointment_id)
     
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -138,51 +171,45 @@ async def get_appointment(
 async def update_appointment(
     appointment_id: str,
     request: UpdateAppointmentRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Update an appointment"""
-    service = CalendarService()
+    # Only fields the client actually sent; nulls are skipped as before
+    update_data = request.model_dump(exclude_unset=True, exclude_none=True)
+    expected_version = update_data.pop('version', None)
     
-    # Build update dict
-    update_data = {}
-    if request.title is not None:
-        update_data['title'] = request.title
-    if request.description is not None:
-        update_data['description'] = request.description
-    if request.start_time is not None:
-        update_data['start_time'] = request.start_time
-    if request.end_time is not None:
-        update_data['end_time'] = request.end_time
-    if request.location is not None:
-        update_data['location'] = request.location
-    if request.status is not None:
-        update_data['status'] = request.status
-    if request.attendees is not None:
-        update_data['attendees'] = request.attendees
+    try:
+        appointment = await service.update_appointment(appointment_id, expected_version, **update_data)
+    except ConcurrentModificationError:
+        raise HTTPException(status_code=409, detail="Appointment was modified by another request")
+    except SlotUnavailableError:
+        raise HTTPException(status_code=409, detail="Time slot not available")
+    except InvalidTimeRangeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
-    appointment = service.update_appointment(appointment_id, **update_data)
     return appointment
 
 @router.delete("/appointments/{appointment_id}")
 async def cancel_appointment(
     appointment_id: str,
     reason: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Cancel an appointment"""
-    service = CalendarService()
-    result = service.cancel_appointment(appointment_id, reason)
+    result = await service.cancel_appointment(appointment_id, reason)
     return result
 
 # Availability Endpoints
 @router.post("/availability/check")
 async def check_availability(
     request: CheckAvailabilityRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Check if a time slot is available"""
-    service = CalendarService()
-    is_available = service.check_availability(
+    is_available = await service.check_availability(
         request.calendar_id,
         request.start_time,
         request.end_time
@@ -193,18 +220,33 @@ async def check_availability(
 async def get_available_slots(
     calendar_id: str,
     date: datetime,
-    duration_minutes: int = 60,
-    current_user: dict = Depends(get_current_user)
+    duration_minutes: int = Query(60, ge=1, le=480),
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
 ):
     """Get available time slots for a given date"""
-    service = CalendarService()
-    slots = service.get_available_slots(calendar_id, date, duration_minutes)
+    slots = await service.get_available_slots(calendar_id, date, duration_minutes)
     return {"slots": slots}
 
 # Reminder Endpoints
 @router.get("/reminders/pending")
-async def get_pending_reminders(current_user: dict = Depends(get_current_user)):
-    """Get all pending reminders (admin only)"""
-    service = CalendarService()
-    reminders = service.get_pending_reminders()
+async def get_pending_reminders(
+    limit: int = Query(500, ge=1, le=5000),
+    after_time: Optional[datetime] = None,
+    after_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
+):
+    """Get pending reminders, one page at a time (admin only)"""
+    reminders = await service.get_pending_reminders(limit, after_time, after_id)
     return {"reminders": reminders}
+
+@router.post("/reminders/sent")
+async def mark_reminders_sent(
+    request: MarkRemindersSentRequest,
+    current_user: dict = Depends(get_current_user),
+    service: CalendarService = Depends(get_calendar_service)
+):
+    """Mark a batch of dispatched reminders as sent"""
+    updated = await service.mark_reminders_sent(request.reminder_ids)
+    return {"updated": updated}
@@ -3,30 +3,97 @@ Calendar and Scheduling Service
 Manages appointments, availability, and calendar integrations
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import uuid
-from database_unified import get_db_connection
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, List, Dict, Optional
+import json
+from caching import AsyncCache, CACHE_CALENDAR_SLOTS, CACHE_CALENDAR_SLOTS_GEN, TTL_SHORT
+from database_unified import pg_pool
+
+def _utcnow() -> datetime:
+    """Current UTC time, naive to match the TIMESTAMP columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to naive UTC for the TIMESTAMP columns
+    
+    asyncpg rejects aware values for timestamp parameters, and clients
+    routinely send ISO strings with a trailing Z or an offset.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _decode_json(value: Any, default: Any) -> Any:
+    """Decode a JSON column: JSONB arrives already parsed, TEXT as a string"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return json.loads(value) if value else default
+    return value
+
+
+# Columns behind _row_to_appointment, in order
+APPOINTMENT_COLUMNS = """id, calendar_id, title, description, start_time, end_time, 
+                   location, attendees, deal_id, borrower_id, status, version"""
+
+# Per-calendar transaction lock shared by booking and rescheduling. The id is
+# normalized through uuid so a str from the API and a UUID read back from a
+# row hash to the same key
+CALENDAR_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext($1::uuid::text))"
+
+
+# Keys for get_appointments rows, in SELECT order
+_APPT_FIELDS = ('id', 'title', 'description', 'start_time', 'end_time',
+                'location', 'attendees', 'deal_id', 'borrower_id', 'status')
+
+
+def _row_to_appointment(row) -> Dict:
+    """Map an APPOINTMENT_COLUMNS row to the appointment response dict"""
+    return {
+        "id": row[0],
+        "calendar_id": row[1],
+        "title": row[2],
+        "description": row[3],
+        "start_time": row[4],
+        "end_time": row[5],
+        "location": row[6],
+        "attendees": _decode_json(row[7], []),
+        "deal_id": row[8],
+        "borrower_id": row[9],
+        "status": row[10],
+        "version": row[11]
+    }
+
+
+class SlotUnavailableError(Exception):
+    """Raised when a booking overlaps an existing appointment"""
+
+
+class ConcurrentModificationError(Exception):
+    """Raised when an appointment changed since the caller read it"""
+
+
+class InvalidTimeRangeError(ValueError):
+    """Raised when an appointment would end before it starts"""
+
 
 class CalendarService:
-    """Service for managing calendars and appointments"""
+    """Service for managing calendars and appointments on the shared asyncpg pool"""
     
-    def __init__(self):
-        self.conn = get_db_connection()
+    def __init__(self, db=pg_pool):
+        self.db = db
     
     # Calendar Management
-    def create_calendar(self, user_id: str, name: str, timezone: str = "UTC", 
-                       settings: Optional[Dict] = None) -> Dict:
+    async def create_calendar(self, user_id: str, name: str, timezone: str = "UTC", 
+                             settings: Optional[Dict] = None) -> Dict:
         """Create a new calendar"""
-        calendar_id = str(uuid.uuid4())
-        cursor = self.conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO calendars (id, user_id, name, timezone, settings, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (calendar_id, user_id, name, timezone, str(settings or {}), datetime.utcnow()))
-        
-        self.conn.commit()
+        calendar_id = await self.db.fetchval("""
+            INSERT INTO calendars (user_id, name, timezone, settings, created_at)
+            VALUES ($1, $2, $3, $4, $5)
+            RETURNING id
+        """, user_id, name, timezone, json.dumps(settings or {}), _utcnow())
         
         return {
             "id": calendar_id,
@@ -36,50 +103,101 @@ class CalendarService:
             "settings": settings or {}
         }
     
-    def get_user_calendars(self, user_id: str) -> List[Dict]:
+    async def get_user_calendars(self, user_id: str) -> List[Dict]:
         """Get all calendars for a user"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        rows = await self.db.fetch("""
             SELECT id, name, timezone, settings, is_default, created_at
             FROM calendars
-            WHERE user_id = %s
+            WHERE user_id = $1
             ORDER BY is_default DESC, created_at DESC
-        """, (user_id,))
+        """, user_id)
         
         calendars = []
-        for row in cursor.fetchall():
+        for row in rows:
             calendars.append({
                 "id": row[0],
                 "name": row[1],
                 "timezone": row[2],
-                "settings": eval(row[3]) if row[3] else {},
+                "settings": _decode_json(row[3], {}),
                 "is_default": row[4],
-                "created_at": row[5].isoformat() if row[5] else None
+                "created_at": row[5]
             })
         
         return calendars
     
     # Appointment Management
-    def create_appointment(self, calendar_id: str, title: str, start_time: datetime,
-                          end_time: datetime, attendees: List[str] = None,
-                          location: Optional[str] = None, description: Optional[str] = None,
-                          deal_id: Optional[str] = None, borrower_id: Optional[str] = None) -> Dict:
+    async def create_appointment(self, calendar_id: str, title: str, start_time: datetime,
+                                 end_time: datetime, attendees: List[str] = None,
+                                 location: Optional[str] = None, description: Optional[str] = None,
+                                 deal_id: Optional[str] = None, borrower_id: Optional[str] = None) -> Dict:
         """Create a new appointment"""
-        appointment_id = str(uuid.uuid4())
-        cursor = self.conn.cursor()
+        start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+        now = _utcnow()
+        pool = await self.db.get_pool()
+        async with pool.acquire() as conn, conn.transaction():
+            appointment_id = await conn.fetchval("""
+                INSERT INTO appointments (calendar_id, title, description, start_time, 
+                                        end_time, location, attendees, deal_id, borrower_id,
+                                        status, created_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                RETURNING id
+            """, calendar_id, title, description, start_time, end_time,
+                location, json.dumps(attendees or []), deal_id, borrower_id, 'scheduled', now)
+            
+            # Create automatic reminders in the same transaction
+            await self._create_default_reminders(conn, appointment_id, start_time, now)
         
-        cursor.execute("""
-            INSERT INTO appointments (id, calendar_id, title, description, start_time, 
-                                    end_time, location, attendees, deal_id, borrower_id,
-                                    status, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (appointment_id, calendar_id, title, description, start_time, end_time,
-              location, str(attendees or []), deal_id, borrower_id, 'scheduled', datetime.utcnow()))
+        await self._invalidate_slots(calendar_id)
         
-        self.conn.commit()
+        return {
+            "id": appointment_id,
+            "calendar_id": calendar_id,
+            "title": title,
+            "description": description,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "location": location,
+            "attendees": attendees or [],
+            "deal_id": deal_id,
+            "borrower_id": borrower_id,
+            "status": "scheduled"
+        }
+    
+    async def create_appointment_if_available(self, calendar_id: str, title: str, start_time: datetime,
+                                              end_time: datetime, attendees: List[str] = None,
+                                              location: Optional[str] = None, description: Optional[str] = None,
+                                              deal_id: Optional[str] = None, borrower_id: Optional[str] = None) -> Dict:
+        """Create an appointment only if the slot is free, raising SlotUnavailableError otherwise"""
+        start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+        now = _utcnow()
+        pool = await self.db.get_pool()
+        async with pool.acquire() as conn, conn.transaction():
+            # Serialize bookings per calendar for this transaction so two
+            # requests can't both see the slot free and double-book it
+            await conn.execute(CALENDAR_LOCK_SQL, calendar_id)
+            appointment_id = await conn.fetchval("""
+                INSERT INTO appointments (calendar_id, title, description, start_time, 
+                                        end_time, location, attendees, deal_id, borrower_id,
+                                        status, created_at)
+                SELECT $1, $2, $3, $4::timestamp, $5::timestamp, $6, $7::jsonb, $8, $9, $10, $11::timestamp
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM appointments
+                    WHERE calendar_id = $1
+                      AND status != 'cancelled'
+                      AND during && tsrange($4::timestamp, $5::timestamp, '[)')
+                )
+                RETURNING id
+            """, calendar_id, title, description, start_time, end_time,
+                location, json.dumps(attendees or []), deal_id, borrower_id, 'scheduled', now)
+            
+            # Raising inside the transaction block rolls it back
+            if appointment_id is None:
+                raise SlotUnavailableError(f"Time slot not available on calendar {calendar_id}")
+            
+            # Create automatic reminders in the same transaction
+            await self._create_default_reminders(conn, appointment_id, start_time, now)
         
-        # Create automatic reminders
-        self._create_default_reminders(appointment_id, start_time)
+        await self._invalidate_slots(calendar_id)
         
         return {
             "id": appointment_id,
@@ -95,41 +213,30 @@ class CalendarService:
             "status": "scheduled"
         }
     
-    def get_appointments(self, calendar_id: str, start_date: datetime, 
-                        end_date: datetime) -> List[Dict]:
+    async def get_appointments(self, calendar_id: str, start_date: datetime, 
+                               end_date: datetime) -> List[Dict]:
         """Get appointments for a calendar within a date range"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        start_date, end_date = _naive_utc(start_date), _naive_utc(end_date)
+        rows = await self.db.fetch("""
             SELECT id, title, description, start_time, end_time, location, 
                    attendees, deal_id, borrower_id, status
             FROM appointments
-            WHERE calendar_id = %s 
-              AND start_time >= %s 
-              AND start_time <= %s
+            WHERE calendar_id = $1 
+              AND start_time >= $2 
+              AND start_time <= $3
             ORDER BY start_time ASC
-        """, (calendar_id, start_date, end_date))
+        """, calendar_id, start_date, end_date)
         
         appointments = []
-        for row in cursor.fetchall():
-            appointments.append({
-                "id": row[0],
-                "title": row[1],
-                "description": row[2],
-                "start_time": row[3].isoformat() if row[3] else None,
-                "end_time": row[4].isoformat() if row[4] else None,
-                "location": row[5],
-                "attendees": eval(row[6]) if row[6] else [],
-                "deal_id": row[7],
-                "borrower_id": row[8],
-                "status": row[9]
-            })
+        for row in rows:
+            appt = dict(zip(_APPT_FIELDS, row))
+            appt["attendees"] = _decode_json(appt["attendees"], [])
+            appointments.append(appt)
         
         return appointments
     
-    def update_appointment(self, appointment_id: str, **kwargs) -> Dict:
-        """Update an appointment"""
-        cursor = self.conn.cursor()
-        
+    async def update_appointment(self, appointment_id: str, expected_version: Optional[int] = None, **kwargs) -> Dict:
+        """Update an appointment, only if still at expected_version when one is given"""
         # Build dynamic update query
         update_fields = []
         values = []
@@ -139,208 +246,271 @@ class CalendarService:
         
         for field in allowed_fields:
             if field in kwargs:
-                update_fields.append(f"{field} = %s")
                 value = kwargs[field]
                 if field == 'attendees':
-                    value = str(value)
+                    value = json.dumps(value)
+                elif field in ('start_time', 'end_time'):
+                    value = kwargs[field] = _naive_utc(value)
                 values.append(value)
+                update_fields.append(f"{field} = ${len(values)}")
         
         if not update_fields:
             return {"error": "No fields to update"}
         
+        update_fields.append("version = version + 1")
         values.append(appointment_id)
-        query = f"UPDATE appointments SET {', '.join(update_fields)} WHERE id = %s"
-        
-        cursor.execute(query, values)
-        self.conn.commit()
+        query = f"UPDATE appointments SET {', '.join(update_fields)} WHERE id = ${len(values)}"
+        if expected_version is not None:
+            values.append(expected_version)
+            query += f" AND version = ${len(values)}"
+        # Post-update state comes back with the UPDATE, no re-read needed
+        query += f" RETURNING {APPOINTMENT_COLUMNS}"
+        
+        if ('start_time' in kwargs or 'end_time' in kwargs) and kwargs.get('status') != 'cancelled':
+            row = await self._reschedule(appointment_id, kwargs, query, values)
+        else:
+            row = await self.db.fetchrow(query, *values)
+        if not row:
+            if expected_version is not None:
+                raise ConcurrentModificationError(
+                    f"Appointment {appointment_id} is no longer at version {expected_version}"
+                )
+            return None
         
-        return self.get_appointment(appointment_id)
+        await self._invalidate_slots(row[1])
+        return _row_to_appointment(row)
     
-    def get_appointment(self, appointment_id: str) -> Optional[Dict]:
+    async def _reschedule(self, appointment_id: str, changes: Dict, query: str, values: List):
+        """Run a time-changing update under the calendar's booking lock"""
+        pool = await self.db.get_pool()
+        async with pool.acquire() as conn, conn.transaction():
+            current = await conn.fetchrow(
+                "SELECT calendar_id, start_time, end_time FROM appointments WHERE id = $1",
+                appointment_id
+            )
+            if not current:
+                return None
+            
+            # Same lock as create_appointment_if_available, so a reschedule
+            # and a new booking can't both claim the slot
+            calendar_id = str(current[0])
+            await conn.execute(CALENDAR_LOCK_SQL, calendar_id)
+            start_time = changes.get('start_time') or current[1]
+            end_time = changes.get('end_time') or current[2]
+            # A partial change can invert the stored range; tsrange would reject it
+            if end_time <= start_time:
+                raise InvalidTimeRangeError("end_time must be after start_time")
+            conflict = await conn.fetchrow("""
+                SELECT 1 FROM appointments
+                WHERE calendar_id = $1
+                  AND id != $2
+                  AND status != 'cancelled'
+                  AND during && tsrange($3::timestamp, $4::timestamp, '[)')
+                LIMIT 1
+            """, calendar_id, appointment_id, start_time, end_time)
+            if conflict:
+                raise SlotUnavailableError(f"Time slot not available on calendar {calendar_id}")
+            
+            return await conn.fetchrow(query, *values)
+    
+    async def get_appointment(self, appointment_id: str) -> Optional[Dict]:
         """Get a specific appointment"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT id, calendar_id, title, description, start_time, end_time, 
-                   location, attendees, deal_id, borrower_id, status
+        row = await self.db.fetchrow(f"""
+            SELECT {APPOINTMENT_COLUMNS}
             FROM appointments
-            WHERE id = %s
-        """, (appointment_id,))
+            WHERE id = $1
+        """, appointment_id)
         
-        row = cursor.fetchone()
         if not row:
             return None
         
-        return {
-            "id": row[0],
-            "calendar_id": row[1],
-            "title": row[2],
-            "description": row[3],
-            "start_time": row[4].isoformat() if row[4] else None,
-            "end_time": row[5].isoformat() if row[5] else None,
-            "location": row[6],
-            "attendees": eval(row[7]) if row[7] else [],
-            "deal_id": row[8],
-            "borrower_id": row[9],
-            "status": row[10]
-        }
+        return _row_to_appointment(row)
     
-    def cancel_appointment(self, appointment_id: str, reason: Optional[str] = None) -> Dict:
+    async def cancel_appointment(self, appointment_id: str, reason: Optional[str] = None) -> Dict:
         """Cancel an appointment"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        cancelled = await self.db.fetchrow("""
             UPDATE appointments 
-            SET status = 'cancelled', cancellation_reason = %s
-            WHERE id = %s
-        """, (reason, appointment_id))
+            SET status = 'cancelled', cancellation_reason = $1
+            WHERE id = $2
+            RETURNING calendar_id
+        """, reason, appointment_id)
         
-        self.conn.commit()
+        if cancelled:
+            await self._invalidate_slots(cancelled[0])
         
         return {"success": True, "message": "Appointment cancelled"}
     
     # Reminder Management
-    def _create_default_reminders(self, appointment_id: str, start_time: datetime):
-        """Create default reminders for an appointment"""
-        cursor = self.conn.cursor()
-        
-        # 24 hours before
-        reminder_time_24h = start_time - timedelta(hours=24)
-        cursor.execute("""
-            INSERT INTO appointment_reminders (id, appointment_id, reminder_time, 
+    @staticmethod
+    async def _create_default_reminders(conn, appointment_id: str, start_time: datetime, now: datetime):
+        """Create default reminders for an appointment on the caller's transaction"""
+        # 24 hours before by email, 1 hour before by SMS, as one statement
+        await conn.execute("""
+            INSERT INTO appointment_reminders (appointment_id, reminder_time, 
                                               reminder_type, status, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (str(uuid.uuid4()), appointment_id, reminder_time_24h, 'email', 
-              'pending', datetime.utcnow()))
-        
-        # 1 hour before
-        reminder_time_1h = start_time - timedelta(hours=1)
-        cursor.execute("""
-            INSERT INTO appointment_reminders (id, appointment_id, reminder_time, 
-                                              reminder_type, status, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (str(uuid.uuid4()), appointment_id, reminder_time_1h, 'sms', 
-              'pending', datetime.utcnow()))
-        
-        self.conn.commit()
+            VALUES ($1, $2, 'email', 'pending', $4),
+                   ($1, $3, 'sms', 'pending', $4)
+        """, appointment_id, start_time - timedelta(hours=24), start_time - timedelta(hours=1), now)
     
-    def get_pending_reminders(self) -> List[Dict]:
-        """Get all pending reminders that need to be sent"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT r.id, r.appointment_id, r.reminder_time, r.reminder_type,
-                   a.title, a.start_time, a.attendees
-            FROM appointment_reminders r
-            JOIN appointments a ON r.appointment_id = a.id
-            WHERE r.status = 'pending'
-              AND r.reminder_time <= %s
-            ORDER BY r.reminder_time ASC
-        """, (datetime.utcnow(),))
-        
-        reminders = []
-        for row in cursor.fetchall():
-            reminders.append({
-                "reminder_id": row[0],
-                "appointment_id": row[1],
-                "reminder_time": row[2].isoformat() if row[2] else None,
-                "reminder_type": row[3],
-                "appointment_title": row[4],
-                "appointment_start": row[5].isoformat() if row[5] else None,
-                "attendees": eval(row[6]) if row[6] else []
-            })
-        
-        return reminders
+    # Due reminders for one worker shard, oldest first; (reminder_time, id) is
+    # the keyset so pages don't skip or repeat rows with equal times
+    PENDING_REMINDERS_SQL = """
+        SELECT r.id, r.appointment_id, r.reminder_time, r.reminder_type,
+               a.title, a.start_time, a.attendees
+        FROM appointment_reminders r
+        JOIN appointments a ON r.appointment_id = a.id
+        WHERE r.status = 'pending'
+          AND r.reminder_time <= $1
+          AND (hashtext(r.id::text) & 2147483647) % $2 = $3
+          {keyset}
+        ORDER BY r.reminder_time ASC, r.id ASC
+    """
+    
+    async def get_pending_reminders(self, limit: int = 500, after_time: Optional[datetime] = None,
+                                    after_id: Optional[str] = None, shard: int = 0,
+                                    shards: int = 1) -> List[Dict]:
+        """Get one page of pending reminders that need to be sent
+        
+        Pass the reminder_time and reminder_id of the last row to fetch the
+        next page. shard/shards split the backlog between parallel senders.
+        """
+        args = [_utcnow(), shards, shard]
+        keyset = ""
+        if after_time is not None:
+            after_time = _naive_utc(after_time)
+            # ids are UUIDs; the nil UUID sorts before every real one
+            args += [after_time, after_id or "00000000-0000-0000-0000-000000000000"]
+            keyset = "AND (r.reminder_time, r.id) > ($4, $5::uuid)"
+        args.append(limit)
+        
+        query = self.PENDING_REMINDERS_SQL.format(keyset=keyset) + f" LIMIT ${len(args)}"
+        rows = await self.db.fetch(query, *args)
+        return [self._reminder_dict(row) for row in rows]
     
-    def mark_reminder_sent(self, reminder_id: str):
+    async def iter_pending_reminders(self, shard: int = 0, shards: int = 1,
+                                     batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Stream every pending reminder through a server-side cursor"""
+        pool = await self.db.get_pool()
+        # Cursors only live inside a transaction
+        async with pool.acquire() as conn, conn.transaction():
+            query = self.PENDING_REMINDERS_SQL.format(keyset="")
+            async for row in conn.cursor(query, _utcnow(), shards, shard, prefetch=batch_size):
+                yield self._reminder_dict(row)
+    
+    @staticmethod
+    def _reminder_dict(row) -> Dict:
+        return {
+            "reminder_id": row[0],
+            "appointment_id": row[1],
+            "reminder_time": row[2],
+            "reminder_type": row[3],
+            "appointment_title": row[4],
+            "appointment_start": row[5],
+            "attendees": _decode_json(row[6], [])
+        }
+    
+    async def mark_reminder_sent(self, reminder_id: str):
         """Mark a reminder as sent"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        await self.db.execute("""
             UPDATE appointment_reminders 
-            SET status = 'sent', sent_at = %s
-            WHERE id = %s
-        """, (datetime.utcnow(), reminder_id))
-        
-        self.conn.commit()
+            SET status = 'sent', sent_at = $1
+            WHERE id = $2
+        """, _utcnow(), reminder_id)
+    
+    async def mark_reminders_sent(self, reminder_ids: List[str]) -> int:
+        """Mark a batch of reminders as sent in one statement"""
+        if not reminder_ids:
+            return 0
+        status = await self.db.execute("""
+            UPDATE appointment_reminders 
+            SET status = 'sent', sent_at = $1
+            WHERE id = ANY($2::uuid[])
+        """, _utcnow(), list(reminder_ids))
+        # asyncpg returns the command tag, e.g. "UPDATE 42"
+        return int(status.split()[-1])
     
     # Availability Management
-    def check_availability(self, calendar_id: str, start_time: datetime, 
-                          end_time: datetime) -> bool:
+    async def check_availability(self, calendar_id: str, start_time: datetime, 
+                                 end_time: datetime) -> bool:
         """Check if a time slot is available"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(*) FROM appointments
-            WHERE calendar_id = %s
+        start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+        # Half-open overlap on the GiST-indexed range; stops at the first conflicting booking
+        conflict = await self.db.fetchrow("""
+            SELECT 1 FROM appointments
+            WHERE calendar_id = $1
               AND status != 'cancelled'
-              AND (
-                  (start_time <= %s AND end_time > %s) OR
-                  (start_time < %s AND end_time >= %s) OR
-                  (start_time >= %s AND end_time <= %s)
-              )
-        """, (calendar_id, start_time, start_time, end_time, end_time, 
-              start_time, end_time))
+              AND during && tsrange($2, $3, '[)')
+            LIMIT 1
+        """, calendar_id, start_time, end_time)
         
-        count = cursor.fetchone()[0]
-        return count == 0
+        return conflict is None
     
-    def get_available_slots(self, calendar_id: str, date: datetime, 
-                           duration_minutes: int = 60) -> List[Dict]:
-        """Get available time slots for a given date"""
-        # Business hours: 9 AM to 5 PM
-        start_of_day = date.replace(hour=9, minute=0, second=0, microsecond=0)
-        end_of_day = date.replace(hour=17, minute=0, second=0, microsecond=0)
-        
-        available_slots = []
-        current_time = start_of_day
-        
-        while current_time < end_of_day:
-            slot_end = current_time + timedelta(minutes=duration_minutes)
-            
-            if slot_end <= end_of_day:
-                if self.check_availability(calendar_id, current_time, slot_end):
-                    available_slots.append({
-                        "start_time": current_time.isoformat(),
-                        "end_time": slot_end.isoformat(),
-                        "duration_minutes": duration_minutes
-                    })
-            
-            current_time += timedelta(minutes=30)  # 30-minute intervals
-        
+    # Candidate slots every 30 minutes across business hours, minus any that
+    # overlap a live booking (half-open), enumerated entirely in Postgres
+    AVAILABLE_SLOTS_SQL = """
+        WITH slots AS (
+            SELECT gs AS slot_start, gs + make_interval(mins => $3) AS slot_end
+            FROM generate_series($1::timestamp, $2::timestamp - make_interval(mins => $3),
+                                 interval '30 minutes') gs
+        )
+        SELECT slot_start, slot_end FROM slots s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM appointments a
+            WHERE a.calendar_id = $4
+              AND a.status != 'cancelled'
+              AND a.during && tsrange(s.slot_start, s.slot_end, '[)')
+        )
+        ORDER BY slot_start
+    """
+    
+    async def get_available_slots(self, calendar_id: str, date: datetime, 
+                                  duration_minutes: int = 60) -> List[Dict]:
+        """Get available time slots for a given date, cached briefly per day"""
+        # Business hours: 9 AM to 5 PM, in the caller's zone when one is given
+        start_of_day = _naive_utc(date.replace(hour=9, minute=0, second=0, microsecond=0))
+        end_of_day = _naive_utc(date.replace(hour=17, minute=0, second=0, microsecond=0))
+        
+        # Writes bump the calendar's generation, so entries from before a
+        # change are simply never read again and age out on their TTL
+        generation = await AsyncCache.get(CACHE_CALENDAR_SLOTS_GEN, calendar_id) or 0
+        cache_key = f"{calendar_id}:{generation}:{start_of_day.date().isoformat()}:{duration_minutes}"
+        cached = await AsyncCache.get(CACHE_CALENDAR_SLOTS, cache_key)
+        if cached is not None:
+            return cached
+        
+        rows = await self.db.fetch(self.AVAILABLE_SLOTS_SQL, start_of_day, end_of_day,
+                                   duration_minutes, calendar_id)
+        available_slots = [
+            {
+                "start_time": row[0].isoformat(),
+                "end_time": row[1].isoformat(),
+                "duration_minutes": duration_minutes
+            }
+            for row in rows
+        ]
+        
+        await AsyncCache.set(CACHE_CALENDAR_SLOTS, cache_key, available_slots, TTL_SHORT)
         return available_slots
     
+    @staticmethod
+    async def _invalidate_slots(calendar_id: str):
+        """Retire cached slots for a calendar after it changes"""
+        await AsyncCache.incr(CACHE_CALENDAR_SLOTS_GEN, calendar_id)
+    
     # Statistics
-    def get_calendar_stats(self, calendar_id: str) -> Dict:
+    async def get_calendar_stats(self, calendar_id: str) -> Dict:
         """Get statistics for a calendar"""
-        cursor = self.conn.cursor()
-        
-        # Total appointments
-        cursor.execute("""
-            SELECT COUNT(*) FROM appointments
-            WHERE calendar_id = %s
-        """, (calendar_id,))
-        total_appointments = cursor.fetchone()[0]
-        
-        # Upcoming appointments
-        cursor.execute("""
-            SELECT COUNT(*) FROM appointments
-            WHERE calendar_id = %s
-              AND start_time > %s
-              AND status = 'scheduled'
-        """, (calendar_id, datetime.utcnow()))
-        upcoming_appointments = cursor.fetchone()[0]
-        
-        # Completed appointments
-        cursor.execute("""
-            SELECT COUNT(*) FROM appointments
-            WHERE calendar_id = %s
-              AND status = 'completed'
-        """, (calendar_id,))
-        completed_appointments = cursor.fetchone()[0]
-        
-        # Cancelled appointments
-        cursor.execute("""
-            SELECT COUNT(*) FROM appointments
-            WHERE calendar_id = %s
-              AND status = 'cancelled'
-        """, (calendar_id,))
-        cancelled_appointments = cursor.fetchone()[0]
+        # All four counts in a single pass over the calendar's appointments
+        row = await self.db.fetchrow("""
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE start_time > $1 AND status = 'scheduled'),
+                   COUNT(*) FILTER (WHERE status = 'completed'),
+                   COUNT(*) FILTER (WHERE status = 'cancelled')
+            FROM appointments
+            WHERE calendar_id = $2
+        """, _utcnow(), calendar_id)
+        (total_appointments, upcoming_appointments,
+         completed_appointments, cancelled_appointments) = row
         
         return {
             "total_appointments": total_appointments,
@@ -4,24 +4,72 @@ Part of UnderwritePro Enhanced Platform
 """
 
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel, EmailStr
+import asyncio
+import functools
 import os
 import json
+import re
+import httpx
+from caching import MemoryCache, TTL_MEDIUM
+from database_unified import pg_pool
 
-# Email and SMS providers
-try:
-    from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail, Email, To, Content
-    SENDGRID_AVAILABLE = True
-except ImportError:
-    SENDGRID_AVAILABLE = False
+# Email and SMS providers, called over their REST APIs
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+TWILIO_MESSAGES_URL = "https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
 
-try:
-    from twilio.rest import Client as TwilioClient
-    TWILIO_AVAILABLE = True
-except ImportError:
-    TWILIO_AVAILABLE = False
+# SendGrid accepts at most this many personalizations per request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+# Bulk sends go out in chunks, with at most this many provider requests in flight
+BULK_SEND_CHUNK_SIZE = 200
+BULK_SEND_CONCURRENCY = 50
+
+
+@functools.cache
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide keep-alive client for the email/SMS providers"""
+    return httpx.AsyncClient(
+        # Idle provider connections are kept warm for 30s between sends
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=30),
+        timeout=30
+    )
+
+
+# Keyset sort expression for conversation lists; conversations without
+# messages yet sort by when they were opened
+ACTIVITY_AT = "COALESCE(c.last_message_at, c.created_at)"
+
+# Email/SMS template rows, shared by every service instance; templates
+# change rarely, so a few minutes of staleness saves a SELECT per send
+_template_cache = MemoryCache(max_entries=2048)
+
+# {{key}} placeholders in email/SMS templates
+_PLACEHOLDER_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+def _render_placeholders(text: str, variables: Dict[str, Any]) -> str:
+    """Fill {{key}} placeholders in one pass, leaving unknown keys as written"""
+    def substitute(match):
+        key = match.group(1)
+        return str(variables[key]) if key in variables else match.group(0)
+    return _PLACEHOLDER_RE.sub(substitute, text)
+
+
+async def _fan_out(send, items: list) -> List[Dict[str, Any]]:
+    """Run send over items in chunks, with a bounded number in flight, keeping order"""
+    semaphore = asyncio.Semaphore(BULK_SEND_CONCURRENCY)
+    
+    async def bounded(item):
+        async with semaphore:
+            return await send(item)
+    
+    results = []
+    for i in range(0, len(items), BULK_SEND_CHUNK_SIZE):
+        chunk = items[i:i + BULK_SEND_CHUNK_SIZE]
+        results.extend(await asyncio.gather(*(bounded(item) for item in chunk)))
+    return results
 
 
 # Pydantic Models
@@ -62,12 +110,27 @@ class SMSSend(BaseModel):
     from_phone: Optional[str] = None
 
 
+class EmailRecipient(BaseModel):
+    email: EmailStr
+    name: Optional[str] = None
+    variables: Optional[Dict[str, Any]] = None  # Fills the template's {{key}} placeholders
+
+
+class EmailBatchSend(BaseModel):
+    subject: str
+    body_html: str
+    body_text: Optional[str] = None
+    recipients: List[EmailRecipient]
+    from_email: Optional[EmailStr] = None
+    from_name: Optional[str] = None
+
+
 # Communication Service Class
 
 class CommunicationService:
-    """Handles all communication operations"""
+    """Handles all communication operations on the shared asyncpg pool"""
     
-    def __init__(self, db):
+    def __init__(self, db=pg_pool):
         self.db = db
         self.sendgrid_key = os.getenv('SENDGRID_API_KEY')
         self.twilio_account_sid = os.getenv('TWILIO_ACCOUNT_SID')
@@ -78,21 +141,21 @@ class CommunicationService:
         
     # Conversation Management
     
-    def create_conversation(self, conversation: ConversationCreate) -> Dict[str, Any]:
+    async def create_conversation(self, conversation: ConversationCreate) -> Dict[str, Any]:
         """Create a new conversation"""
         query = """
             INSERT INTO conversations (deal_id, borrower_id, subject, assigned_to, last_message_at)
-            VALUES (%s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5)
             RETURNING id, deal_id, borrower_id, subject, status, assigned_to, created_at
         """
-        result = self.db.execute_query(
+        row = await self.db.fetchrow(
             query,
-            (conversation.deal_id, conversation.borrower_id, conversation.subject, 
-             conversation.assigned_to, datetime.now())
+            conversation.deal_id, conversation.borrower_id, conversation.subject, 
+            conversation.assigned_to, datetime.now()
         )
-        return result[0] if result else None
+        return dict(row) if row else None
     
-    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """Get conversation by ID"""
         query = """
             SELECT c.*, 
@@ -103,51 +166,73 @@ class CommunicationService:
             LEFT JOIN deals d ON c.deal_id = d.id
             LEFT JOIN borrowers b ON c.borrower_id = b.id
             LEFT JOIN users u ON c.assigned_to = u.id
-            WHERE c.id = %s
+            WHERE c.id = $1
         """
-        result = self.db.execute_query(query, (conversation_id,))
-        return result[0] if result else None
+        row = await self.db.fetchrow(query, conversation_id)
+        return dict(row) if row else None
     
-    def list_conversations(self, filters: Dict[str, Any] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """List conversations with optional filters"""
+    async def list_conversations(self, filters: Dict[str, Any] = None, limit: int = 50,
+                                 cursor: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        """
+        List conversations with optional filters, most recent activity first
+        
+        Pages by keyset: pass the (activity_at, id) of the last row seen as
+        cursor to get the rows after it.
+        """
         where_clauses = []
         params = []
         
         if filters:
             if filters.get('deal_id'):
-                where_clauses.append("c.deal_id = %s")
                 params.append(filters['deal_id'])
+                where_clauses.append(f"c.deal_id = ${len(params)}")
             if filters.get('borrower_id'):
-                where_clauses.append("c.borrower_id = %s")
                 params.append(filters['borrower_id'])
+                where_clauses.append(f"c.borrower_id = ${len(params)}")
             if filters.get('assigned_to'):
-                where_clauses.append("c.assigned_to = %s")
                 params.append(filters['assigned_to'])
+                where_clauses.append(f"c.assigned_to = ${len(params)}")
             if filters.get('status'):
-                where_clauses.append("c.status = %s")
                 params.append(filters['status'])
+                where_clauses.append(f"c.status = ${len(params)}")
+        if cursor:
+            params.extend(cursor)
+            where_clauses.append(f"({ACTIVITY_AT}, c.id) < (${len(params) - 1}, ${len(params)})")
         
         where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        params.append(limit)
         
+        # Page first, then count messages for just that page in one aggregate
         query = f"""
+            WITH page AS (
+                SELECT c.*, {ACTIVITY_AT} AS activity_at FROM conversations c
+                {where_sql}
+                ORDER BY activity_at DESC, c.id DESC
+                LIMIT ${len(params)}
+            ),
+            mc AS (
+                SELECT conversation_id, COUNT(*) AS n
+                FROM messages
+                WHERE conversation_id IN (SELECT id FROM page)
+                GROUP BY conversation_id
+            )
             SELECT c.*, 
                    d.deal_type,
                    b.name as borrower_name,
                    u.full_name as assigned_to_name,
-                   (SELECT COUNT(*) FROM messages WHERE conversation_id = c.id) as message_count
-            FROM conversations c
+                   COALESCE(mc.n, 0) as message_count
+            FROM page c
+            LEFT JOIN mc ON mc.conversation_id = c.id
             LEFT JOIN deals d ON c.deal_id = d.id
             LEFT JOIN borrowers b ON c.borrower_id = b.id
             LEFT JOIN users u ON c.assigned_to = u.id
-            {where_sql}
-            ORDER BY c.last_message_at DESC NULLS LAST, c.created_at DESC
-            LIMIT %s OFFSET %s
+            ORDER BY c.activity_at DESC, c.id DESC
         """
-        params.extend([limit, offset])
         
-        return self.db.execute_query(query, tuple(params))
+        rows = await self.db.fetch(query, *params)
+        return [dict(row) for row in rows]
     
-    def update_conversation(self, conversation_id: str, updates: Dict[str, Any]) -> bool:
+    async def update_conversation(self, conversation_id: str, updates: Dict[str, Any]) -> bool:
         """Update conversation"""
         allowed_fields = ['subject', 'status', 'assigned_to']
         update_fields = []
@@ -155,27 +240,27 @@ class CommunicationService:
         
         for field in allowed_fields:
             if field in updates:
-                update_fields.append(f"{field} = %s")
                 params.append(updates[field])
+                update_fields.append(f"{field} = ${len(params)}")
         
         if not update_fields:
             return False
         
-        update_fields.append("updated_at = %s")
         params.append(datetime.now())
+        update_fields.append(f"updated_at = ${len(params)}")
         params.append(conversation_id)
         
         query = f"""
             UPDATE conversations 
             SET {', '.join(update_fields)}
-            WHERE id = %s
+            WHERE id = ${len(params)}
         """
-        self.db.execute_query(query, tuple(params))
+        await self.db.execute(query, *params)
         return True
     
     # Message Management
     
-    def create_message(self, message: MessageCreate) -> Dict[str, Any]:
+    async def create_message(self, message: MessageCreate) -> Dict[str, Any]:
         """Create and optionally send a message"""
         # If no conversation_id, create one
         if not message.conversation_id:
@@ -184,7 +269,7 @@ class CommunicationService:
             else:
                 subject = f"{message.channel.upper()} Message"
             
-            conversation = self.create_conversation(ConversationCreate(
+            conversation = await self.create_conversation(ConversationCreate(
                 deal_id=None,
                 borrower_id=message.recipient_id if message.recipient_type == 'borrower' else None,
                 subject=subject,
@@ -192,33 +277,83 @@ class CommunicationService:
             ))
             message.conversation_id = conversation['id']
         
-        # Insert message
+        # Insert the message and bump the conversation's last_message_at in
+        # one statement, stamped with the message's own created_at
         query = """
-            INSERT INTO messages (conversation_id, sender_type, sender_id, recipient_type, 
-                                recipient_id, channel, subject, body, html_body, status, metadata)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id, conversation_id, sender_type, sender_id, channel, subject, body, status, created_at
+            WITH inserted AS (
+                INSERT INTO messages (conversation_id, sender_type, sender_id, recipient_type, 
+                                    recipient_id, channel, subject, body, html_body, status, metadata)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                RETURNING id, conversation_id, sender_type, sender_id, channel, subject, body, status, created_at
+            ),
+            touched AS (
+                UPDATE conversations SET last_message_at = inserted.created_at
+                FROM inserted
+                WHERE conversations.id = inserted.conversation_id
+            )
+            SELECT * FROM inserted
         """
-        result = self.db.execute_query(
+        row = await self.db.fetchrow(
             query,
-            (message.conversation_id, message.sender_type, message.sender_id, message.recipient_type,
-             message.recipient_id, message.channel, message.subject, message.body, message.html_body,
-             'draft', json.dumps(message.metadata) if message.metadata else None)
+            message.conversation_id, message.sender_type, message.sender_id, message.recipient_type,
+            message.recipient_id, message.channel, message.subject, message.body, message.html_body,
+            'draft', json.dumps(message.metadata) if message.metadata else None
         )
         
-        if result:
-            message_record = result[0]
-            
-            # Update conversation last_message_at
-            self.db.execute_query(
-                "UPDATE conversations SET last_message_at = %s WHERE id = %s",
-                (datetime.now(), message.conversation_id)
+        return dict(row) if row else None
+    
+    async def create_messages_bulk(self, messages: List[MessageCreate]) -> List[Dict[str, Any]]:
+        """
+        Insert many messages into existing conversations with one statement
+        
+        Rows are passed as parallel arrays and expanded with unnest, so a
+        campaign batch costs one round trip and one plan; each conversation's
+        last_message_at moves to its newest inserted message. Every message
+        needs a conversation_id.
+        """
+        if not messages:
+            return []
+        if any(not message.conversation_id for message in messages):
+            raise ValueError("create_messages_bulk requires a conversation_id on every message")
+        
+        query = """
+            WITH inserted AS (
+                INSERT INTO messages (conversation_id, sender_type, sender_id, recipient_type, 
+                                    recipient_id, channel, subject, body, html_body, status, metadata)
+                SELECT conversation_id, sender_type, sender_id, recipient_type,
+                       recipient_id, channel, subject, body, html_body, 'draft', metadata
+                FROM unnest($1::uuid[], $2::text[], $3::uuid[], $4::text[], $5::uuid[],
+                            $6::text[], $7::text[], $8::text[], $9::text[], $10::jsonb[])
+                     AS t(conversation_id, sender_type, sender_id, recipient_type, recipient_id,
+                          channel, subject, body, html_body, metadata)
+                RETURNING id, conversation_id, sender_type, sender_id, channel, subject, body, status, created_at
+            ),
+            touched AS (
+                UPDATE conversations SET last_message_at = latest.created_at
+                FROM (
+                    SELECT conversation_id, MAX(created_at) AS created_at
+                    FROM inserted GROUP BY conversation_id
+                ) latest
+                WHERE conversations.id = latest.conversation_id
             )
-            
-            return message_record
-        return None
+            SELECT * FROM inserted
+        """
+        rows = await self.db.fetch(
+            query,
+            [m.conversation_id for m in messages],
+            [m.sender_type for m in messages],
+            [m.sender_id for m in messages],
+            [m.recipient_type for m in messages],
+            [m.recipient_id for m in messages],
+            [m.channel for m in messages],
+            [m.subject for m in messages],
+            [m.body for m in messages],
+            [m.html_body for m in messages],
+            [json.dumps(m.metadata) if m.metadata else None for m in messages]
+        )
+        return [dict(row) for row in rows]
     
-    def get_conversation_messages(self, conversation_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    async def get_conversation_messages(self, conversation_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Get all messages in a conversation"""
         query = """
             SELECT m.*,
@@ -230,47 +365,48 @@ class CommunicationService:
             FROM messages m
             LEFT JOIN users u ON m.sender_type = 'user' AND m.sender_id = u.id
             LEFT JOIN borrowers b ON m.sender_type = 'borrower' AND m.sender_id = b.id
-            WHERE m.conversation_id = %s
+            WHERE m.conversation_id = $1
             ORDER BY m.created_at ASC
-            LIMIT %s OFFSET %s
+            LIMIT $2 OFFSET $3
         """
-        return self.db.execute_query(query, (conversation_id, limit, offset))
+        rows = await self.db.fetch(query, conversation_id, limit, offset)
+        return [dict(row) for row in rows]
     
-    def mark_message_sent(self, message_id: str, status: str = 'sent') -> bool:
+    async def mark_message_sent(self, message_id: str, status: str = 'sent') -> bool:
         """Mark message as sent"""
         query = """
             UPDATE messages 
-            SET status = %s, sent_at = %s
-            WHERE id = %s
+            SET status = $1, sent_at = $2
+            WHERE id = $3
         """
-        self.db.execute_query(query, (status, datetime.now(), message_id))
+        await self.db.execute(query, status, datetime.now(), message_id)
         return True
     
-    def mark_message_delivered(self, message_id: str) -> bool:
+    async def mark_message_delivered(self, message_id: str) -> bool:
         """Mark message as delivered"""
         query = """
             UPDATE messages 
-            SET status = 'delivered', delivered_at = %s
-            WHERE id = %s
+            SET status = 'delivered', delivered_at = $1
+            WHERE id = $2
         """
-        self.db.execute_query(query, (datetime.now(), message_id))
+        await self.db.execute(query, datetime.now(), message_id)
         return True
     
-    def mark_message_read(self, message_id: str) -> bool:
+    async def mark_message_read(self, message_id: str) -> bool:
         """Mark message as read"""
         query = """
             UPDATE messages 
-            SET status = 'read', read_at = %s
-            WHERE id = %s
+            SET status = 'read', read_at = $1
+            WHERE id = $2
         """
-        self.db.execute_query(query, (datetime.now(), message_id))
+        await self.db.execute(query, datetime.now(), message_id)
         return True
     
     # Email Sending
     
-    def send_email(self, email: EmailSend) -> Dict[str, Any]:
+    async def send_email(self, email: EmailSend) -> Dict[str, Any]:
         """Send email via SendGrid"""
-        if not SENDGRID_AVAILABLE or not self.sendgrid_key:
+        if not self.sendgrid_key:
             # Simulate sending for development
             return {
                 'success': True,
@@ -283,33 +419,108 @@ class CommunicationService:
             from_email_addr = email.from_email or self.default_from_email
             from_name = email.from_name or self.default_from_name
             
-            message = Mail(
-                from_email=Email(from_email_addr, from_name),
-                to_emails=To(email.to_email, email.to_name),
-                subject=email.subject,
-                plain_text_content=Content("text/plain", email.body_text),
-                html_content=Content("text/html", email.body_html or email.body_text)
-            )
+            to = {'email': email.to_email}
+            if email.to_name:
+                to['name'] = email.to_name
             
-            sg = SendGridAPIClient(self.sendgrid_key)
-            response = sg.send(message)
-            
-            return {
-                'success': True,
-                'message_id': response.headers.get('X-Message-Id'),
-                'status_code': response.status_code
+            payload = {
+                'personalizations': [{'to': [to]}],
+                'from': {'email': from_email_addr, 'name': from_name},
+                'subject': email.subject,
+                'content': [
+                    {'type': 'text/plain', 'value': email.body_text},
+                    {'type': 'text/html', 'value': email.body_html or email.body_text}
+                ]
             }
+            
+            return await self._post_sendgrid(payload)
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    async def _post_sendgrid(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST one mail/send payload, raising on a non-2xx response"""
+        response = await get_http_client().post(
+            SENDGRID_SEND_URL,
+            json=payload,
+            headers={'Authorization': f'Bearer {self.sendgrid_key}'}
+        )
+        response.raise_for_status()
+        
+        return {
+            'success': True,
+            'message_id': response.headers.get('X-Message-Id'),
+            'status_code': response.status_code
+        }
+    
+    async def send_email_batch(self, template: Dict[str, Any], recipients: List[Dict[str, Any]],
+                               from_email: Optional[str] = None, from_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Send one email template to many recipients in as few SendGrid requests as possible
+        
+        Each recipient is {'email', 'name', 'variables'}; SendGrid fills the
+        template's {{key}} placeholders per recipient from its variables, so
+        up to 1000 recipients share a single request. Returns one result per
+        request.
+        """
+        if not self.sendgrid_key:
+            return [{
+                'success': True,
+                'recipients': len(recipients),
+                'status': 'simulated',
+                'note': 'SendGrid not configured, email batch simulated'
+            }]
+        
+        body_html = template['body_html']
+        base = {
+            'from': {
+                'email': from_email or self.default_from_email,
+                'name': from_name or self.default_from_name
+            },
+            'subject': template['subject'],
+            'content': [
+                {'type': 'text/plain', 'value': template.get('body_text') or body_html},
+                {'type': 'text/html', 'value': body_html}
+            ]
+        }
+        
+        personalizations = []
+        for recipient in recipients:
+            to = {'email': recipient['email']}
+            if recipient.get('name'):
+                to['name'] = recipient['name']
+            personalization = {'to': [to]}
+            variables = recipient.get('variables')
+            if variables:
+                personalization['substitutions'] = {
+                    f"{{{{{key}}}}}": str(value) for key, value in variables.items()
+                }
+            personalizations.append(personalization)
+        
+        async def send(chunk: List[Dict[str, Any]]) -> Dict[str, Any]:
+            try:
+                result = await self._post_sendgrid({**base, 'personalizations': chunk})
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            result['recipients'] = len(chunk)
+            return result
+        
+        return list(await asyncio.gather(*(
+            send(personalizations[i:i + SENDGRID_MAX_PERSONALIZATIONS])
+            for i in range(0, len(personalizations), SENDGRID_MAX_PERSONALIZATIONS)
+        )))
+    
+    async def send_bulk_emails(self, emails: List[EmailSend]) -> List[Dict[str, Any]]:
+        """Send many emails concurrently, returning one result per email in order"""
+        return await _fan_out(self.send_email, emails)
+    
     # SMS Sending
     
-    def send_sms(self, sms: SMSSend) -> Dict[str, Any]:
+    async def send_sms(self, sms: SMSSend) -> Dict[str, Any]:
         """Send SMS via Twilio"""
-        if not TWILIO_AVAILABLE or not self.twilio_account_sid:
+        if not self.twilio_account_sid:
             # Simulate sending for development
             return {
                 'success': True,
@@ -319,19 +530,20 @@ class CommunicationService:
             }
         
         try:
-            client = TwilioClient(self.twilio_account_sid, self.twilio_auth_token)
             from_phone = sms.from_phone or self.twilio_phone
             
-            message = client.messages.create(
-                body=sms.body,
-                from_=from_phone,
-                to=sms.to_phone
+            response = await get_http_client().post(
+                TWILIO_MESSAGES_URL.format(account_sid=self.twilio_account_sid),
+                data={'Body': sms.body, 'From': from_phone, 'To': sms.to_phone},
+                auth=(self.twilio_account_sid, self.twilio_auth_token)
             )
+            response.raise_for_status()
+            message = response.json()
             
             return {
                 'success': True,
-                'message_sid': message.sid,
-                'status': message.status
+                'message_sid': message.get('sid'),
+                'status': message.get('status')
             }
         except Exception as e:
             return {
@@ -339,21 +551,32 @@ class CommunicationService:
                 'error': str(e)
             }
     
+    async def send_bulk_sms(self, messages: List[SMSSend]) -> List[Dict[str, Any]]:
+        """Send many SMS concurrently; Twilio takes one recipient per request"""
+        return await _fan_out(self.send_sms, messages)
+    
     # Template Management
     
-    def get_email_template(self, template_id: str = None, template_type: str = None, organization_id: str = None) -> Optional[Dict[str, Any]]:
-        """Get email template by ID or type"""
+    async def get_email_template(self, template_id: str = None, template_type: str = None, organization_id: str = None) -> Optional[Dict[str, Any]]:
+        """Get email template by ID or type, cached for a few minutes"""
         if template_id:
-            query = "SELECT * FROM email_templates WHERE id = %s AND is_active = true"
+            cache_key = f"email:id:{template_id}"
+            query = "SELECT * FROM email_templates WHERE id = $1 AND is_active = true"
             params = (template_id,)
         elif template_type and organization_id:
-            query = "SELECT * FROM email_templates WHERE template_type = %s AND organization_id = %s AND is_active = true ORDER BY created_at DESC LIMIT 1"
+            cache_key = f"email:type:{template_type}:{organization_id}"
+            query = "SELECT * FROM email_templates WHERE template_type = $1 AND organization_id = $2 AND is_active = true ORDER BY created_at DESC LIMIT 1"
             params = (template_type, organization_id)
         else:
             return None
         
-        result = self.db.execute_query(query, params)
-        return result[0] if result else None
+        template = _template_cache.get(cache_key)
+        if template is None:
+            row = await self.db.fetchrow(query, *params)
+            template = dict(row) if row else None
+            if template is not None:
+                _template_cache.set(cache_key, template, TTL_MEDIUM)
+        return template
     
     def render_email_template(self, template: Dict[str, Any], variables: Dict[str, Any]) -> Dict[str, str]:
         """Render email template with variables"""
@@ -361,13 +584,10 @@ class CommunicationService:
         body_html = template['body_html']
         body_text = template.get('body_text', '')
         
-        # Simple variable replacement
-        for key, value in variables.items():
-            placeholder = f"{{{{{key}}}}}"
-            subject = subject.replace(placeholder, str(value))
-            body_html = body_html.replace(placeholder, str(value))
-            if body_text:
-                body_text = body_text.replace(placeholder, str(value))
+        subject = _render_placeholders(subject, variables)
+        body_html = _render_placeholders(body_html, variables)
+        if body_text:
+            body_text = _render_placeholders(body_text, variables)
         
         return {
             'subject': subject,
@@ -375,74 +595,115 @@ class CommunicationService:
             'body_text': body_text or body_html
         }
     
-    def get_sms_template(self, template_id: str = None, template_type: str = None, organization_id: str = None) -> Optional[Dict[str, Any]]:
-        """Get SMS template by ID or type"""
+    async def get_sms_template(self, template_id: str = None, template_type: str = None, organization_id: str = None) -> Optional[Dict[str, Any]]:
+        """Get SMS template by ID or type, cached for a few minutes"""
         if template_id:
-            query = "SELECT * FROM sms_templates WHERE id = %s AND is_active = true"
+            cache_key = f"sms:id:{template_id}"
+            query = "SELECT * FROM sms_templates WHERE id = $1 AND is_active = true"
             params = (template_id,)
         elif template_type and organization_id:
-            query = "SELECT * FROM sms_templates WHERE template_type = %s AND organization_id = %s AND is_active = true ORDER BY created_at DESC LIMIT 1"
+            cache_key = f"sms:type:{template_type}:{organization_id}"
+            query = "SELECT * FROM sms_templates WHERE template_type = $1 AND organization_id = $2 AND is_active = true ORDER BY created_at DESC LIMIT 1"
             params = (template_type, organization_id)
         else:
             return None
         
-        result = self.db.execute_query(query, params)
-        return result[0] if result else None
+        template = _template_cache.get(cache_key)
+        if template is None:
+            row = await self.db.fetchrow(query, *params)
+            template = dict(row) if row else None
+            if template is not None:
+                _template_cache.set(cache_key, template, TTL_MEDIUM)
+        return template
     
     def render_sms_template(self, template: Dict[str, Any], variables: Dict[str, Any]) -> str:
         """Render SMS template with variables"""
-        body = template['body']
-        
-        # Simple variable replacement
-        for key, value in variables.items():
-            placeholder = f"{{{{{key}}}}}"
-            body = body.replace(placeholder, str(value))
-        
-        return body
+        return _render_placeholders(template['body'], variables)
     
     # Unified Inbox
     
-    def get_unified_inbox(self, user_id: str, filters: Dict[str, Any] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get unified inbox for a user"""
-        where_clauses = ["(c.assigned_to = %s OR m.recipient_id = %s)"]
-        params = [user_id, user_id]
+    async def get_unified_inbox(self, user_id: str, filters: Dict[str, Any] = None, limit: int = 50,
+                                cursor: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        """Get unified inbox for a user, most recent activity first, paged like list_conversations"""
+        # Messages the inbox may show: all of an assigned conversation's,
+        # otherwise only those sent to the user
+        message_clauses = ["(c.assigned_to = $1 OR msg.recipient_id = $1)"]
+        where_clauses = []
+        params = [user_id]
         
         if filters:
             if filters.get('status'):
-                where_clauses.append("c.status = %s")
                 params.append(filters['status'])
+                where_clauses.append(f"c.status = ${len(params)}")
             if filters.get('channel'):
-                where_clauses.append("m.channel = %s")
                 params.append(filters['channel'])
+                message_clauses.append(f"msg.channel = ${len(params)}")
             if filters.get('unread_only'):
-                where_clauses.append("m.status != 'read'")
+                message_clauses.append("msg.status != 'read'")
         
-        where_sql = "WHERE " + " AND ".join(where_clauses)
+        # Message filters need a matching message; otherwise an assigned
+        # conversation is listed even before its first message
+        if len(message_clauses) > 1:
+            where_clauses.append("m.id IS NOT NULL")
+        else:
+            where_clauses.append("(c.assigned_to = $1 OR m.id IS NOT NULL)")
+        if cursor:
+            params.extend(cursor)
+            where_clauses.append(f"({ACTIVITY_AT}, c.id) < (${len(params) - 1}, ${len(params)})")
+        params.append(limit)
         
+        # Walk conversations newest first and pull each one's latest matching
+        # message with an index probe, stopping once the page is full; unread
+        # counts then come from one aggregate over the page
         query = f"""
-            SELECT DISTINCT ON (c.id) 
-                   c.id as conversation_id, c.subject, c.status as conversation_status,
-                   c.last_message_at, c.created_at as conversation_created_at,
-                   m.id as last_message_id, m.body as last_message_body, 
-                   m.channel, m.status as message_status, m.created_at as last_message_created_at,
+            WITH inbox AS (
+                SELECT c.id as conversation_id, c.subject, c.status as conversation_status,
+                       c.last_message_at, c.created_at as conversation_created_at,
+                       {ACTIVITY_AT} as activity_at,
+                       m.id as last_message_id, m.body as last_message_body, 
+                       m.channel, m.status as message_status, m.created_at as last_message_created_at,
+                       c.borrower_id, c.deal_id
+                FROM conversations c
+                LEFT JOIN LATERAL (
+                    SELECT msg.id, msg.body, msg.channel, msg.status, msg.created_at
+                    FROM messages msg
+                    WHERE msg.conversation_id = c.id
+                      AND {" AND ".join(message_clauses)}
+                    ORDER BY msg.created_at DESC
+                    LIMIT 1
+                ) m ON true
+                WHERE {" AND ".join(where_clauses)}
+                ORDER BY activity_at DESC, c.id DESC
+                LIMIT ${len(params)}
+            ),
+            unread AS (
+                SELECT conversation_id, COUNT(*) AS n
+                FROM messages
+                WHERE conversation_id IN (SELECT conversation_id FROM inbox)
+                  AND status != 'read'
+                GROUP BY conversation_id
+            )
+            SELECT inbox.conversation_id, inbox.subject, inbox.conversation_status,
+                   inbox.last_message_at, inbox.conversation_created_at, inbox.activity_at,
+                   inbox.last_message_id, inbox.last_message_body,
+                   inbox.channel, inbox.message_status, inbox.last_message_created_at,
                    b.name as borrower_name, b.email as borrower_email,
                    d.deal_type, d.loan_amount,
-                   (SELECT COUNT(*) FROM messages WHERE conversation_id = c.id AND status != 'read') as unread_count
-            FROM conversations c
-            LEFT JOIN messages m ON c.id = m.conversation_id
-            LEFT JOIN borrowers b ON c.borrower_id = b.id
-            LEFT JOIN deals d ON c.deal_id = d.id
-            {where_sql}
-            ORDER BY c.id, m.created_at DESC
-            LIMIT %s OFFSET %s
+                   COALESCE(unread.n, 0) as unread_count
+            FROM inbox
+            LEFT JOIN unread ON unread.conversation_id = inbox.conversation_id
+            LEFT JOIN borrowers b ON inbox.borrower_id = b.id
+            LEFT JOIN deals d ON inbox.deal_id = d.id
+            ORDER BY inbox.activity_at DESC, inbox.conversation_id DESC
         """
-        params.extend([limit, offset])
         
-        return self.db.execute_query(query, tuple(params))
+        rows = await self.db.fetch(query, *params)
+        return [dict(row) for row in rows]
 
 
 # Helper functions for API endpoints
 
-def get_communication_service(db):
-    """Factory function to create communication service"""
-    return CommunicationService(db)
+@functools.lru_cache(maxsize=1)
+def get_communication_service() -> CommunicationService:
+    """Shared CommunicationService, created on first use instead of per request"""
+    return CommunicationService()
@@ -1,15 +1,31 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Boolean, Text, Enum, ForeignKey, DECIMAL
+from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Boolean, Text, Enum, ForeignKey, DECIMAL, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
+import os
 import uuid
 import enum
 
-# Database URL - using SQLite for MVP, can switch to PostgreSQL
-DATABASE_URL = "sqlite:///./underwritepro.db"
-
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Database URL - PostgreSQL from the environment, SQLite file for local dev
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./underwritepro.db")
+
+# Hosting platforms hand out postgres:// but SQLAlchemy needs postgresql://
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+else:
+    # Pooled connections; size to the per-backend limit when behind pgbouncer
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "25")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "25")),
+        pool_timeout=30,
+        pool_recycle=1800,         # Recycle before server/proxy idle timeouts
+        pool_pre_ping=True,        # Drop dead connections before handing them out
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -101,6 +117,10 @@ class Borrower(Base):
 
 class Deal(Base):
     __tablename__ = "deals"
+    __table_args__ = (
+        # List views filter by organization and stage, newest first
+        Index("ix_deals_org_status_created", "organization_id", "status", "created_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     organization_id = Column(String, ForeignKey("organizations.id"), index=True)
@@ -3,11 +3,14 @@ Unified Database Module for UnderwritePro SaaS
 Supports PostgreSQL with connection pooling and production features
 """
 import os
+import asyncio
 import logging
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Boolean, Text, ForeignKey, event
+import asyncpg
+from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Boolean, Text, ForeignKey, Index, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from datetime import datetime
 import uuid
 import enum
@@ -61,6 +64,30 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine for read-heavy async routes (asyncpg driver)
+# asyncpg takes "ssl" rather than libpq's "sslmode"
+ASYNC_DATABASE_URL = DATABASE_URL.replace(
+    "postgresql://", "postgresql+asyncpg://", 1
+).replace("sslmode=", "ssl=")
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=20,
+    max_overflow=40,
+    pool_timeout=30,
+    pool_recycle=3600,
+    pool_pre_ping=True,
+    echo=False,
+)
+
+# Async session factory
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -131,10 +158,14 @@ class User(Base):
     role = Column(String, default="broker")
     organization_id = Column(String, ForeignKey("organizations.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
-    last_login = Column(DateTime, nullable=True)
+    last_login = Column(DateTime, nullable=True, index=True)
     
     organization = relationship("Organization", back_populates="users")
     deals = relationship("Deal", back_populates="created_by_user")
+    
+    __table_args__ = (
+        Index("idx_users_created_at_id", "created_at", "id"),
+    )
 
 class Borrower(Base):
     __tablename__ = "borrowers"
@@ -164,7 +195,7 @@ class Deal(Base):
     amortization_months = Column(Integer, default=240)
     balloon_months = Column(Integer, default=60)
     ltv_target = Column(Float, default=0.80)
-    created_by = Column(String, ForeignKey("users.id"))
+    created_by = Column(String, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -175,6 +206,11 @@ class Deal(Base):
     underwriting_results = relationship("UnderwritingResult", back_populates="deal")
     reports = relationship("Report", back_populates="deal")
     financial_data = relationship("FinancialData", back_populates="deal")
+    
+    __table_args__ = (
+        Index("idx_deals_created_at_id", "created_at", "id"),
+        Index("ix_deals_org_status_created", "organization_id", "status", "created_at"),
+    )
 
 class Document(Base):
     __tablename__ = "documents"
@@ -261,6 +297,11 @@ class AuditLog(Base):
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        Index("idx_audit_logs_created_at_id", "created_at", "id"),
+        Index("idx_audit_logs_created_at_action", "created_at", "action"),
+    )
 
 # Connection event listeners
 @event.listens_for(engine, "connect")
@@ -287,6 +328,69 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    Dependency function for FastAPI to get an async database session
+    Use from async routes so queries don't block the event loop
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Async database session error: {e}")
+            await db.rollback()
+            raise
+
+class AsyncDatabasePool:
+    """
+    Raw asyncpg pool for hot raw-SQL paths (AI bots)
+    Created lazily on first use so importing this module stays synchronous
+    """
+    
+    def __init__(self, dsn: str, **pool_kwargs):
+        self.dsn = dsn
+        self.pool_kwargs = pool_kwargs
+        self._pool = None
+        self._lock = asyncio.Lock()
+    
+    async def get_pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(self.dsn, **self.pool_kwargs)
+                    logger.info("asyncpg pool created")
+        return self._pool
+    
+    async def fetch(self, query: str, *args):
+        pool = await self.get_pool()
+        return await pool.fetch(query, *args)
+    
+    async def fetchrow(self, query: str, *args):
+        pool = await self.get_pool()
+        return await pool.fetchrow(query, *args)
+    
+    async def fetchval(self, query: str, *args):
+        pool = await self.get_pool()
+        return await pool.fetchval(query, *args)
+    
+    async def execute(self, query: str, *args):
+        pool = await self.get_pool()
+        return await pool.execute(query, *args)
+    
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+pg_pool = AsyncDatabasePool(
+    DATABASE_URL,
+    min_size=10,
+    max_size=50,
+    max_queries=50000,                      # Recycle a connection after this many queries
+    max_inactive_connection_lifetime=300,
+    statement_cache_size=1024,              # Server-side prepared statement cache per connection
+)
+
 def init_db():
     """
     Initialize database - create all tables
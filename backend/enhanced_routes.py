@@ -3,27 +3,34 @@ Enhanced Platform API Routes
 Exposes communication, AI bots, and workflow features
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
+import json
+import logging
 import sys
 
 # Import services
 from auth import get_current_user
 from database_unified import get_db
+from pagination import decode_cursor, next_page_cursor
 from communication import (
     CommunicationService, get_communication_service,
-    MessageCreate, ConversationCreate, EmailSend, SMSSend
+    MessageCreate, ConversationCreate, EmailSend, SMSSend, EmailBatchSend
 )
 from ai_bots import (
     AIBotService, get_ai_bot_service,
     AIBotRequest, ChatMessage
 )
+from ai_bots_extended import EXTENDED_BOTS, ExtendedBotRequest
 from workflows import (
     WorkflowEngine, get_workflow_engine,
     WorkflowCreate, WorkflowTemplates
 )
 
+logger = logging.getLogger(__name__)
+
 # Create routers
 communication_router = APIRouter(prefix="/api/communication", tags=["communication"])
 ai_router = APIRouter(prefix="/api/ai", tags=["ai"])
@@ -32,18 +39,21 @@ workflow_router = APIRouter(prefix="/api/workflows", tags=["workflows"])
 
 # ==================== Communication Routes ====================
 
+# Conversation lists page by keyset on (activity_at, id), using the same
+# opaque cursor format as the admin lists
+
+
 @communication_router.get("/conversations")
 async def list_conversations(
     deal_id: Optional[str] = None,
     borrower_id: Optional[str] = None,
     status: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
-    """List conversations with optional filters"""
-    comm_service = get_communication_service(db)
+    """List conversations with optional filters, paged by next_cursor"""
     
     filters = {}
     if deal_id:
@@ -53,19 +63,21 @@ async def list_conversations(
     if status:
         filters['status'] = status
     
-    conversations = comm_service.list_conversations(filters, limit, offset)
-    return {"success": True, "conversations": conversations, "count": len(conversations)}
+    conversations = await comm_service.list_conversations(
+        filters, limit + 1, decode_cursor(cursor) if cursor else None
+    )
+    next_cursor = next_page_cursor(conversations, limit, lambda row: (row['activity_at'], row['id']))
+    return {"success": True, "conversations": conversations, "count": len(conversations), "next_cursor": next_cursor}
 
 
 @communication_router.post("/conversations")
 async def create_conversation(
     conversation: ConversationCreate,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
     """Create a new conversation"""
-    comm_service = get_communication_service(db)
-    result = comm_service.create_conversation(conversation)
+    result = await comm_service.create_conversation(conversation)
     
     if result:
         return {"success": True, "conversation": result}
@@ -76,11 +88,10 @@ async def create_conversation(
 async def get_conversation(
     conversation_id: str,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
     """Get conversation details"""
-    comm_service = get_communication_service(db)
-    conversation = comm_service.get_conversation(conversation_id)
+    conversation = await comm_service.get_conversation(conversation_id)
     
     if conversation:
         return {"success": True, "conversation": conversation}
@@ -93,26 +104,39 @@ async def get_conversation_messages(
     limit: int = 100,
     offset: int = 0,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
     """Get messages in a conversation"""
-    comm_service = get_communication_service(db)
-    messages = comm_service.get_conversation_messages(conversation_id, limit, offset)
+    messages = await comm_service.get_conversation_messages(conversation_id, limit, offset)
     
     return {"success": True, "messages": messages, "count": len(messages)}
 
 
+@communication_router.post("/conversations/messages/bulk")
+async def create_messages_bulk(
+    messages: List[MessageCreate],
+    current_user: dict = Depends(get_current_user),
+    comm_service: CommunicationService = Depends(get_communication_service)
+):
+    """Record a campaign's messages across existing conversations in one insert"""
+    try:
+        created = await comm_service.create_messages_bulk(messages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"success": True, "messages": created, "count": len(created)}
+
+
 @communication_router.post("/conversations/{conversation_id}/messages")
 async def send_message(
     conversation_id: str,
     message: MessageCreate,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
     """Send a message in a conversation"""
-    comm_service = get_communication_service(db)
     message.conversation_id = conversation_id
-    result = comm_service.create_message(message)
+    result = await comm_service.create_message(message)
     
     if result:
         # If email or SMS, actually send it
@@ -123,9 +147,9 @@ async def send_message(
                 body_text=message.body,
                 body_html=message.html_body
             )
-            send_result = comm_service.send_email(email)
+            send_result = await comm_service.send_email(email)
             if send_result.get('success'):
-                comm_service.mark_message_sent(result['id'])
+                await comm_service.mark_message_sent(result['id'])
         
         return {"success": True, "message": result}
     raise HTTPException(status_code=400, detail="Failed to send message")
@@ -135,40 +159,80 @@ async def send_message(
 async def send_email(
     email: EmailSend,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
     """Send a standalone email"""
-    comm_service = get_communication_service(db)
-    result = comm_service.send_email(email)
+    result = await comm_service.send_email(email)
     
     return result
 
 
+@communication_router.post("/email/send-bulk")
+async def send_bulk_emails(
+    emails: List[EmailSend],
+    current_user: dict = Depends(get_current_user),
+    comm_service: CommunicationService = Depends(get_communication_service)
+):
+    """Send a batch of emails concurrently"""
+    results = await comm_service.send_bulk_emails(emails)
+    
+    sent = sum(1 for result in results if result.get('success'))
+    return {"success": True, "results": results, "sent": sent, "failed": len(results) - sent}
+
+
+@communication_router.post("/email/send-batch")
+async def send_email_batch(
+    batch: EmailBatchSend,
+    current_user: dict = Depends(get_current_user),
+    comm_service: CommunicationService = Depends(get_communication_service)
+):
+    """Send one templated email to many recipients, personalized per recipient"""
+    results = await comm_service.send_email_batch(
+        batch.model_dump(include={'subject', 'body_html', 'body_text'}),
+        [recipient.model_dump() for recipient in batch.recipients],
+        batch.from_email, batch.from_name
+    )
+    
+    sent = sum(result['recipients'] for result in results if result.get('success'))
+    return {"success": True, "results": results, "sent": sent, "failed": len(batch.recipients) - sent}
+
+
 @communication_router.post("/sms/send")
 async def send_sms(
     sms: SMSSend,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
     """Send a standalone SMS"""
-    comm_service = get_communication_service(db)
-    result = comm_service.send_sms(sms)
+    result = await comm_service.send_sms(sms)
     
     return result
 
 
+@communication_router.post("/sms/send-bulk")
+async def send_bulk_sms(
+    messages: List[SMSSend],
+    current_user: dict = Depends(get_current_user),
+    comm_service: CommunicationService = Depends(get_communication_service)
+):
+    """Send a batch of SMS concurrently"""
+    results = await comm_service.send_bulk_sms(messages)
+    
+    sent = sum(1 for result in results if result.get('success'))
+    return {"success": True, "results": results, "sent": sent, "failed": len(results) - sent}
+
+
 @communication_router.get("/inbox")
 async def get_unified_inbox(
     status: Optional[str] = None,
     channel: Optional[str] = None,
     unread_only: bool = False,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    comm_service: CommunicationService = Depends(get_communication_service)
 ):
-    """Get unified inbox for current user"""
-    comm_service = get_communication_service(db)
+    """Get unified inbox for current user, paged by next_cursor"""
     
     filters = {}
     if status:
@@ -178,8 +242,11 @@ async def get_unified_inbox(
     if unread_only:
         filters['unread_only'] = True
     
-    inbox = comm_service.get_unified_inbox(current_user['id'], filters, limit, offset)
-    return {"success": True, "inbox": inbox, "count": len(inbox)}
+    inbox = await comm_service.get_unified_inbox(
+        current_user['id'], filters, limit + 1, decode_cursor(cursor) if cursor else None
+    )
+    next_cursor = next_page_cursor(inbox, limit, lambda row: (row['activity_at'], row['conversation_id']))
+    return {"success": True, "inbox": inbox, "count": len(inbox), "next_cursor": next_cursor}
 
 
 # ==================== AI Bot Routes ====================
@@ -192,11 +259,44 @@ async def chat_with_bot(
 ):
     """Chat with an AI bot"""
     ai_service = get_ai_bot_service(db)
-    response = ai_service.chat_with_bot(request, current_user['id'])
+    response = await ai_service.chat_with_bot(request, current_user['id'])
     
     return response
 
 
+async def _sse_events(stream):
+    """
+    Relay streamed text as server-sent events
+    
+    The 200 and headers are already sent by the time a provider fails, so
+    errors become an error event and the stream still ends with [DONE].
+    """
+    try:
+        async for text in stream:
+            yield f"data: {json.dumps({'content': text})}\n\n"
+    except Exception:
+        logger.exception("AI stream failed")
+        yield f"event: error\ndata: {json.dumps({'error': 'The assistant is unavailable right now. Please try again.'})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@ai_router.post("/chat/stream")
+async def chat_with_bot_stream(
+    request: AIBotRequest,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Chat with an AI bot - streams the response as server-sent events"""
+    ai_service = get_ai_bot_service(db)
+    if not ai_service.get_bot(request.bot_type):
+        raise HTTPException(status_code=404, detail=f"Bot type {request.bot_type} not found")
+    
+    return StreamingResponse(
+        _sse_events(ai_service.chat_with_bot_stream(request, current_user['id'])),
+        media_type="text/event-stream"
+    )
+
+
 @ai_router.post("/onboarding/checklist")
 async def generate_onboarding_checklist(
     deal_id: str,
@@ -214,7 +314,7 @@ async def generate_onboarding_checklist(
     if not deal_data:
         raise HTTPException(status_code=404, detail="Deal not found")
     
-    result = bot.generate_document_checklist(deal_data[0])
+    result = await bot.generate_document_checklist(deal_data[0])
     return result
 
 
@@ -229,7 +329,7 @@ async def summarize_document(
     ai_service = get_ai_bot_service(db)
     bot = ai_service.get_bot('sage_summarizer')
     
-    result = bot.summarize_financial_statement(document_text, document_type)
+    result = await bot.summarize_financial_statement(document_text, document_type)
     return result
 
 
@@ -243,7 +343,7 @@ async def analyze_deal_risk(
     ai_service = get_ai_bot_service(db)
     bot = ai_service.get_bot('remy_risk')
     
-    result = bot.analyze_deal_risk(deal_id)
+    result = await bot.analyze_deal_risk(deal_id)
     return result
 
 
@@ -257,7 +357,7 @@ async def calculate_relationship_score(
     ai_service = get_ai_bot_service(db)
     bot = ai_service.get_bot('axel_relationship')
     
-    result = bot.calculate_relationship_score(borrower_id)
+    result = await bot.calculate_relationship_score(borrower_id)
     return result
 
 
@@ -279,7 +379,7 @@ async def suggest_negotiation_strategy(
     if not deal_data:
         raise HTTPException(status_code=404, detail="Deal not found")
     
-    result = bot.suggest_negotiation_strategy(deal_data[0], borrower_request)
+    result = await bot.suggest_negotiation_strategy(deal_data[0], borrower_request)
     return result
 
 
@@ -305,7 +405,32 @@ async def generate_term_sheet(
     if not deal_data:
         raise HTTPException(status_code=404, detail="Deal not found")
     
-    result = bot.generate_term_sheet(deal_data[0])
+    result = await bot.generate_term_sheet(deal_data[0])
+    return result
+
+
+@ai_router.post("/onboarding/package")
+async def generate_onboarding_package(
+    deal_id: str,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Generate document checklist and term sheet together in one AI call"""
+    ai_service = get_ai_bot_service(db)
+    
+    # Get deal data with borrower info
+    deal_query = """
+        SELECT d.*, b.name as borrower_name, b.entity_type
+        FROM deals d
+        LEFT JOIN borrowers b ON d.borrower_id = b.id
+        WHERE d.id = %s
+    """
+    deal_data = db.execute_query(deal_query, (deal_id,))
+    
+    if not deal_data:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    
+    result = await ai_service.generate_onboarding_package(deal_data[0])
     return result
 
 
@@ -346,6 +471,42 @@ async def update_recommendation(
     return {"success": True, "status": status}
 
 
+@ai_router.post("/extended/{bot_id}")
+async def chat_with_extended_bot(
+    bot_id: str,
+    request: ExtendedBotRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Chat with one of the extended specialist bots"""
+    bot = EXTENDED_BOTS.get(bot_id)
+    if not bot:
+        raise HTTPException(status_code=404, detail=f"Extended bot {bot_id} not found")
+    
+    response = await bot["function"](
+        request.context, request.message, request.premium,
+        org_id=current_user.get("organization_id")
+    )
+    return {"success": True, "bot": bot["name"], "response": response}
+
+
+@ai_router.post("/extended/{bot_id}/stream")
+async def chat_with_extended_bot_stream(
+    bot_id: str,
+    request: ExtendedBotRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Chat with an extended bot - streams the response as server-sent events"""
+    bot = EXTENDED_BOTS.get(bot_id)
+    if not bot:
+        raise HTTPException(status_code=404, detail=f"Extended bot {bot_id} not found")
+    
+    stream = bot["stream"](
+        request.context, request.message, request.premium,
+        org_id=current_user.get("organization_id")
+    )
+    return StreamingResponse(_sse_events(stream), media_type="text/event-stream")
+
+
 # ==================== Workflow Routes ====================
 
 @workflow_router.get("")
@@ -427,10 +588,9 @@ async def execute_workflow(
     db = Depends(get_db)
 ):
     """Manually execute a workflow"""
-    comm_service = get_communication_service(db)
-    workflow_engine = get_workflow_engine(db, comm_service)
+    workflow_engine = get_workflow_engine(db, get_communication_service())
     
-    execution_id = workflow_engine.execute_workflow(workflow_id, entity_type, entity_id, context)
+    execution_id = await workflow_engine.execute_workflow(workflow_id, entity_type, entity_id, context)
     
     if execution_id:
         return {"success": True, "execution_id": execution_id}
@@ -3,9 +3,10 @@ UnderwritePro SaaS - Production Ultimate Edition
 Enterprise-grade commercial loan underwriting platform
 """
 from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List, Dict
@@ -486,15 +487,8 @@ def analyze_loan(
 # AI ADVISOR ENDPOINTS
 # ============================================================================
 
-@app.post("/api/ai/ask")
-def ai_ask(
-    request: AIAskRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """AI Advisor endpoint - answers commercial lending questions"""
-    
-    # Get context if loan_id provided
+def _ai_question_context(request: AIAskRequest, current_user: User, db: Session) -> Dict:
+    """Merge request context with the referenced loan's data"""
     context = request.context or {}
     if request.loan_id:
         deal = db.query(Deal).filter(
@@ -514,14 +508,10 @@ def ai_ask(
                 "status": deal.status,
                 **metadata
             })
-    
-    # Get AI response
-    response = ai_advisor.ask_underwriting_question(
-        question=request.question,
-        context=context if context else None
-    )
-    
-    # Log the interaction
+    return context
+
+def _log_ai_query(request: AIAskRequest, current_user: User, db: Session):
+    """Record an AI advisor question in the audit log"""
     audit_log = AuditLog(
         organization_id=current_user.organization_id,
         user_id=current_user.id,
@@ -532,9 +522,53 @@ def ai_ask(
     )
     db.add(audit_log)
     db.commit()
+
+@app.post("/api/ai/ask")
+async def ai_ask(
+    request: AIAskRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """AI Advisor endpoint - answers commercial lending questions"""
+    
+    # Get context if loan_id provided; the sync Session stays off the event loop
+    context = await run_in_threadpool(_ai_question_context, request, current_user, db)
+    
+    # Get AI response
+    response = await ai_advisor.ask_underwriting_question(
+        question=request.question,
+        context=context if context else None
+    )
+    
+    # Log the interaction
+    await run_in_threadpool(_log_ai_query, request, current_user, db)
     
     return response
 
+@app.post("/api/ai/ask/stream")
+async def ai_ask_stream(
+    request: AIAskRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """AI Advisor endpoint - streams the answer as server-sent events"""
+    
+    # Get context if loan_id provided; the sync Session stays off the event loop
+    context = await run_in_threadpool(_ai_question_context, request, current_user, db)
+    
+    # Log the interaction
+    await run_in_threadpool(_log_ai_query, request, current_user, db)
+    
+    async def events():
+        async for text in ai_advisor.ask_underwriting_question_stream(
+            question=request.question,
+            context=context if context else None
+        ):
+            yield f"data: {json.dumps({'content': text})}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 # ============================================================================
 # DOCUMENT PROCESSING ENDPOINTS
 # ============================================================================
@@ -0,0 +1,6 @@
+-- Admin Keyset Pagination Indexes
+-- Supports ORDER BY created_at DESC, id DESC with (created_at, id) < cursor
+
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_deals_created_at_id ON deals(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_created_at_id ON audit_logs(created_at, id);
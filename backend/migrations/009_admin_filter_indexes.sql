@@ -0,0 +1,11 @@
+-- Admin Filter Indexes
+-- Covers the predicates used by the admin stats and system-health endpoints
+
+-- Active users today (range scan on last_login)
+CREATE INDEX IF NOT EXISTS ix_users_last_login ON users(last_login);
+
+-- Deal counts per creator
+CREATE INDEX IF NOT EXISTS ix_deals_created_by ON deals(created_by);
+
+-- Error rate over the last hour
+CREATE INDEX IF NOT EXISTS idx_audit_logs_created_at_action ON audit_logs(created_at, action);
@@ -0,0 +1,5 @@
+-- Calendar JSON Columns
+-- Appointment attendees are stored as JSONB like calendars.settings, so they
+-- are read back with the JSON decoder instead of eval()
+
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS attendees JSONB DEFAULT '[]'::jsonb;
@@ -0,0 +1,18 @@
+-- Calendar Indexes
+-- Covers the availability and reminder lookups in the calendar service
+
+-- Overlap checks and slot listing for live bookings on a calendar
+CREATE INDEX IF NOT EXISTS idx_appt_cal_time ON appointments(calendar_id, start_time, end_time) WHERE status != 'cancelled';
+
+-- The service schedules reminders at an absolute time; the 003 schema only
+-- has send_minutes_before, so add the column (backfilled from it) and stop
+-- requiring the offset, which the service does not write
+ALTER TABLE appointment_reminders ADD COLUMN IF NOT EXISTS reminder_time TIMESTAMP;
+UPDATE appointment_reminders r
+SET reminder_time = a.start_time - make_interval(mins => r.send_minutes_before)
+FROM appointments a
+WHERE r.appointment_id = a.id AND r.reminder_time IS NULL AND r.send_minutes_before IS NOT NULL;
+ALTER TABLE appointment_reminders ALTER COLUMN send_minutes_before DROP NOT NULL;
+
+-- Pending reminders due for sending
+CREATE INDEX IF NOT EXISTS idx_appt_reminders_status_time ON appointment_reminders(status, reminder_time);
@@ -0,0 +1,5 @@
+-- Appointment Versioning
+-- Optimistic locking for update_appointment: each update bumps version and
+-- can be made conditional on the version the client last read
+
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,12 @@
+-- Appointment Time Ranges
+-- Stores each booking as a half-open tsrange so overlap checks can use the
+-- && operator against a GiST index instead of two B-tree range bounds
+
+-- Lets the GiST index include the calendar_id equality column
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS during tsrange
+    GENERATED ALWAYS AS (tsrange(start_time, end_time, '[)')) STORED;
+
+-- Overlap checks and slot listing for live bookings on a calendar
+CREATE INDEX IF NOT EXISTS idx_appt_cal_during ON appointments USING gist (calendar_id, during) WHERE status != 'cancelled';
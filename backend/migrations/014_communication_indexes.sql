@@ -0,0 +1,15 @@
+-- Communication Indexes
+-- Composite indexes for the conversation list, message thread and unified
+-- inbox queries in the communication service
+
+-- Conversations by assignee and status, most recent activity first
+CREATE INDEX IF NOT EXISTS ix_conv_assigned_status_lastmsg ON conversations(assigned_to, status, last_message_at DESC);
+
+-- Message threads and latest message per conversation
+CREATE INDEX IF NOT EXISTS ix_msg_conv_created ON messages(conversation_id, created_at DESC);
+
+-- Unread counts per conversation
+CREATE INDEX IF NOT EXISTS ix_msg_unread ON messages(conversation_id) WHERE status != 'read';
+
+-- Deal list views per organization and stage
+CREATE INDEX IF NOT EXISTS ix_deals_org_status_created ON deals(organization_id, status, created_at);
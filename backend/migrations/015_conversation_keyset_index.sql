@@ -0,0 +1,5 @@
+-- Conversation Keyset Pagination Index
+-- Supports ORDER BY COALESCE(last_message_at, created_at) DESC, id DESC with
+-- (COALESCE(last_message_at, created_at), id) < cursor
+
+CREATE INDEX IF NOT EXISTS ix_conv_activity_id ON conversations((COALESCE(last_message_at, created_at)), id);
@@ -0,0 +1,39 @@
+"""
+Keyset Pagination Cursors
+Shared by the admin and communication list endpoints
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException
+
+# List endpoints page by keyset on (timestamp, id), newest first.
+# The cursor is an opaque token holding the last row's sort key.
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Encode the sort key of the last row on a page"""
+    raw = json.dumps([created_at.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor
+
+    Any malformed token, including one whose id is not a UUID, is the
+    client's error, so it becomes a 400 rather than failing in the query.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(uuid.UUID(row_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def next_page_cursor(rows: list, limit: int, sort_key: Callable[[Any], Tuple[datetime, str]]) -> Optional[str]:
+    """Trim the look-ahead row and return the cursor for the following page"""
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(*sort_key(rows[-1]))
@@ -0,0 +1,38 @@
+"""
+Tests for how bots send their system prompt to each provider
+Run with: pytest test_ai_bots_system_prompt.py
+"""
+
+import pytest
+
+import ai_bots
+from ai_bots import AIBot, SYSTEM_PROMPT_CACHE_TTL
+
+PROMPT = "You are a test bot."
+
+
+@pytest.fixture
+def bot():
+    # A client is passed in so no LLM backend needs configuring
+    return AIBot(None, 'test_bot', PROMPT, client=object())
+
+
+def test_anthropic_gets_a_cacheable_block_list(bot, monkeypatch):
+    monkeypatch.setattr(ai_bots, 'AI_PROVIDER', 'anthropic')
+
+    system = bot._build_messages("Hi", None, "")[0]
+
+    assert system['role'] == 'system'
+    assert system['content'] == [{
+        'type': 'text',
+        'text': PROMPT,
+        'cache_control': {'type': 'ephemeral', 'ttl': SYSTEM_PROMPT_CACHE_TTL}
+    }]
+
+
+def test_openai_gets_the_plain_prompt_string(bot, monkeypatch):
+    monkeypatch.setattr(ai_bots, 'AI_PROVIDER', 'openai')
+
+    system = bot._build_messages("Hi", None, "")[0]
+
+    assert system == {'role': 'system', 'content': PROMPT}
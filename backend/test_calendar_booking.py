@@ -0,0 +1,152 @@
+"""
+Tests for appointment booking conflicts and optimistic locking
+Run with: pytest test_calendar_booking.py
+The Postgres tests run when TEST_DATABASE_URL points at a scratch database.
+"""
+
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from calendar_service import CalendarService, ConcurrentModificationError, SlotUnavailableError
+
+
+class RecordingPool:
+    """Stands in for pg_pool, recording each fetchrow and matching no rows"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def fetchrow(self, query, *args):
+        self.calls.append((query, args))
+        return None
+
+
+def test_stale_version_raises_instead_of_returning_none():
+    pool = RecordingPool()
+    appointment_id = str(uuid.uuid4())
+
+    with pytest.raises(ConcurrentModificationError):
+        asyncio.run(CalendarService(db=pool).update_appointment(
+            appointment_id, expected_version=3, title='Closing call'
+        ))
+
+    query, args = pool.calls[0]
+    assert 'version = version + 1' in query
+    assert 'AND version = $3' in query
+    assert args == ('Closing call', appointment_id, 3)
+
+
+def test_update_without_version_is_unconditional():
+    pool = RecordingPool()
+
+    result = asyncio.run(CalendarService(db=pool).update_appointment(str(uuid.uuid4()), title='x'))
+
+    assert result is None
+    assert 'AND version' not in pool.calls[0][0]
+
+
+class ConnectionPool:
+    """Stands in for pg_pool on a single connection; temp tables are per connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def get_pool(self):
+        return self
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+    def __getattr__(self, name):
+        # fetch, fetchrow, fetchval and execute go straight to the connection
+        return getattr(self.conn, name)
+
+
+SCHEMA_SQL = """
+    CREATE TEMP TABLE appointments (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        calendar_id UUID NOT NULL,
+        deal_id UUID, borrower_id UUID,
+        title TEXT NOT NULL, description TEXT, location TEXT,
+        attendees JSONB,
+        start_time TIMESTAMP NOT NULL,
+        end_time TIMESTAMP NOT NULL,
+        status TEXT DEFAULT 'scheduled',
+        cancellation_reason TEXT,
+        version INTEGER NOT NULL DEFAULT 1,
+        during tsrange GENERATED ALWAYS AS (tsrange(start_time, end_time, '[)')) STORED,
+        created_at TIMESTAMP DEFAULT NOW()
+    );
+    CREATE TEMP TABLE appointment_reminders (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        appointment_id UUID REFERENCES appointments(id),
+        reminder_time TIMESTAMP, reminder_type TEXT, status TEXT,
+        created_at TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+
+def _with_service(test):
+    """Run test(service, conn) against a fresh schema on a scratch connection"""
+    asyncpg = pytest.importorskip('asyncpg')
+
+    async def run():
+        conn = await asyncpg.connect(os.environ['TEST_DATABASE_URL'])
+        try:
+            await conn.execute(SCHEMA_SQL)
+            await test(CalendarService(db=ConnectionPool(conn)), conn)
+        finally:
+            await conn.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not os.getenv('TEST_DATABASE_URL'), reason='TEST_DATABASE_URL not set')
+def test_overlapping_booking_is_refused():
+    async def test(service, conn):
+        calendar_id = str(uuid.uuid4())
+        await service.create_appointment_if_available(
+            calendar_id, 'First', datetime(2026, 3, 2, 10), datetime(2026, 3, 2, 11)
+        )
+
+        # The route turns this into a 409
+        with pytest.raises(SlotUnavailableError):
+            await service.create_appointment_if_available(
+                calendar_id, 'Second', datetime(2026, 3, 2, 10, 30), datetime(2026, 3, 2, 11, 30)
+            )
+        # Ranges are half-open, so back-to-back bookings don't collide
+        await service.create_appointment_if_available(
+            calendar_id, 'Third', datetime(2026, 3, 2, 11), datetime(2026, 3, 2, 12)
+        )
+
+        titles = [row['title'] for row in await conn.fetch("SELECT title FROM appointments ORDER BY start_time")]
+        assert titles == ['First', 'Third']
+        assert await conn.fetchval("SELECT COUNT(*) FROM appointment_reminders") == 4
+
+    _with_service(test)
+
+
+@pytest.mark.skipif(not os.getenv('TEST_DATABASE_URL'), reason='TEST_DATABASE_URL not set')
+def test_update_at_stale_version_is_refused():
+    async def test(service, conn):
+        booked = await service.create_appointment_if_available(
+            str(uuid.uuid4()), 'Site visit', datetime(2026, 3, 2, 10), datetime(2026, 3, 2, 11)
+        )
+
+        updated = await service.update_appointment(booked['id'], expected_version=1, title='Site visit (moved)')
+        assert updated['version'] == 2
+
+        # A second writer still holding version 1 loses; the route turns this into a 409
+        with pytest.raises(ConcurrentModificationError):
+            await service.update_appointment(booked['id'], expected_version=1, title='Stale edit')
+
+        row = await conn.fetchrow("SELECT title, version FROM appointments WHERE id = $1", booked['id'])
+        assert (row['title'], row['version']) == ('Site visit (moved)', 2)
+
+    _with_service(test)
@@ -0,0 +1,174 @@
+"""
+Tests for the bulk communication paths: campaign message insert and batch sends
+Run with: pytest test_communication_bulk.py
+The Postgres test runs when TEST_DATABASE_URL points at a scratch database.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+
+import communication
+from communication import CommunicationService, MessageCreate, SMSSend
+
+
+class RecordingPool:
+    """Stands in for pg_pool, recording each fetch and returning no rows"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def fetch(self, query, *args):
+        self.calls.append((query, args))
+        return []
+
+
+def _message(conversation_id, body, metadata=None):
+    return MessageCreate(
+        conversation_id=conversation_id,
+        sender_type='user',
+        sender_id=str(uuid.uuid4()),
+        recipient_type='borrower',
+        recipient_id=str(uuid.uuid4()),
+        channel='email',
+        subject='Rate update',
+        body=body,
+        metadata=metadata
+    )
+
+
+def test_binds_one_array_per_column():
+    pool = RecordingPool()
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+    messages = [_message(first, 'a', {'campaign': 'q3'}), _message(second, 'b')]
+
+    asyncio.run(CommunicationService(db=pool).create_messages_bulk(messages))
+
+    assert len(pool.calls) == 1
+    query, args = pool.calls[0]
+    assert 'unnest(' in query
+    assert len(args) == 10
+    assert all(isinstance(arg, list) and len(arg) == 2 for arg in args)
+    assert args[0] == [first, second]
+    assert args[7] == ['a', 'b']
+    assert [json.loads(args[9][0]), args[9][1]] == [{'campaign': 'q3'}, None]
+
+
+def test_empty_batch_skips_the_database():
+    pool = RecordingPool()
+    assert asyncio.run(CommunicationService(db=pool).create_messages_bulk([])) == []
+    assert pool.calls == []
+
+
+def test_requires_a_conversation_on_every_message():
+    pool = RecordingPool()
+    with pytest.raises(ValueError):
+        asyncio.run(CommunicationService(db=pool).create_messages_bulk([_message(None, 'a')]))
+    assert pool.calls == []
+
+
+class RecordingClient:
+    """Stands in for the provider HTTP client, accepting every request"""
+
+    class Response:
+        status_code = 202
+        headers = {'X-Message-Id': 'msg'}
+
+        def raise_for_status(self):
+            pass
+
+    def __init__(self):
+        self.payloads = []
+
+    async def post(self, url, json=None, **kwargs):
+        self.payloads.append(json)
+        return self.Response()
+
+
+def test_email_batch_packs_recipients_into_sendgrid_requests(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(communication, 'get_http_client', lambda: client)
+    service = CommunicationService(db=RecordingPool())
+    service.sendgrid_key = 'test'
+    recipients = [
+        {'email': f'borrower{i}@example.com', 'variables': {'name': f'B{i}'}}
+        for i in range(2500)
+    ]
+
+    results = asyncio.run(service.send_email_batch(
+        {'subject': 'Hi {{name}}', 'body_html': '<p>{{name}}</p>'}, recipients
+    ))
+
+    assert [len(p['personalizations']) for p in client.payloads] == [1000, 1000, 500]
+    assert [r['recipients'] for r in results] == [1000, 1000, 500]
+    assert client.payloads[0]['personalizations'][1]['substitutions'] == {'{{name}}': 'B1'}
+
+
+def test_bulk_sms_returns_one_result_per_message():
+    service = CommunicationService(db=RecordingPool())
+    service.twilio_account_sid = None  # Simulated sends
+    messages = [SMSSend(to_phone=f'+1555000{i:04d}', body='Docs due Friday') for i in range(450)]
+
+    results = asyncio.run(service.send_bulk_sms(messages))
+
+    assert len(results) == 450
+    assert all(r['success'] for r in results)
+
+
+SCHEMA_SQL = """
+    CREATE TEMP TABLE conversations (
+        id UUID PRIMARY KEY,
+        last_message_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT NOW()
+    );
+    CREATE TEMP TABLE messages (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        conversation_id UUID REFERENCES conversations(id),
+        sender_type TEXT, sender_id UUID, recipient_type TEXT, recipient_id UUID,
+        channel TEXT, subject TEXT, body TEXT, html_body TEXT,
+        status TEXT, metadata JSONB,
+        created_at TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+
+@pytest.mark.skipif(not os.getenv('TEST_DATABASE_URL'), reason='TEST_DATABASE_URL not set')
+def test_inserts_rows_and_bumps_last_message_at():
+    asyncpg = pytest.importorskip('asyncpg')
+
+    async def run():
+        conn = await asyncpg.connect(os.environ['TEST_DATABASE_URL'])
+        try:
+            await conn.execute(SCHEMA_SQL)
+            first, second, idle = (str(uuid.uuid4()) for _ in range(3))
+            await conn.executemany(
+                "INSERT INTO conversations (id) VALUES ($1)", [(first,), (second,), (idle,)]
+            )
+
+            # A single connection stands in for the pool; temp tables are per connection
+            created = await CommunicationService(db=conn).create_messages_bulk([
+                _message(first, 'a', {'campaign': 'q3'}),
+                _message(first, 'b'),
+                _message(second, 'c')
+            ])
+
+            assert [row['body'] for row in created] == ['a', 'b', 'c']
+            assert all(row['status'] == 'draft' for row in created)
+            assert await conn.fetchval("SELECT COUNT(*) FROM messages") == 3
+
+            newest = {}
+            for row in created:
+                key = str(row['conversation_id'])
+                newest[key] = max(newest.get(key, row['created_at']), row['created_at'])
+            bumped = {
+                str(row['id']): row['last_message_at']
+                for row in await conn.fetch("SELECT id, last_message_at FROM conversations")
+            }
+            assert bumped == {first: newest[first], second: newest[second], idle: None}
+        finally:
+            await conn.close()
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+"""
+Tests for the keyset pagination cursors shared by the list endpoints
+Run with: pytest test_pagination.py
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, next_page_cursor
+
+
+def test_cursor_round_trips_the_sort_key():
+    created_at, row_id = datetime(2026, 3, 2, 10, 15, 30, 123456), str(uuid.uuid4())
+
+    assert decode_cursor(encode_cursor(created_at, row_id)) == (created_at, row_id)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    base64.urlsafe_b64encode(b'[]').decode(),
+    base64.urlsafe_b64encode(json.dumps(['2026-03-02T10:00:00', 'abc']).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(['yesterday', str(uuid.uuid4())]).encode()).decode(),
+])
+def test_malformed_cursor_is_a_client_error(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_next_page_cursor_trims_the_look_ahead_row():
+    rows = [(datetime(2026, 3, 2, 10, i), str(uuid.uuid4())) for i in range(4)]
+    page = list(rows)
+
+    cursor = next_page_cursor(page, 3, lambda row: row)
+
+    assert page == rows[:3]
+    assert decode_cursor(cursor) == rows[2]
+
+
+def test_last_page_has_no_cursor():
+    rows = [(datetime(2026, 3, 2, 10), str(uuid.uuid4()))]
+
+    assert next_page_cursor(rows, 3, lambda row: row) is None
+    assert len(rows) == 1
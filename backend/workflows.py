@@ -8,6 +8,8 @@ from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import json
 
+from database_unified import pg_pool
+
 
 # Pydantic Models
 
@@ -29,10 +31,16 @@ class WorkflowAction(BaseModel):
 # Workflow Engine
 
 class WorkflowEngine:
-    """Handles workflow automation"""
+    """Handles workflow automation
+    
+    Workflow management runs on the sync db handle; execution is async and
+    runs its queries on the asyncpg pool, alongside the async communication
+    service it drives.
+    """
     
-    def __init__(self, db, communication_service=None):
+    def __init__(self, db, communication_service=None, pool=pg_pool):
         self.db = db
+        self.pool = pool
         self.communication_service = communication_service
         
         # Register action handlers
@@ -127,57 +135,56 @@ class WorkflowEngine:
     
     # Workflow Execution
     
-    def trigger_workflows(self, trigger_type: str, entity_type: str, entity_id: str, trigger_data: Dict[str, Any]) -> List[str]:
+    async def trigger_workflows(self, trigger_type: str, entity_type: str, entity_id: str, trigger_data: Dict[str, Any]) -> List[str]:
         """Find and execute workflows matching the trigger"""
         # Find active workflows with matching trigger
         query = """
             SELECT * FROM workflows 
-            WHERE trigger_type = %s AND is_active = true
+            WHERE trigger_type = $1 AND is_active = true
         """
-        workflows = self.db.execute_query(query, (trigger_type,))
+        workflows = [dict(row) for row in await self.pool.fetch(query, trigger_type)]
         
         execution_ids = []
         
         for workflow in workflows:
             # Check if trigger conditions match
             if self._check_trigger_conditions(workflow, trigger_data):
-                execution_id = self.execute_workflow(workflow['id'], entity_type, entity_id, trigger_data)
+                execution_id = await self.execute_workflow(workflow['id'], entity_type, entity_id, trigger_data)
                 if execution_id:
                     execution_ids.append(execution_id)
         
         return execution_ids
     
-    def execute_workflow(self, workflow_id: str, entity_type: str, entity_id: str, context: Dict[str, Any]) -> Optional[str]:
+    async def execute_workflow(self, workflow_id: str, entity_type: str, entity_id: str, context: Dict[str, Any]) -> Optional[str]:
         """Execute a workflow"""
         # Create execution record
         execution_query = """
             INSERT INTO workflow_executions (workflow_id, trigger_entity_type, trigger_entity_id, status, started_at)
-            VALUES (%s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5)
             RETURNING id
         """
-        result = self.db.execute_query(
+        execution_id = await self.pool.fetchval(
             execution_query,
-            (workflow_id, entity_type, entity_id, 'running', datetime.now())
+            workflow_id, entity_type, entity_id, 'running', datetime.now()
         )
         
-        if not result:
+        if not execution_id:
             return None
         
-        execution_id = result[0]['id']
         execution_log = []
         
         try:
             # Get workflow actions
             actions_query = """
                 SELECT * FROM workflow_actions 
-                WHERE workflow_id = %s 
+                WHERE workflow_id = $1 
                 ORDER BY order_index
             """
-            actions = self.db.execute_query(actions_query, (workflow_id,))
+            actions = await self.pool.fetch(actions_query, workflow_id)
             
             # Execute each action
             for action in actions:
-                action_result = self._execute_action(action, entity_type, entity_id, context)
+                action_result = await self._execute_action(action, entity_type, entity_id, context)
                 execution_log.append({
                     'action_type': action['action_type'],
                     'timestamp': datetime.now().isoformat(),
@@ -187,12 +194,12 @@ class WorkflowEngine:
             # Update execution as completed
             update_query = """
                 UPDATE workflow_executions 
-                SET status = 'completed', completed_at = %s, execution_log = %s
-                WHERE id = %s
+                SET status = 'completed', completed_at = $1, execution_log = $2
+                WHERE id = $3
             """
-            self.db.execute_query(
+            await self.pool.execute(
                 update_query,
-                (datetime.now(), json.dumps(execution_log), execution_id)
+                datetime.now(), json.dumps(execution_log), execution_id
             )
             
             return execution_id
@@ -201,12 +208,12 @@ class WorkflowEngine:
             # Update execution as failed
             update_query = """
                 UPDATE workflow_executions 
-                SET status = 'failed', completed_at = %s, error_message = %s, execution_log = %s
-                WHERE id = %s
+                SET status = 'failed', completed_at = $1, error_message = $2, execution_log = $3
+                WHERE id = $4
             """
-            self.db.execute_query(
+            await self.pool.execute(
                 update_query,
-                (datetime.now(), str(e), json.dumps(execution_log), execution_id)
+                datetime.now(), str(e), json.dumps(execution_log), execution_id
             )
             return None
     
@@ -245,7 +252,7 @@ class WorkflowEngine:
         
         return True
     
-    def _execute_action(self, action: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_action(self, action: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a single action"""
         action_type = action['action_type']
         action_config = action.get('action_config', {})
@@ -258,11 +265,11 @@ class WorkflowEngine:
             return {'success': False, 'error': f'Unknown action type: {action_type}'}
         
         # Execute handler
-        return handler(action_config, entity_type, entity_id, context)
+        return await handler(action_config, entity_type, entity_id, context)
     
     # Action Handlers
     
-    def _handle_send_email(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_send_email(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Send email action"""
         if not self.communication_service:
             return {'success': False, 'error': 'Communication service not available'}
@@ -280,9 +287,9 @@ class WorkflowEngine:
             body_html=config.get('body_html')
         )
         
-        return self.communication_service.send_email(email)
+        return await self.communication_service.send_email(email)
     
-    def _handle_send_sms(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_send_sms(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Send SMS action"""
         if not self.communication_service:
             return {'success': False, 'error': 'Communication service not available'}
@@ -296,9 +303,9 @@ class WorkflowEngine:
             body=body
         )
         
-        return self.communication_service.send_sms(sms)
+        return await self.communication_service.send_sms(sms)
     
-    def _handle_create_task(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_create_task(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Create task action"""
         title = self._replace_variables(config.get('title', ''), context)
         description = self._replace_variables(config.get('description', ''), context)
@@ -306,7 +313,7 @@ class WorkflowEngine:
         query = """
             INSERT INTO tasks (organization_id, assigned_to, deal_id, title, description, 
                              task_type, priority, due_date)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
             RETURNING id
         """
         
@@ -314,17 +321,17 @@ class WorkflowEngine:
         if config.get('due_in_days'):
             due_date = datetime.now() + timedelta(days=config['due_in_days'])
         
-        result = self.db.execute_query(
+        task_id = await self.pool.fetchval(
             query,
-            (context.get('organization_id'), config.get('assigned_to'), 
-             entity_id if entity_type == 'deal' else None,
-             title, description, config.get('task_type', 'follow_up'),
-             config.get('priority', 'medium'), due_date)
+            context.get('organization_id'), config.get('assigned_to'), 
+            entity_id if entity_type == 'deal' else None,
+            title, description, config.get('task_type', 'follow_up'),
+            config.get('priority', 'medium'), due_date
         )
         
-        return {'success': True, 'task_id': result[0]['id']} if result else {'success': False}
+        return {'success': True, 'task_id': task_id} if task_id else {'success': False}
     
-    def _handle_update_deal_field(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_update_deal_field(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Update deal field action"""
         if entity_type != 'deal':
             return {'success': False, 'error': 'Can only update deal fields for deal entities'}
@@ -332,12 +339,12 @@ class WorkflowEngine:
         field = config.get('field')
         value = self._replace_variables(str(config.get('value', '')), context)
         
-        query = f"UPDATE deals SET {field} = %s, updated_at = %s WHERE id = %s"
-        self.db.execute_query(query, (value, datetime.now(), entity_id))
+        query = f"UPDATE deals SET {field} = $1, updated_at = $2 WHERE id = $3"
+        await self.pool.execute(query, value, datetime.now(), entity_id)
         
         return {'success': True, 'field': field, 'value': value}
     
-    def _handle_create_conversation(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_create_conversation(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Create conversation action"""
         if not self.communication_service:
             return {'success': False, 'error': 'Communication service not available'}
@@ -352,28 +359,28 @@ class WorkflowEngine:
             assigned_to=config.get('assigned_to')
         )
         
-        result = self.communication_service.create_conversation(conversation)
+        result = await self.communication_service.create_conversation(conversation)
         return {'success': True, 'conversation_id': result['id']} if result else {'success': False}
     
-    def _handle_log_touchpoint(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_log_touchpoint(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Log touchpoint action"""
         description = self._replace_variables(config.get('description', ''), context)
         
         query = """
             INSERT INTO contact_touchpoints (borrower_id, user_id, touchpoint_type, description, occurred_at)
-            VALUES (%s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5)
             RETURNING id
         """
         
-        result = self.db.execute_query(
+        touchpoint_id = await self.pool.fetchval(
             query,
-            (context.get('borrower_id'), config.get('user_id'), 
-             config.get('touchpoint_type', 'automated'), description, datetime.now())
+            context.get('borrower_id'), config.get('user_id'), 
+            config.get('touchpoint_type', 'automated'), description, datetime.now()
         )
         
-        return {'success': True, 'touchpoint_id': result[0]['id']} if result else {'success': False}
+        return {'success': True, 'touchpoint_id': touchpoint_id} if touchpoint_id else {'success': False}
     
-    def _handle_wait(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_wait(self, config: Dict[str, Any], entity_type: str, entity_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Wait action (for delays between actions)"""
         # In a real implementation, this would schedule the next action
         # For now, just return success